@@ -1,38 +1,73 @@
+import os
+
 from flask import Flask
-from flask_migrate import Migrate
 
-import config
-from exts import db, mail, redis_client, cache
+from exts import db, mail, redis_client, cache, csrf, migrate
 from hooks import register_hooks
 
 from cores.auth import bp as auth_bp
 from cores.blogs import bp as blogs_bp
 from cores.users import bp as users_bp
+from cores.admin import bp as admin_bp
+from cores.api import bp as api_bp
 from cores.logging_config import setup_logging
 from cores.global_logger import setup_global_logging
+from cores.commands import register_commands
+from cores.suggest import register_suggest_index
+from cores.email_filter import register_email_filter
+from cores.profiler import register_profiler
+from cores.query_monitor import register_query_monitor
+from cores.storage import register_storage
+
+"""
+   应用工厂
+   create_app：创建并配置 Flask 应用
+   Celery 任务（celery_app）与 PDF 生成（cores/pdf.py）都按需导入，
+   Web 进程启动时不会加载 celery、reportlab、markdown 等重量级模块
+   启动命令：flask --app app run   或   python app.py
+"""
+
+
+def create_app(config_object='config'):
+    """
+    创建 Flask 应用实例
+    参数:
+        config_object: 配置对象或其导入路径，默认使用 config.py
+    """
+    app = Flask(__name__)
+    # 绑定配置文件
+    app.config.from_object(config_object)
+
+    # 扩展组件初始化
+    db.init_app(app)  # 数据库
+    mail.init_app(app)  # 邮件
+    csrf.init_app(app)  # CSRF 保护
+    setup_logging(app)  # 初始化日志
+    cache.init_app(app)  # 初始化缓存
+    redis_client.init_app(app)  # Redis 连接
+    migrate.init_app(app, db)  # 数据库迁移
 
-from flask_wtf.csrf import CSRFProtect
+    register_query_monitor(app)  # SQL 查询统计、慢查询日志与 N+1 检测
+    register_hooks(app)  # 注册钩子函数
+    register_profiler(app)  # 请求性能分析（需要 register_hooks 加载的当前用户）
+    setup_global_logging(app)  # 使用日志
+    register_commands(app)  # 注册命令行工具
+    register_storage(app)  # 媒体存储（模板函数 media_url、本地存储的上传地址）
+    register_suggest_index(app)  # 后台构建搜索联想索引
+    register_email_filter(app)  # 后台构建已注册邮箱的布隆过滤器
 
-app = Flask(__name__)
-# 绑定配置文件
-app.config.from_object(config)
+    # 注册蓝图
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(blogs_bp)
+    app.register_blueprint(users_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(api_bp)
 
-# 扩展组件初始化
-db.init_app(app)  # 数据库
-mail.init_app(app)  # 邮件
-csrf = CSRFProtect(app)  # CSRF 保护
-setup_logging(app)  # 初始化日志
-cache.init_app(app)  # 初始化缓存
-redis_client.init_app(app)  # Redis 连接
-migrate = Migrate(app, db)  # 数据库迁移
+    # 确保上传目录存在（原先在导入 config 时创建）
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-register_hooks(app)  # 注册钩子函数
-setup_global_logging(app)  # 使用日志
+    return app
 
-# 注册蓝图
-app.register_blueprint(auth_bp)
-app.register_blueprint(blogs_bp)
-app.register_blueprint(users_bp)
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
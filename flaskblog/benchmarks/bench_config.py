@@ -0,0 +1,46 @@
+# benchmarks/bench_config.py
+"""
+基准测试使用的配置：在 config.py 的基础上只覆盖与环境有关的配置项，
+SQLite（或本地 MySQL）+ 本地 Redis（或 fakeredis），不依赖 mydate
+用法：create_app('benchmarks.bench_config')
+"""
+import os
+
+from config import *  # noqa: F401,F403
+
+SECRET_KEY = 'bench-secret-key'
+TESTING = True
+WTF_CSRF_ENABLED = False
+
+# 数据库：默认使用 benchmarks 目录下的 bench.sqlite，可通过环境变量指向本地 MySQL
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SQLALCHEMY_DATABASE_URI = os.environ.get(
+    'BENCH_DATABASE_URI', 'sqlite:///' + os.path.join(BENCH_DIR, 'bench.sqlite'))
+if SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+    # SQLite 在多线程客户端下需要允许跨线程使用连接，并在写锁冲突时等待
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'check_same_thread': False, 'timeout': 30}}
+else:
+    SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': 20, 'max_overflow': 30, 'pool_pre_ping': True}
+SQLALCHEMY_BINDS = {}  # harness 的 replica_uris 参数启用读写分离
+DB_REPLICA_BINDS = []
+
+# 邮件：基准测试中不真正发送
+MAIL_SUPPRESS_SEND = True
+MAIL_DEFAULT_SENDER = 'bench@example.com'
+
+# Redis：默认使用 15 号库，harness 可替换为 fakeredis
+REDIS_URL = os.environ.get('BENCH_REDIS_URL', 'redis://127.0.0.1:6379/15')
+CACHE_REDIS_URL = REDIS_URL
+
+# 后台任务：基准测试由 seed_data 构建索引，发布博客时不预热
+SUGGEST_BUILD_ON_STARTUP = False
+EMAIL_BLOOM_BUILD_ON_STARTUP = False
+CACHE_WARM_ON_INVALIDATE = False
+
+# Celery：任务在当前进程内同步执行，无需启动 Worker
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
+CELERY_TASK_ALWAYS_EAGER = True
+
+# 管理员
+ADMIN_EMAILS = {'user1@bench.local'}
@@ -0,0 +1,65 @@
+# benchmarks/bench_startup.py
+"""
+启动基准：测量导入 app 并调用 create_app() 的耗时与进程常驻内存，
+并检查 Web 进程启动后是否加载了 celery、reportlab、markdown 等重量级模块
+用法（在 flaskblog 目录下）：
+    python -m benchmarks.bench_startup [--runs 5] [--config benchmarks.bench_config]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Web 进程启动时不应加载的模块
+HEAVY_MODULES = ['celery', 'reportlab', 'markdown', 'celery_app', 'cores.pdf']
+
+# 在独立子进程中执行，避免模块缓存影响结果
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app({config!r})
+created = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'total_ms': (created - start) * 1000,
+    'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+    'heavy_loaded': [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_probe(config_object):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = PROBE.format(config=config_object, heavy=HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=root)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Web 进程启动基准')
+    parser.add_argument('--runs', type=int, default=5, help='重复次数')
+    parser.add_argument('--config', default='benchmarks.bench_config', help='create_app 使用的配置')
+    args = parser.parse_args()
+
+    results = [run_probe(args.config) for _ in range(args.runs)]
+    for key in ('import_ms', 'create_app_ms', 'total_ms'):
+        values = [r[key] for r in results]
+        print(f"{key:>14}: 中位数 {statistics.median(values):8.1f}  最小 {min(values):8.1f}  最大 {max(values):8.1f}")
+    print(f"{'maxrss_kb':>14}: {max(r['maxrss_kb'] for r in results)}")
+    print(f"{'modules':>14}: {results[-1]['modules']}")
+
+    heavy = results[-1]['heavy_loaded']
+    if heavy:
+        print(f"启动时加载了重量级模块: {', '.join(heavy)}")
+        sys.exit(1)
+    print("启动时未加载重量级模块")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+# benchmarks/harness.py
+"""
+基准测试公共组件
+    build_app：创建使用 SQLite/本地 MySQL 与 fakeredis/本地 Redis 的应用
+    Counters：按线程统计每个请求的 SQL 语句数与 Redis 命令数
+    seed_data：批量生成用户、博客与评论
+"""
+import random
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+import redis
+from sqlalchemy import event, insert
+from werkzeug.security import generate_password_hash
+
+from benchmarks import bench_config
+
+# 生成测试数据使用的词汇（中英文混合，覆盖搜索场景）
+WORDS = ['flask', 'python', 'redis', 'mysql', 'celery', 'cache', 'index', 'search',
+         '博客', '缓存', '数据库', '性能', '优化', '队列', '搜索', '分页']
+
+
+class Counters(threading.local):
+    """线程内计数器，测试客户端与应用在同一线程中执行，因此可以精确归属到单个请求"""
+
+    def __init__(self):
+        self.sql = 0
+        self.redis = 0
+
+    def reset(self):
+        self.sql = 0
+        self.redis = 0
+
+
+counters = Counters()
+
+
+def _install_redis_counter():
+    """统计 Redis 命令数：普通命令按次计数，pipeline 按实际发送的命令数计数"""
+    if getattr(redis.Redis, '_bench_counted', False):
+        return
+    execute_command = redis.Redis.execute_command
+    pipeline_execute = redis.client.Pipeline.execute
+
+    def counted_execute_command(self, *args, **kwargs):
+        counters.redis += 1
+        return execute_command(self, *args, **kwargs)
+
+    def counted_pipeline_execute(self, *args, **kwargs):
+        counters.redis += len(self.command_stack)
+        return pipeline_execute(self, *args, **kwargs)
+
+    redis.Redis.execute_command = counted_execute_command
+    redis.client.Pipeline.execute = counted_pipeline_execute
+    redis.Redis._bench_counted = True
+
+
+def _install_sql_counter(engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counters.sql += 1
+
+
+def build_app(redis_url=None, database_uri=None, replica_uris=(), **overrides):
+    """
+    创建基准测试使用的应用
+    参数:
+        redis_url: 本地 Redis 地址，为空时使用 fakeredis
+        database_uri: 数据库地址，为空时使用 bench_config 中的 SQLite 文件
+        replica_uris: 只读副本地址列表，启用读写分离
+        overrides: 其他需要覆盖的配置项
+    """
+    from app import create_app
+    from exts import db, redis_client
+
+    settings = {key: getattr(bench_config, key) for key in dir(bench_config) if key.isupper()}
+    if database_uri:
+        settings['SQLALCHEMY_DATABASE_URI'] = database_uri
+    if replica_uris:
+        binds = {f'replica{i}': {'url': uri} for i, uri in enumerate(replica_uris, 1)}
+        if binds['replica1']['url'].startswith('sqlite'):
+            for bind in binds.values():
+                bind['connect_args'] = settings['SQLALCHEMY_ENGINE_OPTIONS'].get('connect_args', {})
+        settings.update(SQLALCHEMY_BINDS=binds, DB_REPLICA_BINDS=list(binds))
+    if redis_url:
+        settings.update(REDIS_URL=redis_url, CACHE_REDIS_URL=redis_url)
+    else:
+        import fakeredis
+        server = fakeredis.FakeServer()
+
+        class FakeProvider(fakeredis.FakeStrictRedis):
+            """让 FlaskRedis 与 Flask-Caching 共用同一个 fakeredis 服务器"""
+
+            @classmethod
+            def from_url(cls, url, **kwargs):
+                return cls(server=server, **kwargs)
+
+        redis_client.provider_class = FakeProvider
+        settings.update(CACHE_REDIS_URL=None, CACHE_REDIS_HOST=FakeProvider(server=server))
+    settings.update(overrides)
+
+    app = create_app(type('BenchConfig', (), settings))
+    _install_redis_counter()
+    with app.app_context():
+        for engine in db.engines.values():
+            _install_sql_counter(engine)
+    return app
+
+
+def seed_data(app, users=50, posts=500, comments=5000, chunk_size=1000, seed=42):
+    """
+    重建数据库并批量写入测试数据
+    返回:
+        dict: 各表的行数
+    """
+    from exts import db, redis_client
+    from models import UserModel, UserProfileModel, BlogModel, CommentModel
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    password = generate_password_hash('bench-password')
+
+    def insert_chunks(model, rows):
+        for start in range(0, len(rows), chunk_size):
+            db.session.execute(insert(model), rows[start:start + chunk_size])
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        redis_client.flushdb()
+
+        insert_chunks(UserModel, [{
+            'id': i, 'username': f'user{i}', 'password': password,
+            'email': f'user{i}@bench.local', 'join_time': now - timedelta(days=365),
+        } for i in range(1, users + 1)])
+        insert_chunks(UserProfileModel, [{'user_id': i} for i in range(1, users + 1)])
+
+        insert_chunks(BlogModel, [{
+            'id': i,
+            'title': ' '.join(rng.sample(WORDS, 3))[:50],
+            'tag': ' '.join(rng.sample(WORDS, 4))[:100],
+            'content': '\n\n'.join(f"## {' '.join(rng.sample(WORDS, 3))}\n\n{' '.join(rng.choices(WORDS, k=80))}"
+                                   for _ in range(5)),
+            'create_time': now - timedelta(minutes=posts - i),
+            'author_id': rng.randint(1, users),
+        } for i in range(1, posts + 1)])
+
+        # 评论集中在少数热门博客上，模拟真实的访问分布
+        insert_chunks(CommentModel, [{
+            'comment': ' '.join(rng.choices(WORDS, k=12)),
+            'create_time': now - timedelta(seconds=comments - i),
+            'blog_id': min(int(rng.paretovariate(1.2)), posts),
+            'author_id': rng.randint(1, users),
+        } for i in range(1, comments + 1)])
+        db.session.commit()
+
+        from cores.tags import rebuild_tag_index
+        from cores.suggest import build_suggest_index
+        from cores.email_filter import build_email_filter
+        rebuild_tag_index(batch_size=chunk_size)
+        build_suggest_index(batch_size=chunk_size)
+        build_email_filter(batch_size=chunk_size)
+
+    return {'users': users, 'posts': posts, 'comments': comments}
+
+
+def sync_sqlite_replicas(app):
+    """SQLite 没有复制功能：把主库文件复制为各个只读副本"""
+    from exts import db
+
+    with app.app_context():
+        primary = db.engines[None].url.database
+        for key in app.config.get('DB_REPLICA_BINDS', []):
+            replica = db.engines[key]
+            replica.dispose()
+            shutil.copyfile(primary, replica.url.database)
@@ -1,47 +1,36 @@
 """
 Celery 配置文件，用于异步处理任务（如发送邮件和生成PDF）
 该文件配置了 Celery 与 Flask 应用的集成，使任务可以在后台执行
+Web 进程只在第一次投递任务时按需导入本模块，此时直接复用当前的 Flask 应用；
+Worker 进程导入本模块时，通过 create_app() 创建应用
 """
 from celery import Celery
-from flask import Flask
+from kombu import Exchange, Queue
+from flask import current_app, has_app_context
 from flask_mail import Message
-from exts import mail, db, redis_client
+from exts import mail, redis_client
 from models import BlogModel
-from markdown import markdown
-import config
-import io
-import os
-
-# 添加PDF生成库
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT
-    from reportlab.lib.colors import gray
-except ImportError as e:
-    print(f"PDF生成库导入失败: {e}")
 
 """
    创建并配置 Celery 应用
    使用与主 Flask 应用相同的配置，确保一致性
    开发阶段：使用 --pool=solo 参数，这是 Windows 上最稳定的选项
-   启动命令：python -m celery -A celery_app.celery worker --loglevel=info --pool=solo
+   启动命令：python -m celery -A celery_app.celery worker --loglevel=info --pool=solo -Q email,pdf,maintenance
+   生产环境按队列分别启动 worker：python run.py worker email（队列与并发数见 config.py 中的 CELERY_QUEUES）
 """
 
 
-def create_celery_app():
-    # 创建 Flask 应用实例
-    app = Flask(__name__)
-    # 加载与主应用相同的配置
-    app.config.from_object(config)
-    # 初始化扩展
-    mail.init_app(app)
-    db.init_app(app)
-    redis_client.init_app(app)
+def _get_flask_app():
+    """获取任务使用的 Flask 应用：Web 进程内复用当前应用，Worker 进程内通过工厂创建"""
+    if has_app_context():
+        return current_app._get_current_object()
+    from app import create_app
+    return create_app()
+
+
+def create_celery_app(app=None):
+    # 获取 Flask 应用实例
+    app = app or _get_flask_app()
     # 创建 Celery 实例
     celery = Celery(app.import_name)
     # 配置 Celery 使用 Redis 作为消息代理和结果后端
@@ -51,8 +40,43 @@ def create_celery_app():
         result_expires=app.config['CELERY_RESULT_EXPIRES'],  # 任务结果过期时间
         task_result_expires=app.config['CELERY_TASK_RESULT_EXPIRES'],  # 兼容配置
         broker_connection_retry_on_startup=True,  # 启动时重试连接
+        task_always_eager=app.config.get('CELERY_TASK_ALWAYS_EAGER', False),  # 基准测试中在当前进程内同步执行
+    )
+
+    # 任务路由：每类任务进入独立队列，其余执行选项（优先级、速率、超时等）通过 annotations 设置到任务上
+    task_options = app.config['CELERY_TASK_OPTIONS']
+    celery.conf.update(
+        task_queues=[Queue(name, Exchange(name), routing_key=name) for name in app.config['CELERY_QUEUES']],
+        task_default_queue='maintenance',  # 未配置路由的任务
+        task_routes={f'celery_app.{name}': {'queue': options['queue']} for name, options in task_options.items()},
+        task_annotations={
+            f'celery_app.{name}': {key: value for key, value in options.items() if key != 'queue'}
+            for name, options in task_options.items()
+        },
+        # Redis 中的优先级：把每个队列拆分为多个优先级子队列
+        broker_transport_options={'priority_steps': list(range(10)), 'sep': ':', 'queue_order_strategy': 'priority'},
+        # 每个进程只预取一个任务，长时间的 PDF 任务不会让其他任务在本地排队
+        worker_prefetch_multiplier=1,
     )
 
+    # 定时任务（需要启动 celery beat）
+    beat_schedule = {
+        'flush-view-counts': {
+            'task': 'celery_app.flush_view_counts_task',
+            'schedule': app.config['VIEW_FLUSH_INTERVAL'],
+        },
+        'warm-caches': {
+            'task': 'celery_app.warm_cache_task',
+            'schedule': app.config['CACHE_WARM_INTERVAL'],
+        },
+    }
+    if app.config.get('COMMENT_BUFFERED'):
+        beat_schedule['flush-comment-stream'] = {
+            'task': 'celery_app.flush_comment_stream_task',
+            'schedule': app.config['COMMENT_FLUSH_INTERVAL'],
+        }
+    celery.conf.beat_schedule = beat_schedule
+
     # 定义 Celery 任务的基类，用于在任务执行时设置 Flask 上下文
     class ContextTask(celery.Task):
         """为 Celery 任务提供 Flask 应用上下文"""
@@ -65,6 +89,7 @@ def create_celery_app():
     celery.Task = ContextTask
     # 将 Flask 应用附加到 Celery 实例上
     celery.app = app
+    app.extensions['celery'] = celery
     return celery
 
 
@@ -82,162 +107,104 @@ def send_email_task(subject, recipients, body):
         body (str): 邮件正文内容
     此函数将在 Celery Worker 中执行，不会阻塞主应用
     """
-    # 在 Flask 应用上下文中执行邮件发送
-    with celery.app.app_context():
-        # 创建邮件消息对象
-        message = Message(
-            subject=subject,  # 邮件主题
-            recipients=recipients,  # 收件人列表
-            body=body  # 邮件正文
-        )
-        # 发送邮件
-        mail.send(message)
-        # 返回成功信息
-        return "邮件发送成功"
-
-
-# 注册中文字体函数
-def register_chinese_fonts():
-    try:
-        # 尝试使用项目 static/fonts 目录下的字体
-        static_font_dir = os.path.join(os.path.dirname(__file__), 'static', 'fonts')
-        project_fonts = [
-            os.path.join(static_font_dir, 'simfang.ttf'),
-            os.path.join(static_font_dir, 'simsun.ttc')
-        ]
-
-        for font_path in project_fonts:
-            if os.path.exists(font_path):
-                font_name = os.path.splitext(os.path.basename(font_path))[0]
-                pdfmetrics.registerFont(TTFont(font_name, font_path))
-                return font_name
-        # 如果项目目录下没有字体文件，则尝试使用系统字体
-        import platform
-        system = platform.system()
-        if system == "Windows":
-            # 尝试使用Windows系统字体
-            windows_font_paths = [
-                ("SimFang", "C:/Windows/Fonts/simfang.ttf"),
-                ("SimHei", "C:/Windows/Fonts/simhei.ttf"),
-                ("SimSun", "C:/Windows/Fonts/simsun.ttc")
-            ]
-            for font_name, font_path in windows_font_paths:
-                if os.path.exists(font_path):
-                    pdfmetrics.registerFont(TTFont(font_name, font_path))
-                    return font_name
-        return False
-    except Exception as e:
-        print(f"字体注册失败: {e}")
-        return False
+    # 创建邮件消息对象
+    message = Message(
+        subject=subject,  # 邮件主题
+        recipients=recipients,  # 收件人列表
+        body=body  # 邮件正文
+    )
+    # 发送邮件
+    mail.send(message)
+    # 返回成功信息
+    return "邮件发送成功"
+
+
+@celery.task
+def flush_comment_stream_task():
+    """
+    将 Redis Stream 中缓冲的评论批量写入数据库
+    由 publish_comment 延迟投递，并由 celery beat 定时兜底
+    """
+    from cores.comment_buffer import flush_comments
+    return flush_comments()
+
+
+@celery.task
+def flush_view_counts_task():
+    """将 Redis 中累计的阅读量与独立访客数批量写回数据库，由 celery beat 定时执行"""
+    from cores.popularity import flush_views
+    return flush_views()
+
+
+@celery.task
+def warm_cache_task():
+    """
+    预热首页、热门博客与热门搜索的缓存
+    由 celery beat 定时执行，发布博客清理缓存后也会延迟投递
+    """
+    from cores.cache_warmer import warm_caches
+    return warm_caches()
+
+
+@celery.task
+def update_feeds_task(blog_id=None):
+    """
+    更新 RSS / Atom 订阅与 sitemap
+    发布博客后只重新生成新博客所在的分片，不指定 blog_id 时全量生成
+    """
+    from cores.feeds import update_feeds, build_feeds
+    if blog_id is None:
+        return build_feeds()
+    return update_feeds(blog_id)
+
+
+@celery.task
+def delete_media_task(values):
+    """
+    删除被替换的媒体文件（本地存储或对象存储）
+    由用户资料更新后延迟投递，单个文件删除失败只记录日志
+    """
+    from cores.storage import delete_media
+    deleted = 0
+    for value in values:
+        try:
+            delete_media(value)
+            deleted += 1
+        except Exception as e:
+            current_app.logger.warning(f'删除媒体文件 {value} 失败: {e!r}')
+    return deleted
 
 
 @celery.task
 def generate_pdf_task(blog_id, task_id):
-    print("异步生成博客PDF的任务已启动")
     """
     异步生成博客PDF的任务函数
     参数:
         blog_id: 博客ID
         task_id: 任务ID，用于标识生成的PDF
     """
+    print("异步生成博客PDF的任务已启动")
     try:
-        # 在 Flask 应用上下文中执行
-        with celery.app.app_context():
-            # 获取博客内容
-            blog = BlogModel.query.get(blog_id)
-            if not blog:
-                raise ValueError(f"博客 {blog_id} 不存在")
-
-            # 注册中文字体
-            font_name = register_chinese_fonts()
-            # 如果没有可用字体，使用默认字体
-            if not font_name:
-                font_name = 'Helvetica'
-            font_registered = register_chinese_fonts()
-
-            # 创建PDF文档到内存
-            pdf_buffer = io.BytesIO()
-            doc = SimpleDocTemplate(pdf_buffer, pagesize=A4)
-            styles = getSampleStyleSheet()
-
-            # 创建内容列表
-            story = []
-
-            # 标题样式 - 居中显示
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                alignment=TA_CENTER,  # 居中
-                spaceAfter=30,
-                fontName=font_name
-            )
-            title = Paragraph(blog.title, title_style)
-            story.append(title)
-
-            # 作者和时间信息 - 居中显示
-            info_style = ParagraphStyle(
-                'CustomInfo',
-                parent=styles['Normal'],
-                fontSize=10,
-                alignment=TA_CENTER,  # 居中
-                textColor=gray,
-                fontName=font_name
-            )
-            info_text = f"作者：{blog.author.username}  发布时间：{blog.create_time.strftime('%Y-%m-%d %H:%M:%S')}"
-            info = Paragraph(info_text, info_style)
-            story.append(info)
-            story.append(Spacer(1, 20))
-
-            # 内容样式
-            content_style = ParagraphStyle(
-                'CustomContent',
-                parent=styles['Normal'],
-                fontSize=12,
-                alignment=TA_LEFT,
-                fontName=font_name
-            )
-
-            # 处理Markdown内容
-            content_html = markdown(blog.content)
-
-            # 简单的HTML标签转换以支持基本格式
-            content_html = content_html.replace('<h1>', '<font size="16" color="black"><b>').replace('</h1>',
-                                                                                                     '</b></font><br/>')
-            content_html = content_html.replace('<h2>', '<font size="14" color="black"><b>').replace('</h2>',
-                                                                                                     '</b></font><br/>')
-            content_html = content_html.replace('<h3>', '<font size="12" color="black"><b>').replace('</h3>',
-                                                                                                     '</b></font><br/>')
-            content_html = content_html.replace('<strong>', '<b>').replace('</strong>', '</b>')
-            content_html = content_html.replace('<b>', '<b>').replace('</b>', '</b>')
-            content_html = content_html.replace('<em>', '<i>').replace('</em>', '</i>')
-            content_html = content_html.replace('<i>', '<i>').replace('</i>', '</i>')
-            content_html = content_html.replace('<p>', '').replace('</p>', '<br/>')
-            content_html = content_html.replace('<ul>', '').replace('</ul>', '<br/>')
-            content_html = content_html.replace('<li>', '• ').replace('</li>', '<br/>')
-            content_html = content_html.replace('<blockquote>', '<font color="gray"><i>').replace('</blockquote>',
-                                                                                                  '</i></font><br/>')
-
-            # 内容
-            content = Paragraph(content_html, content_style)
-            story.append(content)
-
-            # 构建PDF
-            doc.build(story)
-
-            pdf_data = pdf_buffer.getvalue()
-            pdf_buffer.close()
-            print("文档生成成功")
-
-            # 将PDF数据存储到Redis中，设置过期时间（例如10分钟）
-            redis_client.setex(f"pdf_{task_id}", 600, pdf_data)
-
-            return {
-                'status': 'success',
-                'blog_id': blog_id,
-                'title': blog.title,
-                'task_id': task_id
-            }
+        # reportlab 只在 Worker 真正执行 PDF 任务时导入
+        from cores.pdf import build_blog_pdf
+
+        # 获取博客内容
+        blog = BlogModel.query.get(blog_id)
+        if not blog:
+            raise ValueError(f"博客 {blog_id} 不存在")
+
+        pdf_data = build_blog_pdf(blog)
+        print("文档生成成功")
+
+        # 将PDF数据存储到Redis中，设置过期时间（例如10分钟）
+        redis_client.setex(f"pdf_{task_id}", 600, pdf_data)
+
+        return {
+            'status': 'success',
+            'blog_id': blog_id,
+            'title': blog.title,
+            'task_id': task_id
+        }
 
     except Exception as e:
         return {
@@ -1,9 +1,18 @@
-from mydate import Email, AuthorizationCode
 import os
 
+try:
+    from mydate import Email, AuthorizationCode
+except ImportError:
+    # 未创建 mydate 时（基准测试、CI）从环境变量读取
+    Email = os.environ.get('MAIL_USERNAME', '')
+    AuthorizationCode = os.environ.get('MAIL_PASSWORD', '')
+
 # 安全密钥，用于各种安全相关的功能。
 SECRET_KEY = 'WEISJDFH123486'
 
+# 管理员邮箱，可访问 /admin 下的管理功能（含用户数据导出）；默认没有管理员，需显式添加，如 {'admin@example.com'}
+ADMIN_EMAILS = set()
+
 # 数据库的配置
 DIALCT = "mysql"
 DRITVER = "pymysql"
@@ -23,6 +32,12 @@ SQLALCHEMY_ENGINE_OPTIONS = {
     'pool_timeout': 30,  # 获取连接的超时时间（秒）
 }
 
+# 读写分离：只读副本的 bind 配置，可以为每个副本单独设置连接池参数，例如
+# SQLALCHEMY_BINDS = {'replica1': {'url': '...', 'pool_size': 10, 'max_overflow': 20, 'pool_recycle': 3600}}
+SQLALCHEMY_BINDS = {}
+DB_REPLICA_BINDS = []  # 为空时所有查询都走主库
+DB_STICKY_SECONDS = 5  # 发布博客/评论后，该用户在此时间内读主库（读己之写）
+
 # 配置邮箱
 MAIL_SERVER = 'smtp.qq.com'  # SMTP服务器地址
 MAIL_PORT = 465  # SMTP服务端口
@@ -38,16 +53,152 @@ REDIS_PASSWORD = None  # 如果没有设置密码则为 None
 REDIS_DB = 0
 REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
 
+# 缓存配置（Flask-Caching 使用 Redis）
+CACHE_TYPE = 'RedisCache'
+CACHE_REDIS_URL = REDIS_URL
+CACHE_DEFAULT_TIMEOUT = 300
+CACHE_STALE_TTL = 60  # 逻辑过期后继续保留旧值的时间（秒），期间由一个请求重建，其余请求读旧值
+CACHE_LOCK_TIMEOUT = 10  # 缓存重建锁的超时时间（秒）
+CACHE_EARLY_REFRESH_BETA = 1.0  # 提前刷新系数，越大越早开始重建
+
+# 进程内近端缓存：最热的键在每个进程内再缓存 NEAR_CACHE_TTL 秒，删除缓存时通过 Redis 发布/订阅通知所有进程
+NEAR_CACHE_ENABLED = True
+NEAR_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 每个进程的本地缓存上限（按序列化后的字节数计算）
+NEAR_CACHE_TTL = 5  # 本地副本有效期（秒）
+NEAR_CACHE_PREFIXES = ('index_page_', 'blog_detail_', 'hot_blogs')  # 使用本地缓存的键前缀
+NEAR_CACHE_CHANNEL = 'cache:invalidate'  # 失效通知频道
+
+# 搜索缓存：只缓存博客ID列表，键的数量超出上限时淘汰最久未访问的
+SEARCH_CACHE_MAX_KEYS = 10000
+SEARCH_CACHE_TIMEOUT = 600  # 搜索结果缓存时间（秒）
+BLOG_SUMMARY_CACHE_TIMEOUT = 3600  # 列表页博客摘要缓存时间（秒）
+
+# 搜索联想：Redis 前缀索引，启动时在后台构建（已存在时跳过），发布博客时增量更新
+SUGGEST_BUILD_ON_STARTUP = True
+SUGGEST_LIMIT = 10  # 返回的联想条数
+SUGGEST_CANDIDATES = 200  # 按前缀（字典序）取出的候选条数，再按权重排序；匹配更多条目的短前缀只在这些候选中排序
+
+# 已注册邮箱的布隆过滤器：发送验证码、注册时判定邮箱一定未注册则不查询数据库
+EMAIL_BLOOM_BUILD_ON_STARTUP = True
+EMAIL_BLOOM_CAPACITY = 1000000  # 预计的用户数，超出后误判率上升，需调大后重建
+EMAIL_BLOOM_ERROR_RATE = 0.001  # 误判率（可能存在时才查询数据库）
+
+# 条件请求：首页、标签页、博客详情页返回 ETag / Last-Modified，内容未变化时返回 304
+PAGE_ETAG_SALT = '1'  # 修改模板后更换，使客户端缓存的页面全部失效
+PAGE_SHARED_MAX_AGE = 30  # 匿名页面允许前端代理缓存的时间（秒）
+DETAIL_SHARED_MAX_AGE = 3600  # 博客详情页不含评论，允许代理缓存更久
+
+# 博客详情页流式输出：页头与导航栏渲染完即发送，缩短首字节时间
+DETAIL_STREAMING = True
+STREAM_CHUNK_SIZE = 2048  # 合并模板片段，至少这么多字符发送一次
+
+# 评论接口：游标分页，第一页随新评论清理，之后的页面内容固定
+COMMENT_PAGE_SIZE = 20
+COMMENT_HEAD_CACHE_TIMEOUT = 120  # 第一页（含评论总数）缓存时间（秒）
+COMMENT_PAGE_CACHE_TIMEOUT = 600  # 之后各页的缓存时间（秒）
+
+# 缓存预热：celery beat 定时执行，清理首页与搜索缓存后延迟执行一次
+CACHE_WARM_ON_INVALIDATE = True
+CACHE_WARM_DELAY = 1  # 清理缓存后延迟多少秒预热，期间的多次清理合并
+CACHE_WARM_INTERVAL = 60  # 定时预热间隔（秒），距过期不足该时间的条目也会重建
+CACHE_WARM_REFRESH_RATIO = 0.5  # 距过期不足缓存时间的该比例时才重建（与上一项取较小值），仍较新的条目不重复重建
+CACHE_WARM_INDEX_PAGES = 5  # 预热的首页页数
+CACHE_WARM_TOP_POSTS = 50  # 预热热度最高的博客数（详情与第一页评论）
+CACHE_WARM_TOP_SEARCHES = 20  # 预热搜索次数最多的关键字数（第一页）
+CACHE_WARM_CONCURRENCY = 4  # 同时重建的条目数
+SEARCH_POPULAR_SIZE = 10000  # 每个时间段保留的关键字数（写入时裁剪，淘汰次数最少的）
+SEARCH_POPULAR_BUCKET = 3600  # 搜索次数按多少秒分段统计
+SEARCH_POPULAR_WINDOW = 24  # 热门关键字合并最近多少段
+
+# RSS / Atom 订阅与 sitemap：预先生成为静态文件（含 gzip 版本），发布博客后由 Celery 任务增量更新
+SITE_URL = 'http://127.0.0.1:5000'  # 站点根地址，用于生成绝对链接
+SITE_TITLE = '个人博客网站'
+FEED_FOLDER = os.path.join('static', 'feeds')  # 相对于应用目录，多台服务器时需使用共享存储
+FEED_SIZE = 20  # 订阅中的博客数
+FEED_SUMMARY_LENGTH = 300  # 订阅中博客摘要的字数
+SITEMAP_SHARD_SIZE = 10000  # 每个 sitemap 分片包含的博客ID范围（协议上限 50000）
+FEED_MAX_AGE = 300  # 客户端与代理缓存订阅、sitemap 的时间（秒）
+
+# 请求性能分析：被选中的请求按固定间隔采样调用栈，结果以折叠栈格式保存在 PROFILE_FOLDER/<端点>/ 下
+PROFILE_SAMPLE_RATE = 0.0  # 随机抽样的请求比例（如 0.01），0 为只分析管理员指定的请求
+PROFILE_HEADER = 'X-Profile'  # 管理员请求带此请求头时分析该请求
+PROFILE_INTERVAL = 0.005  # 采样间隔（秒）
+PROFILE_FOLDER = os.path.join('logs', 'profiles')
+PROFILE_MAX_FILES = 200  # 每个端点最多保留的分析结果数
+
+# SQL 查询统计：每个请求的查询次数与耗时写入请求日志
+SLOW_QUERY_THRESHOLD = 0.2  # 慢查询阈值（秒）
+SLOW_QUERY_LOG = os.path.join('logs', 'slow_query.log')
+SQL_REPEAT_THRESHOLD = 3  # 同一语句在一个请求中执行超过该次数视为 N+1 查询
+SQL_STRICT = False  # 为 True 时 N+1 查询抛出异常（测试、CI 中开启）
+
+# 评论缓冲写入：开启后评论先写入 Redis Stream，由 Celery 任务批量写入数据库
+COMMENT_BUFFERED = False
+COMMENT_STREAM_KEY = 'comment_stream'
+COMMENT_STREAM_MAXLEN = 1000000  # Stream 最大长度（近似裁剪）
+COMMENT_FLUSH_BATCH = 500  # 每批写入的评论数
+COMMENT_FLUSH_DELAY = 1  # 收到评论后延迟多少秒刷新，期间的评论合并写入
+COMMENT_FLUSH_INTERVAL = 10  # Celery beat 兜底刷新间隔（秒）
+
+# 阅读量与热门排行
+VIEW_FLUSH_INTERVAL = 60  # 阅读量写回数据库的间隔（秒）
+HOT_HALF_LIFE = 6 * 3600  # 热度半衰期（秒）
+HOT_RANKING_SIZE = 1000  # 热度有序集合保留的博客数
+HOT_LIST_SIZE = 20  # 热门页面展示的博客数
+HOT_CACHE_TIMEOUT = 60  # 热门列表缓存时间（秒）
+
+# 标签
+TAG_CLOUD_SIZE = 100  # 标签云展示的标签数
+TAG_CLOUD_CACHE_TIMEOUT = 600  # 标签云缓存时间（秒）
+TAG_PAGE_CACHE_TIMEOUT = 300  # 标签页前几页的缓存时间（秒），发布博客时清理对应标签
+
 # Celery 配置
 CELERY_BROKER_URL = REDIS_URL  # 使用 Redis 作为消息代理
 CELERY_RESULT_BACKEND = REDIS_URL  # 使用 Redis 作为结果后端
 CELERY_RESULT_EXPIRES = 3600  # 任务结果1小时后过期
 CELERY_TASK_RESULT_EXPIRES = 3600  # 兼容旧版本配置项
 
+# Celery 队列：每类任务使用独立队列，按队列分别启动 worker（python run.py worker <队列名>），
+# concurrency 为该队列 worker 的进程数，PDF 积压时不会占用邮件的处理能力
+CELERY_QUEUES = {
+    'email': {'concurrency': 4},
+    'pdf': {'concurrency': 2},
+    'maintenance': {'concurrency': 1},
+}
+# 每个任务的队列与执行选项
+#   priority：Redis 中数值越小越优先，同一个 worker 消费多个队列时生效
+#   rate_limit：每个 worker 节点的速率上限
+#   soft_time_limit / time_limit：超时先抛出异常让任务自行收尾，仍未结束时强制终止进程
+#   acks_late：任务执行完才确认，worker 崩溃时任务不会丢失
+CELERY_TASK_OPTIONS = {
+    'send_email_task': {'queue': 'email', 'priority': 0, 'rate_limit': '60/m', 'time_limit': 30,
+                        'ignore_result': True},
+    'generate_pdf_task': {'queue': 'pdf', 'priority': 5, 'rate_limit': '20/m', 'soft_time_limit': 60,
+                          'time_limit': 90, 'acks_late': True},
+    'flush_comment_stream_task': {'queue': 'maintenance', 'priority': 3, 'time_limit': 120,
+                                  'ignore_result': True},
+    'flush_view_counts_task': {'queue': 'maintenance', 'priority': 3, 'time_limit': 120, 'ignore_result': True},
+    'update_feeds_task': {'queue': 'maintenance', 'priority': 4, 'time_limit': 600, 'ignore_result': True},
+    'warm_cache_task': {'queue': 'maintenance', 'priority': 4, 'soft_time_limit': 120, 'time_limit': 180,
+                        'ignore_result': True},
+    'delete_media_task': {'queue': 'maintenance', 'priority': 6, 'time_limit': 120, 'ignore_result': True},
+}
+
 # 文件上传配置
 UPLOAD_FOLDER = os.path.join('static', 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'avi', 'mov', 'wmv'}
 MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
+MEDIA_MAX_SIZE = {'image': 10 * 1024 * 1024, 'video': 100 * 1024 * 1024}  # 用户资料中图片、视频的大小上限
+# 上传目录在 create_app() 中创建，导入配置时不产生副作用
 
-# 确保上传目录存在
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# 媒体存储：用户上传的文件由浏览器直接上传到存储后端，不经过 Web 进程（见 cores/storage.py）
+STORAGE_BACKEND = 'local'  # 'local'：保存在 UPLOAD_FOLDER（单台服务器）；'s3'：S3 兼容的对象存储（需要 pip install boto3）
+STORAGE_S3_BUCKET = 'flaskblog-media'
+STORAGE_S3_ENDPOINT_URL = None  # None 为 AWS S3；MinIO 等填写服务地址，如 'http://127.0.0.1:9000'
+STORAGE_S3_REGION = 'us-east-1'
+STORAGE_S3_ACCESS_KEY = None  # None 时使用 boto3 默认的凭证（环境变量、配置文件、实例角色）
+STORAGE_S3_SECRET_KEY = None
+STORAGE_S3_PUBLIC_URL = None  # 存储桶公开读或经 CDN 访问时的地址，设置后下载地址不再签名
+STORAGE_UPLOAD_EXPIRES = 600  # 直传地址的有效期（秒）
+STORAGE_URL_EXPIRES = 3600  # 下载地址的有效期（秒）
+STORAGE_DELETE_DELAY = 60  # 替换后延迟多少秒删除旧文件，已渲染的页面在此期间仍可访问
@@ -0,0 +1,58 @@
+import os
+
+from flask import (Blueprint, Response, request, abort, stream_with_context, current_app, g, jsonify,
+                   render_template, send_from_directory)
+from decorators import admin_required
+from .exporter import iter_export, export_filename, EXPORT_TABLES, EXPORT_FORMATS
+from .near_cache import near_cache
+from .profiler import list_profiles, PROFILE_SUFFIX
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+"""
+    管理员模块
+    export_data：流式导出用户、博客、评论
+    cache_stats：当前进程的近端缓存命中与淘汰统计
+    profiles、profile_file：最近的请求性能分析结果（折叠栈文件）
+"""
+
+
+@bp.route('/export/<table>.<fmt>')
+@admin_required
+def export_data(table, fmt):
+    if table not in EXPORT_TABLES or fmt not in EXPORT_FORMATS:
+        abort(404)
+    compress = request.args.get('gzip', type=int) == 1
+
+    current_app.logger.info(f'管理员{g.user.username}导出了{table}（{fmt}）')
+    # 生成器逐块输出，stream_with_context 保证生成期间数据库会话可用
+    response = Response(
+        stream_with_context(iter_export(table, fmt, compress=compress)),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={export_filename(table, fmt, compress)}'
+    return response
+
+
+@bp.route('/cache/stats')
+@admin_required
+def cache_stats():
+    # 统计按进程计算，多进程部署时每次请求返回处理该请求的进程的数据
+    return jsonify(near_cache.stats(top=request.args.get('top', 10, type=int)))
+
+
+@bp.route('/profiles')
+@admin_required
+def profiles():
+    endpoint = request.args.get('view')
+    return render_template('admin_profiles.html', profiles=list_profiles(endpoint=endpoint), endpoint=endpoint,
+                           header=current_app.config['PROFILE_HEADER'])
+
+
+@bp.route('/profiles/<path:path>')
+@admin_required
+def profile_file(path):
+    if not path.endswith(PROFILE_SUFFIX):
+        abort(404)
+    # send_from_directory 会拒绝目录之外的路径
+    return send_from_directory(os.path.abspath(current_app.config['PROFILE_FOLDER']), path,
+                               mimetype='text/plain', as_attachment=request.args.get('download', type=int) == 1)
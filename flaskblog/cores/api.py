@@ -0,0 +1,90 @@
+import base64
+import binascii
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify, abort, current_app, g
+from exts import cache
+from models import CommentModel
+from .caching import cached_fetch
+from .comment_buffer import get_pending_comments
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+"""
+    JSON 接口
+    blog_comments：博客评论，按 (create_time, id) 游标分页
+"""
+
+COMMENT_HEAD_CACHE_KEY = 'blog_{blog_id}_comments_head'
+COMMENT_PAGE_CACHE_KEY = 'blog_{blog_id}_comments_{cursor}'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def encode_cursor(comment):
+    """游标为最后一条评论的 (create_time, id)，编码后对客户端不透明"""
+    raw = f'{comment.create_time.isoformat()}|{comment.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        create_time, comment_id = raw.split('|')
+        return datetime.fromisoformat(create_time), int(comment_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        abort(400)
+
+
+def _serialize(comment):
+    """精简的评论数据"""
+    return {
+        'id': comment.id,
+        'author': comment.author.username,
+        'text': comment.comment,
+        'time': comment.create_time.strftime(TIME_FORMAT),
+    }
+
+
+def _load_page(blog_id, before):
+    limit = current_app.config['COMMENT_PAGE_SIZE']
+    comments = CommentModel.get_blog_comments_before(blog_id, before=before, limit=limit)
+    return {
+        'comments': [_serialize(comment) for comment in comments],
+        'next': encode_cursor(comments[-1]) if len(comments) == limit else None,
+    }
+
+
+def load_comment_head(blog_id):
+    """第一页评论与评论总数（可缓存），缓存预热共用"""
+    data = _load_page(blog_id, None)
+    data['total'] = CommentModel.count_blog_comments(blog_id)
+    return data
+
+
+@bp.route('/blogs/<int:blog_id>/comments')
+def blog_comments(blog_id):
+    """
+        博客评论 - 游标分页 - redis缓存
+        第一页（不带 cursor）包含评论总数，新评论只清理第一页的缓存；
+        之后的每一页由游标唯一确定，新评论不会改变它们的内容，缓存时间更长
+    """
+    cursor = request.args.get('cursor')
+    config = current_app.config
+    if cursor is None:
+        data = dict(cached_fetch(COMMENT_HEAD_CACHE_KEY.format(blog_id=blog_id),
+                                 lambda: load_comment_head(blog_id), timeout=config['COMMENT_HEAD_CACHE_TIMEOUT']))
+        # 缓冲模式下，作者自己尚未写入数据库的评论单独返回，不进入共享缓存
+        if config.get('COMMENT_BUFFERED') and g.user:
+            data['pending'] = [{
+                'author': comment['author']['username'],
+                'text': comment['comment'],
+                'time': comment['create_time'].strftime(TIME_FORMAT),
+            } for comment in get_pending_comments(blog_id, g.user)]
+        return jsonify(data)
+
+    before = decode_cursor(cursor)
+    cache_key = COMMENT_PAGE_CACHE_KEY.format(blog_id=blog_id, cursor=cursor)
+    data = cache.get(cache_key)
+    if data is None:
+        data = _load_page(blog_id, before)
+        cache.set(cache_key, data, timeout=config['COMMENT_PAGE_CACHE_TIMEOUT'])
+    return jsonify(data)
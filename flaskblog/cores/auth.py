@@ -1,11 +1,12 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session, current_app
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session, current_app, abort
 from exts import db, redis_client
 from models import UserModel, UserProfileModel
 from .forms import RegisterForm, LoginForm, EmailForm
+from .email_filter import add_email
+from .importer import import_in_progress
 import string
 import random
 from werkzeug.security import generate_password_hash, check_password_hash
-from celery_app import send_email_task
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 """
@@ -71,7 +72,8 @@ def get_email_captcha():
     source = string.digits * 4
     captcha = ''.join(random.sample(source, 4))
     print(captcha)
-    # 向邮箱发送验证码
+    # 向邮箱发送验证码（按需导入 Celery 任务，Web 进程启动时不加载）
+    from celery_app import send_email_task
     send_email_task.delay(
         subject="问答网站验证码",  # 邮件主题
         recipients=[email],  # 收件人列表
@@ -90,6 +92,9 @@ def register():
         return render_template('register.html')
     else:
         current_app.logger.info('用户注册')
+        if import_in_progress():
+            # 批量导入按预先分配的主键写入用户
+            abort(503)
         form = RegisterForm(request.form)
         if form.validate():
             email = form.email.data
@@ -114,6 +119,7 @@ def register():
             db.session.add(user_profile)
             try:
                 db.session.commit()
+                add_email(email)
                 current_app.logger.info(f'用户{username}注册成功')
                 return redirect(url_for('auth.login'))
             except Exception as e:
@@ -1,20 +1,45 @@
 import io
 import uuid
-from flask import Blueprint, request, render_template, g, redirect, url_for, send_file, current_app, jsonify
+from flask import Blueprint, request, render_template, g, redirect, url_for, send_file, current_app, jsonify, abort
+from flask_wtf.csrf import generate_csrf
 from exts import db, redis_client, cache
-from models import BlogModel, CommentModel
+from models import BlogModel, CommentModel, TagModel
 from .forms import BlogFrom, CommentForm
 from decorators import login_required
-from markdown import markdown
-from celery_app import generate_pdf_task  # 导入Celery任务
+from .render import render_markdown, stream_page
+from .caching import CachedPagination, cached_fetch
+from .near_cache import near_cache
+from .search_cache import search_blogs, clear_search_cache
+from .suggest import suggest, add_blog_suggestions
+from .conditional import conditional, blog_version, listing_version, ensure_blog_version, touch_listing_version
+from .api import COMMENT_HEAD_CACHE_KEY
+from .db_routing import stick_to_primary
+from .comment_buffer import enqueue_comment
+from .cache_warmer import schedule_cache_warm
+from .feeds import send_feed, schedule_feed_update, RSS_FILE, ATOM_FILE, SITEMAP_INDEX_FILE, SITEMAP_FILE_RE
+from .popularity import record_view, get_hot_blogs
+from .tags import attach_tags, clear_tag_cache, get_tag_cloud, TAG_PAGE_CACHE_KEY, TAG_CACHED_PAGES
+from .importer import import_in_progress
 
 bp = Blueprint('blogs', __name__, url_prefix='/')
 
 # 设置每页显示的博客数量
 PER_PAGE = 10
+# 首页缓存的最大页数，更靠后的页面直接查询
+INDEX_CACHED_PAGES = 10
+INDEX_CACHE_KEY = 'index_page_{page}'
+INDEX_CACHE_TIMEOUT = 60
+BLOG_DETAIL_CACHE_KEY = 'blog_detail_{blog_id}'
+# 详情页不含评论，缓存1小时
+BLOG_DETAIL_CACHE_TIMEOUT = 3600
 """
     index：默认展示博客
+    hot：按热度展示博客
+    tags：标签云
+    tag_blogs：按标签展示博客
     search：根据输入的关键字展示博客
+    search_suggest：搜索联想（JSON）
+    rss_feed、atom_feed、sitemap、sitemap_shard：订阅与 sitemap（预先生成的静态文件）
     publish_blog：发布博客
     blog_detail：显示博客，包括相关评论
     publish_comment：发布评论
@@ -22,21 +47,83 @@ PER_PAGE = 10
 """
 
 
+def load_index_page(page):
+    """首页第 page 页的分页数据（可缓存），缓存预热共用"""
+    # 使用优化的分页查询方法
+    return CachedPagination.from_pagination(BlogModel.get_recent_blogs_paginated(
+        page=page,
+        per_page=PER_PAGE
+    ))
+
+
+def load_blog_detail(blog_id):
+    """详情页展示的博客（可缓存），同时加载作者信息，正文为渲染后的 HTML，缓存预热共用"""
+    blog = BlogModel.get_detail_or_404(blog_id)
+    # 从会话中分离后再替换内容，避免渲染后的 HTML 被当作修改写回数据库
+    db.session.expunge(blog)
+    # 这样可以减轻前端负担，提高页面渲染速度
+    blog.content = blog.content_html or render_markdown(blog.content)
+    return blog
+
+
 @bp.route('/')
-@cache.cached(timeout=60, key_prefix='index_page')
+@conditional(listing_version)
 def index():
     """
-        首页路由 - 使用优化的数据库查询 - redis缓存
+        首页路由 - 使用优化的数据库查询 - redis缓存（防击穿） - 条件请求
+        缓存分页数据而不是整页 HTML，导航栏中的登录状态每次单独渲染
     """
     page = request.args.get('page', 1, type=int)
-    # 使用优化的分页查询方法
-    blogs = BlogModel.get_recent_blogs_paginated(
-        page=page,
-        per_page=PER_PAGE
-    )
+    if page <= INDEX_CACHED_PAGES:
+        blogs = cached_fetch(INDEX_CACHE_KEY.format(page=page), lambda: load_index_page(page),
+                             timeout=INDEX_CACHE_TIMEOUT)
+    else:
+        # 超过 INDEX_CACHED_PAGES 的页面不缓存
+        blogs = load_index_page(page)
     return render_template('index.html', blogs=blogs)
 
 
+@bp.route('/hot')
+def hot():
+    """
+        热门博客 - 按随时间衰减的阅读热度排序 - redis缓存
+    """
+    blogs = get_hot_blogs()
+    blogs = CachedPagination(page=1, per_page=max(len(blogs), 1), max_per_page=None, error_out=False,
+                             items=blogs, total=len(blogs))
+    return render_template('index.html', blogs=blogs, heading='热门博客')
+
+
+@bp.route('/tags')
+def tags():
+    """
+        标签云 - 使用预先计算的文章数 - redis缓存
+    """
+    return render_template('tags.html', tags=get_tag_cloud())
+
+
+@bp.route('/tags/<tag>')
+@conditional(listing_version)
+def tag_blogs(tag):
+    """
+        标签页 - 通过 (tag_id, create_time) 索引分页 - redis缓存 - 条件请求
+    """
+    page = request.args.get('page', 1, type=int)
+    cache_key = TAG_PAGE_CACHE_KEY.format(tag=tag, page=page)
+    blogs = cache.get(cache_key) if page <= TAG_CACHED_PAGES else None
+    if blogs is None:
+        tag_obj = TagModel.query.filter_by(name=tag).first_or_404()
+        if tag_obj.name != tag:
+            # 排序规则不区分大小写时 /tags/Flask 也能查到 flask；缓存只按保存的写法清理，因此重定向
+            return redirect(url_for('blogs.tag_blogs', tag=tag_obj.name, **request.args), code=301)
+        blogs = CachedPagination.from_pagination(
+            BlogModel.get_blogs_by_tag_paginated(tag_obj, page=page, per_page=PER_PAGE)
+        )
+        if page <= TAG_CACHED_PAGES:
+            cache.set(cache_key, blogs, timeout=current_app.config['TAG_PAGE_CACHE_TIMEOUT'])
+    return render_template('index.html', blogs=blogs, heading=f'标签：{tag}', tag_name=tag)
+
+
 @bp.route("/search")
 def search():
     """
@@ -49,29 +136,8 @@ def search():
         # 如果没有搜索关键字，重定向到首页
         return redirect(url_for('blogs.index'))
 
-    # 使用缓存键
-    cache_key = f'search_{q}_{page}'
-
-    cached_result = cache.get(cache_key)
-    if cached_result:
-        current_app.logger.info(f'搜索结果从缓存获取: {q}')
-        return render_template('index.html', blogs=cached_result, q=q)
-
-    # 缓存未命中，执行查询    使用优化的搜索分页方法
-    blogs = BlogModel.search_blogs_paginated(
-        query=q,
-        page=page,
-        per_page=PER_PAGE
-    )
-
-    # 缓存搜索结果10分钟
-    cache.set(cache_key, blogs, timeout=600)
-    current_app.logger.info(f'搜索结果已缓存: {q}')
-
-    # 记录这个搜索缓存键，便于发布新博客后全部删除
-    search_keys = cache.get('all_search_keys') or set()
-    search_keys.add(cache_key)
-    cache.set('all_search_keys', search_keys, timeout=3600)
+    # 只缓存ID列表，博客摘要批量获取
+    blogs = search_blogs(q, page=page, per_page=PER_PAGE)
 
     # 记录搜索日志（用于分析用户行为）
     current_app.logger.info(f'用户{g.user.username if g.user else "匿名用户"}搜索了关键字"{q}"')
@@ -79,50 +145,116 @@ def search():
     return render_template('index.html', blogs=blogs, q=q)
 
 
+@bp.route("/search/suggest")
+def search_suggest():
+    """
+        搜索联想 - 按前缀匹配博客标题与标签 - redis前缀索引
+    """
+    results = []
+    for kind, key, text in suggest(request.args.get('q', '')):
+        if kind == 'blog':
+            url = url_for('blogs.blog_detail', blog_id=key)
+        else:
+            url = url_for('blogs.tag_blogs', tag=key)
+        results.append({'type': kind, 'text': text, 'url': url})
+    return jsonify({'suggestions': results})
+
+
+@bp.route('/rss.xml')
+def rss_feed():
+    """
+        RSS 订阅 - 预先生成的静态文件 - 条件请求
+    """
+    return send_feed(RSS_FILE, 'application/rss+xml')
+
+
+@bp.route('/atom.xml')
+def atom_feed():
+    """
+        Atom 订阅 - 预先生成的静态文件 - 条件请求
+    """
+    return send_feed(ATOM_FILE, 'application/atom+xml')
+
+
+@bp.route('/sitemap.xml')
+def sitemap():
+    """
+        sitemap 索引 - 预先生成的静态文件 - 条件请求
+    """
+    return send_feed(SITEMAP_INDEX_FILE, 'application/xml')
+
+
+@bp.route('/sitemaps/<filename>')
+def sitemap_shard(filename):
+    """
+        sitemap 分片 - 预先生成的静态文件 - 条件请求
+    """
+    if not SITEMAP_FILE_RE.match(filename):
+        abort(404)
+    return send_feed(filename, 'application/xml')
+
+
 # 当有新博客发布时，需要清除相关缓存
 def clear_blog_cache():
     # 清理首页缓存
-    cache.delete('index_page')
+    near_cache.delete_many(*[INDEX_CACHE_KEY.format(page=page) for page in range(1, INDEX_CACHED_PAGES + 1)])
     # 清理搜索缓存（可以根据需要实现更精细的清理），当前是直接删除所有
-    search_keys = cache.get('all_search_keys') or set()
-    if search_keys:
-        # 批量删除搜索缓存
-        for key in search_keys:
-            cache.delete(key)
-        # 清理搜索键记录
-        cache.delete('all_search_keys')
+    clear_search_cache()
+    # 首页与标签页的 ETag 随之变化
+    touch_listing_version()
+    # 在用户访问之前重建首页、热门博客与热门搜索的缓存
+    schedule_cache_warm()
 
     current_app.logger.info('相关缓存已清理')
 
 
 # 发布评论时清理评论缓存
 def clear_comment_cache(blog_id):
-    # 清理该博客的所有评论分页缓存
-    # 假设最多有10页评论（可根据实际调整）
-    for page in range(1, 11):
-        cache_key = f'blog_{blog_id}_comments_{page}'
-        cache.delete(cache_key)
+    # 游标分页中只有第一页会因新评论而变化
+    near_cache.delete_many(COMMENT_HEAD_CACHE_KEY.format(blog_id=blog_id))
 
     current_app.logger.info(f'博客{blog_id}的评论缓存已清理')
 
 
+# 批量导入后一次性清理多篇博客的评论缓存
+def clear_comment_cache_many(blog_ids, batch_size=500):
+    keys = [COMMENT_HEAD_CACHE_KEY.format(blog_id=blog_id) for blog_id in blog_ids]
+    for start in range(0, len(keys), batch_size):
+        near_cache.delete_many(*keys[start:start + batch_size])
+
+    current_app.logger.info(f'{len(blog_ids)}篇博客的评论缓存已清理')
+
+
 @bp.route('/blogs', methods=['GET', 'POST'])
 @login_required
 def publish_blog():
     if request.method == 'GET':
         return render_template('publish.html')
     else:
+        if import_in_progress():
+            # 批量导入按预先分配的主键写入博客
+            abort(503)
         form = BlogFrom(request.form)
         if form.validate():
             title = form.title.data
             tag = form.tag.data
             content = form.content.data
-            blog = BlogModel(title=title, tag=tag, content=content, author=g.user)
+            # 发布时预先渲染 HTML，详情页无需再渲染
+            blog = BlogModel(title=title, tag=tag, content=content, content_html=render_markdown(content),
+                             author=g.user)
             db.session.add(blog)
+            db.session.flush()  # 获取 blog.id，与标签关联在同一事务中提交
+            tag_names = attach_tags(blog)
             db.session.commit()
+            stick_to_primary()
 
             # 发布成功后清理相关缓存
             clear_blog_cache()
+            clear_tag_cache(tag_names)
+            # 增量更新搜索联想索引
+            add_blog_suggestions(blog, tag_names)
+            # 后台更新订阅与 sitemap
+            schedule_feed_update(blog.id)
 
             current_app.logger.info(f'用户{g.user.username}发布了博客{title}')
             return redirect('/')
@@ -131,46 +263,28 @@ def publish_blog():
 
 
 @bp.route('/blogs/detail/<blog_id>')
+# 登录用户的详情页包含评论表单的 CSRF 令牌，令牌过期后不能再用 304 复用旧页面
+@conditional(blog_version, shared_max_age='DETAIL_SHARED_MAX_AGE', anonymous_only=True)
 def blog_detail(blog_id):
     """
-       博客详情页 - 优化的详情查询 - 带缓存
+       博客详情页 - 优化的详情查询 - 带缓存 - 条件请求 - 流式输出
+       页面不包含评论，只随博客内容变化；匿名用户内容未变化时在查询数据库之前返回 304（304 不计入阅读量）
     """
-    # 为每篇博客创建独立的缓存键
-    cache_key = f'blog_detail_{blog_id}'
-
-    # 尝试从缓存获取博客详情
-    cached_blog = cache.get(cache_key)
-    if cached_blog:
-        blog = cached_blog
-        current_app.logger.info(f'博客详情从缓存获取: {blog_id}')
-    else:
-        # 缓存未命中，查询数据库
-        blog = BlogModel.query.get_or_404(blog_id)
-        # 这样可以减轻前端负担，提高页面渲染速度
-        blog.content = markdown(blog.content)
-        # 缓存5分钟
-        cache.set(cache_key, blog, timeout=300)
-        current_app.logger.info(f'博客详情已缓存: {blog_id}')
-    # 评论分页也使用缓存
-    page = request.args.get('page', 1, type=int)
-    comments_cache_key = f'blog_{blog_id}_comments_{page}'
-    cached_comments = cache.get(comments_cache_key)
-    if cached_comments:
-        comments = cached_comments
-        current_app.logger.info(f'评论从缓存获取: {blog_id}, page {page}')
-    else:
-        comments = CommentModel.query.filter_by(blog_id=blog_id).order_by(
-            CommentModel.create_time.desc()
-        ).paginate(
-            page=page,
-            per_page=10,  # 每页10条评论
-            error_out=False  # 页码错误不抛异常
-        )
-        cache.set(comments_cache_key, comments, timeout=120)
-        current_app.logger.info(f'评论已缓存: {blog_id}, page {page}')
-
-    # 将博客和评论分页对象传递给模板
-    return render_template('detail.html', blog=blog, comments=comments)
+    # 为每篇博客创建独立的缓存键，热门文章过期时只有一个请求重建
+    blog = cached_fetch(BLOG_DETAIL_CACHE_KEY.format(blog_id=blog_id), lambda: load_blog_detail(blog_id),
+                        timeout=BLOG_DETAIL_CACHE_TIMEOUT)
+    ensure_blog_version(blog)
+    # 记录阅读量，只写 Redis，定时批量写回数据库
+    record_view(blog.id, f'user:{g.user.id}' if g.user else f'ip:{request.remote_addr}')
+
+    # 评论由前端通过 /api/blogs/<id>/comments 异步加载，页面本身只随博客内容变化
+    if current_app.config['DETAIL_STREAMING']:
+        if g.user:
+            # 流式响应的响应头（包括会话 Cookie）先于页面内容发送，评论表单的 CSRF 令牌需提前写入会话
+            generate_csrf()
+        # 页头、导航栏先发送，缓存的正文 HTML 作为一整块发送
+        return current_app.response_class(stream_page('detail.html', blog=blog), mimetype='text/html')
+    return render_template('detail.html', blog=blog)
 
 
 @bp.post('/blogs/comment/public')
@@ -180,9 +294,15 @@ def publish_comment():
     if form.validate():
         comment_data = form.comment.data
         blog_id = form.blog_id.data
+        if current_app.config.get('COMMENT_BUFFERED'):
+            # 缓冲模式：写入 Redis Stream 后立即返回，由 Celery 批量写库并清理缓存
+            entry_id = enqueue_comment(blog_id, g.user.id, comment_data)
+            current_app.logger.info(f'用户{g.user.username}评论了博客{blog_id}，评论已缓冲为{entry_id}')
+            return redirect(url_for('blogs.blog_detail', blog_id=blog_id))
         comment = CommentModel(comment=comment_data, blog_id=blog_id, author_id=g.user.id)
         db.session.add(comment)
         db.session.commit()
+        stick_to_primary()
         # 发布评论后清理该博客的评论缓存
         clear_comment_cache(blog_id)
 
@@ -199,7 +319,8 @@ def start_pdf_download(blog_id):
     # 生成唯一的任务ID
     task_id = str(uuid.uuid4())
 
-    # 启动异步任务生成PDF
+    # 启动异步任务生成PDF（按需导入 Celery 任务，Web 进程启动时不加载）
+    from celery_app import generate_pdf_task
     generate_pdf_task.delay(blog_id, task_id)
 
     # 立即返回任务ID
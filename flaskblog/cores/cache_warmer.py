@@ -0,0 +1,104 @@
+# cores/cache_warmer.py
+"""
+缓存预热
+部署后或发布博客清理缓存后，最先访问热门页面的一批请求要同时查询数据库、渲染 Markdown；
+预热任务在用户访问之前重建这些缓存：
+    1. 首页前 CACHE_WARM_INDEX_PAGES 页
+    2. 热度最高的 CACHE_WARM_TOP_POSTS 篇博客的详情与第一页评论
+    3. 搜索次数最多的 CACHE_WARM_TOP_SEARCHES 个关键字的第一页结果
+只重建不存在或即将过期的条目（距过期不足 CACHE_WARM_INTERVAL 秒与缓存时间的 CACHE_WARM_REFRESH_RATIO
+中较小者，缓存时间不长于预热间隔的首页不会每次都重建），与请求共用重建锁，不会重复查询；
+最多 CACHE_WARM_CONCURRENCY 个线程同时重建，预热本身不会压垮数据库
+    warm_caches：执行一次预热（Celery 任务，由 celery beat 定时执行，也可通过 flask perf warm 手动执行）
+    schedule_cache_warm：清理缓存后调用，合并短时间内的多次清理，延迟投递一次预热任务
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from flask import current_app
+
+from exts import db, redis_client
+from .api import COMMENT_HEAD_CACHE_KEY, load_comment_head
+from .caching import warm_cache
+from .db_routing import use_primary
+from .popularity import get_hot_blog_ids
+from .search_cache import get_popular_searches, warm_search
+
+# 防抖标记：存在期间不再重复投递预热任务，预热开始时删除；过期时间兜底任务丢失的情况
+WARM_SCHEDULED_KEY = 'cache_warm_scheduled'
+WARM_SCHEDULED_TTL = 60
+
+
+def _min_ttl(timeout):
+    """距过期不足该秒数的条目需要重建"""
+    config = current_app.config
+    return min(config['CACHE_WARM_INTERVAL'], timeout * config['CACHE_WARM_REFRESH_RATIO'])
+
+
+def _warm_jobs():
+    """[(类别, 无参函数), ...]，函数返回是否重建；首页排在最前面"""
+    # 视图模块导入了本模块，按需导入避免循环引用
+    from .blogs import (PER_PAGE, INDEX_CACHED_PAGES, INDEX_CACHE_KEY, INDEX_CACHE_TIMEOUT,
+                        BLOG_DETAIL_CACHE_KEY, BLOG_DETAIL_CACHE_TIMEOUT, load_index_page, load_blog_detail)
+
+    config = current_app.config
+    comment_timeout = config['COMMENT_HEAD_CACHE_TIMEOUT']
+    jobs = []
+    for page in range(1, min(config['CACHE_WARM_INDEX_PAGES'], INDEX_CACHED_PAGES) + 1):
+        jobs.append(('index', partial(warm_cache, INDEX_CACHE_KEY.format(page=page), partial(load_index_page, page),
+                                      INDEX_CACHE_TIMEOUT, _min_ttl(INDEX_CACHE_TIMEOUT))))
+    for blog_id in get_hot_blog_ids(config['CACHE_WARM_TOP_POSTS']):
+        jobs.append(('blogs', partial(warm_cache, BLOG_DETAIL_CACHE_KEY.format(blog_id=blog_id),
+                                      partial(load_blog_detail, blog_id), BLOG_DETAIL_CACHE_TIMEOUT,
+                                      _min_ttl(BLOG_DETAIL_CACHE_TIMEOUT))))
+        jobs.append(('comments', partial(warm_cache, COMMENT_HEAD_CACHE_KEY.format(blog_id=blog_id),
+                                         partial(load_comment_head, blog_id), comment_timeout,
+                                         _min_ttl(comment_timeout))))
+    search_min_ttl = _min_ttl(config['SEARCH_CACHE_TIMEOUT'])
+    for q in get_popular_searches(config['CACHE_WARM_TOP_SEARCHES']):
+        jobs.append(('searches', partial(warm_search, q, PER_PAGE, search_min_ttl)))
+    return jobs
+
+
+def _run_job(app, job):
+    # 每个线程使用独立的应用上下文与数据库会话；刚发布的博客可能尚未复制到副本，预热只读主库
+    with app.app_context():
+        use_primary(db)
+        return job()
+
+
+def warm_caches():
+    """
+    执行一次缓存预热
+    返回:
+        dict: 各类别重建的条目数，以及失败数（failed）
+    """
+    config = current_app.config
+    # 此后的缓存清理会重新投递预热任务
+    redis_client.delete(WARM_SCHEDULED_KEY)
+    app = current_app._get_current_object()
+    counts = Counter()
+    with ThreadPoolExecutor(max_workers=config['CACHE_WARM_CONCURRENCY'],
+                            thread_name_prefix='cache-warm') as executor:
+        futures = [(kind, executor.submit(_run_job, app, job)) for kind, job in _warm_jobs()]
+        for kind, future in futures:
+            try:
+                if future.result():
+                    counts[kind] += 1
+            except Exception as e:
+                # 热门排行中的博客可能已被删除
+                current_app.logger.warning(f'缓存预热失败（{kind}）: {e!r}')
+                counts['failed'] += 1
+    current_app.logger.info(f'缓存预热完成: {dict(counts)}')
+    return dict(counts)
+
+
+def schedule_cache_warm():
+    """清理缓存后调用：延迟 CACHE_WARM_DELAY 秒投递预热任务，期间的多次清理只预热一次"""
+    config = current_app.config
+    if not config['CACHE_WARM_ON_INVALIDATE']:
+        return
+    if redis_client.set(WARM_SCHEDULED_KEY, 1, nx=True, ex=WARM_SCHEDULED_TTL):
+        from celery_app import warm_cache_task
+        warm_cache_task.apply_async(countdown=config['CACHE_WARM_DELAY'])
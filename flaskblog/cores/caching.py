@@ -0,0 +1,152 @@
+# cores/caching.py
+"""
+缓存辅助工具
+CachedPagination：可序列化的分页对象，用于把分页结果存入 Redis 缓存
+cached_fetch：带防击穿保护（单飞重建、过期旧值、概率提前刷新）的缓存读取
+warm_cache：缓存预热，与 cached_fetch 共用重建锁
+"""
+import math
+import random
+import time
+
+from flask import current_app
+from flask_sqlalchemy.pagination import Pagination
+from redis.exceptions import LockError
+
+from exts import cache, redis_client
+from .near_cache import near_cache
+
+# 冷启动等待其他请求重建时的轮询间隔（秒）
+CACHE_WAIT_INTERVAL = 0.05
+
+
+class CachedPagination(Pagination):
+    """
+    已查询完成的分页对象
+    QueryPagination 持有查询与数据库会话，无法 pickle；
+    本类只保存当前页数据与总数，接口与模板中使用的分页对象保持一致
+    """
+
+    def _query_items(self):
+        return self._query_args['items']
+
+    def _query_count(self):
+        return self._query_args['total']
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # items 与 total 已保存在实例属性中，无需重复序列化
+        state['_query_args'] = {}
+        return state
+
+    @classmethod
+    def from_pagination(cls, pagination):
+        """将数据库分页对象转换为可缓存的分页对象，列表中的模型实例需提前加载好模板用到的关联"""
+        return cls(
+            page=pagination.page,
+            per_page=pagination.per_page,
+            max_per_page=None,
+            error_out=False,
+            items=list(pagination.items),
+            total=pagination.total,
+        )
+
+
+# 缓存条目中保存的元数据：值、逻辑过期时间、上次重建耗时
+_VALUE, _EXPIRES, _DELTA = 'value', 'expires', 'delta'
+LOCK_KEY = 'lock:{key}'
+
+
+def _store(key, value, timeout, delta):
+    """逻辑过期时间为 timeout，实际在 Redis 中多保留 CACHE_STALE_TTL 秒，用于过期后继续提供旧值"""
+    entry = {_VALUE: value, _EXPIRES: time.time() + timeout, _DELTA: delta}
+    near_cache.set(key, entry, timeout=timeout + current_app.config['CACHE_STALE_TTL'])
+
+
+def _acquire_lock(key):
+    """
+    获取重建锁，已被其他请求持有时返回 None
+    锁的值是随机令牌，释放时比较后删除（Lua 脚本）：重建超过 CACHE_LOCK_TIMEOUT 时锁已过期，
+    此时释放不会删除下一个持有者的锁
+    """
+    lock = redis_client.lock(LOCK_KEY.format(key=key), timeout=current_app.config['CACHE_LOCK_TIMEOUT'])
+    return lock if lock.acquire(blocking=False) else None
+
+
+def _release_lock(lock):
+    try:
+        lock.release()
+    except LockError:
+        current_app.logger.warning(f'缓存重建超过 CACHE_LOCK_TIMEOUT，锁已过期: {lock.name}')
+
+
+def _recompute(key, compute, timeout):
+    start = time.time()
+    value = compute()
+    _store(key, value, timeout, time.time() - start)
+    current_app.logger.info(f'缓存已重建: {key}')
+    return value
+
+
+def cached_fetch(key, compute, timeout):
+    """
+    带防击穿保护的缓存读取
+    作用:
+        1. 单飞重建：同一时间只有获得 Redis 锁的请求执行 compute，其余请求不会同时查询数据库
+        2. 过期后仍可读旧值：逻辑过期后，未获得锁的请求直接返回旧值（stale-while-revalidate）
+        3. 概率提前刷新：按上次重建耗时，在临近过期时以逐渐增大的概率提前重建（XFetch），分散重建时间
+        4. 冷启动时未获得锁的请求短暂等待重建结果，超时后自行查询
+    参数:
+        key: 缓存键
+        compute: 缓存未命中时计算值的函数，值必须可以 pickle
+        timeout: 逻辑过期时间（秒）
+    """
+    config = current_app.config
+    entry = near_cache.get(key)
+    now = time.time()
+    if entry is not None:
+        # XFetch：delta * beta * -ln(random) 为随机的提前量，重建越慢越早开始
+        early = entry[_DELTA] * config['CACHE_EARLY_REFRESH_BETA'] * -math.log(random.random() or 1e-12)
+        if now + early < entry[_EXPIRES]:
+            return entry[_VALUE]
+
+    lock = _acquire_lock(key)
+    if lock is not None:
+        try:
+            return _recompute(key, compute, timeout)
+        finally:
+            _release_lock(lock)
+
+    # 其他请求正在重建
+    if entry is not None:
+        return entry[_VALUE]
+    deadline = now + config['CACHE_LOCK_TIMEOUT']
+    while time.time() < deadline:
+        time.sleep(CACHE_WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[_VALUE]
+        if not redis_client.exists(LOCK_KEY.format(key=key)):
+            break
+    # 持锁的请求失败或超时，自行计算
+    return _recompute(key, compute, timeout)
+
+
+def warm_cache(key, compute, timeout, min_ttl=0):
+    """
+    预热缓存：条目不存在，或距逻辑过期不足 min_ttl 秒时重建
+    与 cached_fetch 共用重建锁，已有请求正在重建时跳过
+    返回:
+        bool: 是否重建
+    """
+    entry = cache.get(key)
+    if entry is not None and entry[_EXPIRES] - time.time() > min_ttl:
+        return False
+    lock = _acquire_lock(key)
+    if lock is None:
+        return False
+    try:
+        _recompute(key, compute, timeout)
+    finally:
+        _release_lock(lock)
+    return True
@@ -0,0 +1,147 @@
+# cores/commands.py
+"""
+flask 命令行工具
+    flask content import：批量导入用户、博客与评论
+    flask content export：流式导出用户、博客与评论
+    flask content rebuild-tags：根据博客的标签文本重建标签索引与文章数
+    flask content rebuild-suggest：重建搜索联想索引
+    flask content build-feeds：全量生成 RSS / Atom 订阅与 sitemap
+    flask users rebuild-email-filter：根据 user 表重建已注册邮箱的布隆过滤器
+    flask perf explain：对所有查询路径执行 EXPLAIN，标记全表扫描与文件排序
+    flask perf warm：预热首页、热门博客与热门搜索的缓存（部署后执行）
+"""
+import os
+
+import click
+from flask.cli import AppGroup
+
+content_cli = AppGroup('content', help='博客内容的批量导入导出')
+users_cli = AppGroup('users', help='用户管理')
+perf_cli = AppGroup('perf', help='性能诊断工具')
+
+
+@content_cli.command('import')
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--chunk-size', default=1000, show_default=True, help='每批插入的行数')
+@click.option('--author-email', default=None, help='Markdown 文件未指定作者时使用的用户邮箱')
+def import_content(path, chunk_size, author_email):
+    """从 JSONL 文件或 Markdown 目录导入数据"""
+    from .importer import BulkImporter, iter_jsonl, iter_markdown_dir
+
+    records = iter_markdown_dir(path) if os.path.isdir(path) else iter_jsonl(path)
+    try:
+        importer = BulkImporter(chunk_size=chunk_size, default_author_email=author_email)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    try:
+        with click.progressbar(records, label='导入中') as bar:
+            for record in bar:
+                importer.add(record)
+        counts = importer.finish()
+    finally:
+        # 中途出错时立即恢复写入，不等标志过期
+        importer.release()
+    click.echo(f"导入完成：用户 {counts['users']}，博客 {counts['posts']}，评论 {counts['comments']}，"
+               f"跳过 {counts['skipped']}")
+
+
+@content_cli.command('export')
+@click.argument('table', type=click.Choice(['users', 'blogs', 'comments']))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), default='jsonl', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='使用 gzip 压缩')
+@click.option('--output', '-o', type=click.Path(), default=None, help='输出文件，默认按表名生成')
+@click.option('--batch-size', default=1000, show_default=True, help='每次从数据库读取的行数')
+def export_content(table, fmt, compress, output, batch_size):
+    """流式导出数据，内存占用与表的大小无关"""
+    from .exporter import iter_export, export_filename
+
+    output = output or export_filename(table, fmt, compress)
+    size = 0
+    with open(output, 'wb') as f:
+        for chunk in iter_export(table, fmt, compress=compress, batch_size=batch_size):
+            f.write(chunk)
+            size += len(chunk)
+    click.echo(f"导出完成：{output}（{size} 字节）")
+
+
+@content_cli.command('rebuild-tags')
+@click.option('--batch-size', default=1000, show_default=True, help='每批处理的博客数')
+def rebuild_tags(batch_size):
+    """重建标签索引（首次升级或数据修复时使用）"""
+    from .tags import rebuild_tag_index
+
+    total = rebuild_tag_index(batch_size=batch_size)
+    click.echo(f"标签索引已重建，共处理博客 {total} 篇")
+
+
+@content_cli.command('rebuild-suggest')
+@click.option('--batch-size', default=1000, show_default=True, help='每批处理的博客数')
+def rebuild_suggest(batch_size):
+    """重建搜索联想索引"""
+    from .suggest import build_suggest_index
+
+    total = build_suggest_index(batch_size=batch_size)
+    click.echo(f"搜索联想索引已重建，共 {total} 个条目")
+
+
+@content_cli.command('build-feeds')
+def build_feeds_command():
+    """全量生成订阅与 sitemap（首次部署或修改 SITE_URL 后执行）"""
+    from .feeds import build_feeds
+
+    shards = build_feeds()
+    click.echo(f"订阅与 sitemap 已生成，共 {shards} 个博客分片")
+
+
+@users_cli.command('rebuild-email-filter')
+@click.option('--batch-size', default=1000, show_default=True, help='每批读取的用户数')
+def rebuild_email_filter(batch_size):
+    """重建已注册邮箱的布隆过滤器（调整容量、误判率或数据修复后执行）"""
+    from .email_filter import build_email_filter
+
+    total = build_email_filter(batch_size=batch_size)
+    click.echo(f"邮箱过滤器已重建，共 {total} 个邮箱")
+
+
+@perf_cli.command('explain')
+@click.option('--path', 'paths', multiple=True, help='只审计指定的查询路径，可重复指定')
+@click.option('--verbose', '-v', is_flag=True, help='输出完整的 SQL 与查询计划')
+def explain_queries(paths, verbose):
+    """审计查询计划，存在未知的全表扫描、文件排序或未捕获到语句时以非零状态退出"""
+    from .query_audit import audit_queries
+
+    results = audit_queries(set(paths) or None)
+    failed = 0
+    for result in results:
+        unknown = [finding for finding in result['findings'] if finding not in result['known']]
+        if unknown:
+            status = click.style('FAIL', fg='red')
+            failed += 1
+        elif result['findings']:
+            status = click.style('KNOWN', fg='yellow')
+        else:
+            status = click.style('OK', fg='green')
+        click.echo(f"[{status}] {result['path']:<16} {', '.join(result['findings']) or '-'}")
+        if (verbose or unknown) and result['statement']:
+            click.echo(f"    {result['statement']}")
+            for line in result['plan']:
+                click.echo(f"      {line}")
+    click.echo(f"共审计 {len(results)} 条语句，{failed} 条存在问题")
+    if failed or not results:
+        raise SystemExit(1)
+
+
+@perf_cli.command('warm')
+def warm():
+    """预热缓存，部署完成后、接入流量之前执行"""
+    from .cache_warmer import warm_caches
+
+    counts = warm_caches()
+    click.echo(f"缓存预热完成：首页 {counts.get('index', 0)}，博客 {counts.get('blogs', 0)}，"
+               f"评论 {counts.get('comments', 0)}，搜索 {counts.get('searches', 0)}，失败 {counts.get('failed', 0)}")
+
+
+def register_commands(app):
+    app.cli.add_command(content_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(perf_cli)
@@ -0,0 +1,168 @@
+# cores/comment_buffer.py
+"""
+评论缓冲写入（write-behind）
+开启 COMMENT_BUFFERED 后，publish_comment 只把评论追加到 Redis Stream 并立即返回，
+由 Celery 任务批量写入 comment 表，同一批次中每篇博客的缓存只清理一次
+    enqueue_comment：追加评论，并记录到作者自己的待写入列表中（作者刷新页面即可看到）
+    get_pending_comments：读取作者尚未写入数据库的评论
+    flush_comments：从 Stream 读取一批评论，批量插入并确认
+同一时间只有一个刷新（Redis 锁）；已停止的主机或进程读取后未确认的条目，空闲超过锁的超时时间后由 XAUTOCLAIM 接管
+"""
+import json
+import socket
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert, select
+
+from exts import db, redis_client
+from models import BlogModel, CommentModel
+
+STREAM_GROUP = 'comment_flushers'
+# 作者待写入评论的哈希：entry_id -> 评论 JSON
+PENDING_KEY = 'pending_comments_{blog_id}_{author_id}'
+PENDING_TTL = 600
+# 防抖标记：存在期间不再重复投递刷新任务，刷新开始时删除；过期时间兜底任务丢失的情况
+FLUSH_SCHEDULED_KEY = 'comment_flush_scheduled'
+FLUSH_SCHEDULED_TTL = 60
+FLUSH_LOCK = 'lock:comment_stream:flush'
+# 大于刷新任务的 time_limit：锁过期时持锁的刷新已被终止，其未确认的条目可以安全接管
+FLUSH_LOCK_TIMEOUT = 300
+
+
+def _stream_key():
+    return current_app.config['COMMENT_STREAM_KEY']
+
+
+def enqueue_comment(blog_id, author_id, comment):
+    """追加评论到 Redis Stream，返回 entry_id"""
+    create_time = datetime.now().isoformat()
+    entry_id = redis_client.xadd(_stream_key(), {
+        'blog_id': blog_id,
+        'author_id': author_id,
+        'comment': comment,
+        'create_time': create_time,
+    }, maxlen=current_app.config['COMMENT_STREAM_MAXLEN'], approximate=True)
+    entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+
+    pending_key = PENDING_KEY.format(blog_id=blog_id, author_id=author_id)
+    pipe = redis_client.pipeline()
+    pipe.hset(pending_key, entry_id, json.dumps({'comment': comment, 'create_time': create_time}))
+    pipe.expire(pending_key, PENDING_TTL)
+    # 突发评论合并为一次刷新
+    pipe.set(FLUSH_SCHEDULED_KEY, 1, nx=True, ex=FLUSH_SCHEDULED_TTL)
+    scheduled = pipe.execute()[-1]
+    if scheduled:
+        from celery_app import flush_comment_stream_task
+        flush_comment_stream_task.apply_async(countdown=current_app.config['COMMENT_FLUSH_DELAY'])
+    return entry_id
+
+
+def get_pending_comments(blog_id, author):
+    """作者自己尚未写入数据库的评论，按时间倒序，结构与模板中的评论对象一致"""
+    pending = redis_client.hgetall(PENDING_KEY.format(blog_id=blog_id, author_id=author.id))
+    comments = []
+    for value in pending.values():
+        data = json.loads(value)
+        comments.append({
+            'comment': data['comment'],
+            'create_time': datetime.fromisoformat(data['create_time']),
+            'author': {'username': author.username},
+        })
+    return sorted(comments, key=lambda c: c['create_time'], reverse=True)
+
+
+def _ensure_group(stream_key):
+    try:
+        redis_client.xgroup_create(stream_key, STREAM_GROUP, id='0', mkstream=True)
+    except Exception as e:
+        # 消费组已存在
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def flush_comments(batch_size=None):
+    """
+    批量写入缓冲的评论
+    先接管已停止的消费者遗留的条目，再处理本消费者之前读取但未确认的条目（进程崩溃后恢复），最后读取新条目
+    返回:
+        int: 写入的评论数
+    """
+    # 同一主机上的多个刷新使用相同的消费者名称，并发时会重复读取对方未确认的条目
+    lock = redis_client.lock(FLUSH_LOCK, timeout=FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        current_app.logger.info('评论正在由其他任务写入，跳过')
+        return 0
+    try:
+        return _flush(batch_size or current_app.config['COMMENT_FLUSH_BATCH'])
+    finally:
+        lock.release()
+
+
+def _flush(batch_size):
+    from .blogs import clear_comment_cache_many
+
+    stream_key = _stream_key()
+    consumer = socket.gethostname()
+    _ensure_group(stream_key)
+    # 此后追加的评论会重新投递刷新任务
+    redis_client.delete(FLUSH_SCHEDULED_KEY)
+    _claim_stale(stream_key, consumer, batch_size)
+
+    written = 0
+    for start_id in ('0', '>'):
+        while True:
+            response = redis_client.xreadgroup(STREAM_GROUP, consumer, {stream_key: start_id}, count=batch_size)
+            entries = response[0][1] if response else []
+            if not entries:
+                break
+            written += _write_batch(stream_key, entries, clear_comment_cache_many)
+            if len(entries) < batch_size:
+                break
+    return written
+
+
+def _claim_stale(stream_key, consumer, batch_size):
+    """把其他消费者读取后空闲超过 FLUSH_LOCK_TIMEOUT 的条目转到本消费者，随后按未确认条目处理"""
+    while True:
+        claimed = redis_client.xautoclaim(stream_key, STREAM_GROUP, consumer, FLUSH_LOCK_TIMEOUT * 1000,
+                                          start_id='0-0', count=batch_size, justid=True)
+        if len(claimed) < batch_size:
+            break
+
+
+def _write_batch(stream_key, entries, clear_comment_cache_many):
+    rows = []
+    pending = {}
+    for entry_id, fields in entries:
+        if not fields:
+            # 已被 MAXLEN 裁剪的条目只剩ID，确认后跳过
+            continue
+        fields = {k.decode(): v.decode() for k, v in fields.items()}
+        rows.append({
+            'comment': fields['comment'],
+            'create_time': datetime.fromisoformat(fields['create_time']),
+            'blog_id': int(fields['blog_id']),
+            'author_id': int(fields['author_id']),
+        })
+        pending.setdefault(PENDING_KEY.format(**fields), []).append(entry_id)
+
+    # 丢弃指向不存在博客的评论，避免外键错误导致整批失败
+    blog_ids = {row['blog_id'] for row in rows}
+    existing = set(db.session.scalars(select(BlogModel.id).where(BlogModel.id.in_(blog_ids))))
+    rows = [row for row in rows if row['blog_id'] in existing]
+    if rows:
+        db.session.execute(insert(CommentModel), rows)
+    db.session.commit()
+
+    pipe = redis_client.pipeline()
+    pipe.xack(stream_key, STREAM_GROUP, *[entry_id for entry_id, _ in entries])
+    pipe.xdel(stream_key, *[entry_id for entry_id, _ in entries])
+    for key, entry_ids in pending.items():
+        pipe.hdel(key, *entry_ids)
+    pipe.execute()
+
+    # 每篇博客只清理一次缓存
+    clear_comment_cache_many({row['blog_id'] for row in rows})
+    current_app.logger.info(f'批量写入{len(rows)}条评论，涉及{len(existing)}篇博客')
+    return len(rows)
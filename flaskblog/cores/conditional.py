@@ -0,0 +1,130 @@
+# cores/conditional.py
+"""
+条件请求（ETag / Last-Modified）
+页面版本保存在 Redis 中，校验时不查询数据库、不渲染模板：
+    page_version:blog:<id>   哈希：content（标题与正文的哈希）、modified（记录版本的时间戳）；
+                             评论通过接口异步加载，不影响详情页的版本
+    page_version:listing     最近一次发布博客的时间戳（首页、标签页）
+    conditional：视图装饰器，版本未变化时直接返回 304，并为匿名与登录用户设置不同的缓存策略
+    ensure_blog_version：渲染详情页时记录博客版本（不存在时）
+    touch_listing_version：发布博客时更新版本
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, request, session, make_response
+from werkzeug.http import is_resource_modified
+
+from exts import redis_client
+
+BLOG_VERSION_KEY = 'page_version:blog:{blog_id}'
+LISTING_VERSION_KEY = 'page_version:listing'
+
+
+def ensure_blog_version(blog):
+    """详情页渲染后调用：版本不存在时按当前内容初始化，已存在的字段不覆盖"""
+    content_hash = hashlib.sha1(f'{blog.title}\x00{blog.content}'.encode('utf-8')).hexdigest()[:16]
+    key = BLOG_VERSION_KEY.format(blog_id=blog.id)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hsetnx(key, 'content', content_hash)
+    pipe.hsetnx(key, 'modified', time.time())
+    pipe.execute()
+
+
+def touch_listing_version():
+    """发布或导入了博客"""
+    redis_client.set(LISTING_VERSION_KEY, time.time())
+
+
+def blog_version(blog_id, **kwargs):
+    """(版本标识, 最后修改时间戳)，尚未记录时返回 None"""
+    content, modified = redis_client.hmget(BLOG_VERSION_KEY.format(blog_id=blog_id), 'content', 'modified')
+    if content is None or modified is None:
+        return None
+    return content.decode(), float(modified)
+
+
+def listing_version(**kwargs):
+    """首页与标签页共用的版本，不存在时初始化为当前时间"""
+    version = redis_client.get(LISTING_VERSION_KEY)
+    if version is None:
+        now = time.time()
+        # 并发初始化时以先写入的为准
+        redis_client.set(LISTING_VERSION_KEY, now, nx=True)
+        version = redis_client.get(LISTING_VERSION_KEY)
+    return version.decode(), float(version)
+
+
+def _etag(version):
+    """页面内容还取决于当前用户（导航栏、评论表单）与请求参数，一并计入 ETag"""
+    scope = f"u{session['user_id']}" if session.get('user_id') else 'anon'
+    raw = f"{current_app.config['PAGE_ETAG_SALT']}|{scope}|{request.full_path}|{version}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def _last_modified(version):
+    # HTTP 日期只精确到秒
+    return datetime.fromtimestamp(int(version[1]), tz=timezone.utc)
+
+
+def _set_cache_headers(response, shared_max_age):
+    # 代理需要区分登录与未登录用户
+    response.vary.add('Cookie')
+    if session.get('user_id'):
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    else:
+        # 允许前端代理缓存匿名页面，浏览器每次都需要校验
+        response.cache_control.public = True
+        response.cache_control.max_age = 0
+        response.cache_control.s_maxage = current_app.config[shared_max_age]
+
+
+def _set_validators(response, version):
+    response.set_etag(_etag(version[0]), weak=True)
+    response.last_modified = _last_modified(version)
+
+
+def conditional(version_func, shared_max_age='PAGE_SHARED_MAX_AGE', anonymous_only=False):
+    """
+    条件请求装饰器
+    参数:
+        version_func: 接收视图参数，返回 (版本标识, 最后修改时间戳) 或 None（未知，照常渲染）
+        shared_max_age: 匿名页面允许前端代理缓存的秒数对应的配置项
+        anonymous_only: 登录用户的页面包含会过期的内容（如评论表单的 CSRF 令牌）时为 True，
+                        此时只为匿名用户校验，登录用户每次都重新渲染
+    作用:
+        1. 视图执行前比较 If-None-Match / If-Modified-Since，未变化时直接返回 304
+        2. 正常响应时附加 ETag、Last-Modified，以及按是否登录区分的 Cache-Control 与 Vary
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if anonymous_only and session.get('user_id'):
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    _set_cache_headers(response, shared_max_age)
+                return response
+
+            version = version_func(*args, **kwargs)
+            if version is not None and not is_resource_modified(
+                    request.environ, etag=_etag(version[0]), last_modified=_last_modified(version)):
+                response = current_app.response_class(status=304)
+                _set_validators(response, version)
+                _set_cache_headers(response, shared_max_age)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                # 视图可能刚刚初始化了版本
+                version = version or version_func(*args, **kwargs)
+                if version is not None:
+                    _set_validators(response, version)
+                _set_cache_headers(response, shared_max_age)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,77 @@
+# cores/db_routing.py
+"""
+数据库读写分离
+只读查询（SELECT）路由到 DB_REPLICA_BINDS 中配置的只读副本，写入与事务内写入之后的查询使用主库
+
+配置示例（config.py）：
+    SQLALCHEMY_BINDS = {
+        'replica1': {'url': 'mysql+pymysql://...@replica1/FalskBlog', 'pool_size': 10, 'pool_recycle': 3600},
+    }
+    DB_REPLICA_BINDS = ['replica1']
+    DB_STICKY_SECONDS = 5
+"""
+import random
+import time
+
+from flask import current_app, has_app_context, session as web_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+# 会话 info 中的标记：为 True 时所有查询都走主库
+USE_PRIMARY = 'use_primary'
+# Cookie 会话中的键：在该时间戳之前，该用户的查询都走主库（读己之写）
+STICKY_SESSION_KEY = 'db_primary_until'
+
+
+class RoutingSession(Session):
+    """根据语句类型选择主库或只读副本的会话"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._should_use_replica(clause):
+            replicas = [self._db.engines[key] for key in current_app.config['DB_REPLICA_BINDS']
+                        if key in self._db.engines]
+            if replicas:
+                return random.choice(replicas)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _should_use_replica(self, clause):
+        if not has_app_context() or not current_app.config.get('DB_REPLICA_BINDS'):
+            return False
+        # 刷新（写入）时、显式要求主库时，或本会话已经写过数据后，都使用主库
+        if self._flushing or self.info.get(USE_PRIMARY):
+            return False
+        # 只有不加锁的 SELECT 可以走只读副本
+        return isinstance(clause, Select) and clause._for_update_arg is None
+
+    def flush(self, objects=None):
+        # 写入之后，同一会话中的查询都使用主库，保证事务内读到自己的写入
+        # 每次查询前的自动刷新没有待写数据时不会切换
+        if not self._is_clean():
+            self.info[USE_PRIMARY] = True
+        super().flush(objects)
+
+
+def use_primary(db):
+    """当前会话后续的所有查询都使用主库（如批量导入前读取最大主键）"""
+    db.session.info[USE_PRIMARY] = True
+
+
+def stick_to_primary():
+    """
+    写入后调用：在 DB_STICKY_SECONDS 秒内，该用户的请求都读主库，
+    避免副本复制延迟导致用户看不到自己刚发布的内容
+    """
+    seconds = current_app.config.get('DB_STICKY_SECONDS', 0)
+    if seconds and current_app.config.get('DB_REPLICA_BINDS'):
+        web_session[STICKY_SESSION_KEY] = time.time() + seconds
+
+
+def apply_sticky_routing(db):
+    """请求开始时调用：处于读己之写窗口内的用户使用主库"""
+    until = web_session.get(STICKY_SESSION_KEY)
+    if until is None:
+        return
+    if until > time.time():
+        use_primary(db)
+    else:
+        web_session.pop(STICKY_SESSION_KEY, None)
@@ -0,0 +1,145 @@
+# cores/email_filter.py
+"""
+已注册邮箱的布隆过滤器
+发送验证码、注册时检查邮箱是否已注册，先查询 Redis 中的布隆过滤器：
+判定不存在时一定未注册，直接跳过数据库（随机邮箱的机器人请求都在这里结束）；判定可能存在时再查询数据库
+    位图保存在 Redis 字符串中，键名包含位数与哈希函数个数，调整 EMAIL_BLOOM_CAPACITY / EMAIL_BLOOM_ERROR_RATE 后
+    旧的位图不再使用；位图不存在（尚未构建、Redis 数据丢失）时一律查询数据库，不会误判
+    build_email_filter：根据 user 表全量构建（启动时后台执行、命令行 flask users rebuild-email-filter）
+    add_email：注册成功后加入过滤器
+    email_registered：表单验证使用
+"""
+import hashlib
+import math
+import threading
+
+from flask import current_app
+from sqlalchemy import select
+
+from exts import db, redis_client
+from models import UserModel
+
+EMAIL_BLOOM_KEY = 'bloom:user_email:{bits}:{hashes}'
+EMAIL_BLOOM_BUILD_LOCK = 'lock:bloom:user_email:build'
+
+
+def _params():
+    """(位数, 哈希函数个数)，按容量与误判率计算"""
+    config = current_app.config
+    capacity, error_rate = config['EMAIL_BLOOM_CAPACITY'], config['EMAIL_BLOOM_ERROR_RATE']
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+def _key(bits, hashes):
+    return EMAIL_BLOOM_KEY.format(bits=bits, hashes=hashes)
+
+
+def _normalize(email):
+    # 大小写不同的邮箱映射到相同的位，数据库按哪种规则比较都不会漏判
+    return (email or '').strip().casefold()
+
+
+def _positions(email, bits, hashes):
+    """双重哈希：一次 blake2b 得到两个 64 位哈希值，组合出 hashes 个位置"""
+    digest = hashlib.blake2b(_normalize(email).encode('utf-8'), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:], 'big') | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+def might_contain(email):
+    """False 表示一定未注册；True 表示可能已注册（或过滤器尚未构建），需要查询数据库"""
+    bits, hashes = _params()
+    key = _key(bits, hashes)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.exists(key)
+    for position in _positions(email, bits, hashes):
+        pipe.getbit(key, position)
+    exists, *values = pipe.execute()
+    return not exists or all(values)
+
+
+def add_email(email):
+    """注册成功后调用；过滤器尚未构建时不创建（否则会把空位图当作已构建）"""
+    bits, hashes = _params()
+    key = _key(bits, hashes)
+    if not redis_client.exists(key):
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for position in _positions(email, bits, hashes):
+        pipe.setbit(key, position, 1)
+    pipe.execute()
+
+
+def email_registered(email):
+    """邮箱是否已注册"""
+    if not might_contain(email):
+        return False
+    return db.session.scalar(select(UserModel.id).filter_by(email=email).limit(1)) is not None
+
+
+def build_email_filter(batch_size=1000):
+    """
+    根据 user 表全量构建，返回邮箱数
+    位图在内存中生成后一次写入临时键，再 RENAME 替换；构建期间注册的用户在替换后补充加入
+    """
+    bits, hashes = _params()
+    key = _key(bits, hashes)
+    bitmap = bytearray((bits + 7) // 8)
+    max_id = db.session.scalar(select(db.func.max(UserModel.id))) or 0
+    total = 0
+    last_id = 0
+    while last_id < max_id:
+        batch = db.session.execute(
+            select(UserModel.id, UserModel.email)
+            .where(UserModel.id > last_id, UserModel.id <= max_id).order_by(UserModel.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        for _, email in batch:
+            # GETBIT/SETBIT 的偏移量从每个字节的最高位开始
+            for position in _positions(email, bits, hashes):
+                bitmap[position >> 3] |= 0x80 >> (position & 7)
+        total += len(batch)
+        last_id = batch[-1][0]
+
+    tmp_key = f'{key}:building'
+    pipe = redis_client.pipeline()
+    pipe.set(tmp_key, bytes(bitmap))
+    pipe.rename(tmp_key, key)
+    pipe.execute()
+    # 构建期间注册的用户可能只写入了被替换掉的旧位图；先结束读取 max_id 的事务，
+    # 否则在可重复读隔离级别（MySQL InnoDB 默认）下仍使用旧快照，看不到这些用户
+    db.session.commit()
+    for email in db.session.scalars(select(UserModel.email).where(UserModel.id > max_id)):
+        add_email(email)
+        total += 1
+    current_app.logger.info(f'邮箱布隆过滤器已构建，共{total}个邮箱，{bits}位，{hashes}个哈希函数')
+    return total
+
+
+def register_email_filter(app):
+    """
+    启动时在后台线程中构建邮箱过滤器
+    已存在（其他进程已构建）或其他进程正在构建时跳过；数据表尚未创建等错误只记录日志
+    """
+    if not app.config['EMAIL_BLOOM_BUILD_ON_STARTUP']:
+        return
+
+    def build():
+        with app.app_context():
+            try:
+                if redis_client.exists(_key(*_params())):
+                    return
+                if not redis_client.set(EMAIL_BLOOM_BUILD_LOCK, 1, nx=True, ex=600):
+                    return
+                try:
+                    build_email_filter()
+                finally:
+                    redis_client.delete(EMAIL_BLOOM_BUILD_LOCK)
+            except Exception as e:
+                app.logger.warning(f'启动时构建邮箱过滤器失败: {e}')
+
+    threading.Thread(target=build, name='email-filter-build', daemon=True).start()
@@ -0,0 +1,104 @@
+# cores/exporter.py
+"""
+流式导出用户、博客与评论（JSONL / CSV，可选 gzip 压缩）
+    iter_export：按批从数据库读取（yield_per 服务端游标），逐块生成导出内容
+所有函数都是生成器，内存占用与表的大小无关，可直接用于文件写入或 HTTP 流式响应
+"""
+import csv
+import io
+import json
+import zlib
+
+from sqlalchemy import select
+
+from exts import db
+from models import UserModel, BlogModel, CommentModel
+
+# 可导出的表：名称 -> (模型, 导出字段)；用户表不导出密码哈希
+EXPORT_TABLES = {
+    'users': (UserModel, ['id', 'username', 'email', 'join_time']),
+    'blogs': (BlogModel, ['id', 'title', 'tag', 'content', 'create_time', 'author_id', 'views', 'unique_visitors']),
+    'comments': (CommentModel, ['id', 'blog_id', 'author_id', 'comment', 'create_time']),
+}
+EXPORT_FORMATS = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# 每次从数据库读取的行数，以及合并输出块的大小
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_rows(table, batch_size=BATCH_SIZE):
+    """按主键顺序逐行读取，只查询需要的列，不构造 ORM 对象"""
+    model, fields = EXPORT_TABLES[table]
+    stmt = select(*[getattr(model, field) for field in fields]).order_by(model.id)
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for row in result:
+        yield dict(zip(fields, row))
+
+
+def _iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+
+
+def _iter_csv(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow([row[field] for field in fields])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _iter_chunks(lines, chunk_size=CHUNK_SIZE):
+    """将逐行文本合并为较大的字节块，减少写入与网络发送次数"""
+    parts = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        parts.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield b''.join(parts)
+
+
+def _iter_gzip(chunks):
+    """增量 gzip 压缩"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(table, fmt='jsonl', compress=False, batch_size=BATCH_SIZE):
+    """
+    生成导出内容
+    参数:
+        table: users / blogs / comments
+        fmt: jsonl / csv
+        compress: 是否 gzip 压缩
+    返回:
+        生成器，逐块产出 bytes
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f'不支持导出的表: {table}')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'不支持的导出格式: {fmt}')
+
+    rows = iter_rows(table, batch_size)
+    lines = _iter_jsonl(rows) if fmt == 'jsonl' else _iter_csv(rows, EXPORT_TABLES[table][1])
+    chunks = _iter_chunks(lines)
+    return _iter_gzip(chunks) if compress else chunks
+
+
+def export_filename(table, fmt, compress=False):
+    return f"{table}.{fmt}{'.gz' if compress else ''}"
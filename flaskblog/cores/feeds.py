@@ -0,0 +1,272 @@
+# cores/feeds.py
+"""
+RSS / Atom 订阅与 sitemap
+预先生成为静态文件（同时保存 gzip 压缩版本），请求时直接发送文件，不查询数据库：
+    rss.xml、atom.xml          最近发布的 FEED_SIZE 篇博客
+    sitemap.xml                sitemap 索引，列出下面的各个分片及其修改时间
+    sitemap-pages.xml          首页、热门、标签云与各标签页
+    sitemap-posts-<n>.xml      ID 在 [n * SITEMAP_SHARD_SIZE, (n + 1) * SITEMAP_SHARD_SIZE) 内的博客，
+                               分片按ID范围划分，发布新博客只改变最后一个分片
+    update_feeds：发布博客后重新生成订阅、新博客所在的分片、页面分片与索引（Celery 任务）
+    build_feeds：全量生成（批量导入后、命令行、文件不存在时）
+    send_feed：发送文件，客户端支持 gzip 时发送压缩版本，带 ETag / Last-Modified，支持 304
+"""
+import gzip
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from flask import current_app, url_for, request, send_file, abort
+from sqlalchemy import select
+
+from exts import db, redis_client
+from models import BlogModel, TagModel
+
+RSS_FILE = 'rss.xml'
+ATOM_FILE = 'atom.xml'
+SITEMAP_INDEX_FILE = 'sitemap.xml'
+SITEMAP_PAGES_FILE = 'sitemap-pages.xml'
+SITEMAP_POSTS_FILE = 'sitemap-posts-{shard}.xml'
+SITEMAP_FILE_RE = re.compile(r'^sitemap-(pages|posts-(\d+))\.xml$')
+FEED_BUILD_LOCK = 'lock:feeds:build'
+# sitemap 协议规定每个文件最多 50000 条链接
+SITEMAP_MAX_URLS = 50000
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+# ---------- 文件 ----------
+
+def _folder():
+    # 相对路径以应用目录为基准，与 send_file 一致
+    return os.path.join(current_app.root_path, current_app.config['FEED_FOLDER'])
+
+
+def _write(filename, chunks):
+    """写入文件及其 gzip 版本：先写临时文件再替换，读取方不会看到写了一半的文件"""
+    folder = _folder()
+    os.makedirs(folder, exist_ok=True)
+    data = ''.join(chunks).encode('utf-8')
+    path = os.path.join(folder, filename)
+    for target, content in ((path + '.gz', gzip.compress(data, compresslevel=9, mtime=0)), (path, data)):
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, target)
+
+
+def _remove(filename):
+    path = os.path.join(_folder(), filename)
+    for target in (path, path + '.gz'):
+        if os.path.exists(target):
+            os.remove(target)
+
+
+# ---------- 格式 ----------
+
+def _attr(value):
+    return escape(value, {'"': '&quot;'})
+
+
+def _local(dt):
+    # 数据库中保存的是服务器本地时间
+    return dt.astimezone()
+
+
+def _w3c(dt):
+    return _local(dt).isoformat(timespec='seconds')
+
+
+def _summary(blog):
+    text = _WHITESPACE_RE.sub(' ', blog.content).strip()
+    limit = current_app.config['FEED_SUMMARY_LENGTH']
+    return text if len(text) <= limit else text[:limit] + '…'
+
+
+def _url_context():
+    """Celery 任务中没有请求上下文，按 SITE_URL 生成绝对链接"""
+    return current_app.test_request_context(base_url=current_app.config['SITE_URL'])
+
+
+# ---------- 订阅 ----------
+
+def _rss(blogs):
+    config = current_app.config
+    home = url_for('blogs.index', _external=True)
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel>'
+    yield (f"<title>{escape(config['SITE_TITLE'])}</title><link>{escape(home)}</link>"
+           f"<description>{escape(config['SITE_TITLE'])}</description>"
+           f"<atom:link href=\"{_attr(url_for('blogs.rss_feed', _external=True))}\" rel=\"self\" "
+           f"type=\"application/rss+xml\"/>")
+    if blogs:
+        yield f'<lastBuildDate>{format_datetime(_local(blogs[0].create_time))}</lastBuildDate>'
+    for blog in blogs:
+        link = escape(url_for('blogs.blog_detail', blog_id=blog.id, _external=True))
+        yield (f'<item><title>{escape(blog.title)}</title><link>{link}</link>'
+               f'<guid isPermaLink="true">{link}</guid>'
+               f'<pubDate>{format_datetime(_local(blog.create_time))}</pubDate>'
+               f'<category>{escape(blog.tag)}</category>'
+               f'<description>{escape(_summary(blog))}</description></item>')
+    yield '</channel></rss>\n'
+
+
+def _atom(blogs):
+    config = current_app.config
+    home = url_for('blogs.index', _external=True)
+    updated = _w3c(blogs[0].create_time) if blogs else datetime.now(timezone.utc).isoformat(timespec='seconds')
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<feed xmlns="http://www.w3.org/2005/Atom">'
+    yield (f"<title>{escape(config['SITE_TITLE'])}</title><id>{escape(home)}</id>"
+           f"<link href=\"{_attr(home)}\"/>"
+           f"<link rel=\"self\" href=\"{_attr(url_for('blogs.atom_feed', _external=True))}\"/>"
+           f"<updated>{updated}</updated>")
+    for blog in blogs:
+        link = url_for('blogs.blog_detail', blog_id=blog.id, _external=True)
+        yield (f'<entry><title>{escape(blog.title)}</title><id>{escape(link)}</id>'
+               f'<link href="{_attr(link)}"/>'
+               f'<published>{_w3c(blog.create_time)}</published><updated>{_w3c(blog.create_time)}</updated>'
+               f'<author><name>{escape(blog.author.username)}</name></author>'
+               f'<summary>{escape(_summary(blog))}</summary></entry>')
+    yield '</feed>\n'
+
+
+def _write_feeds():
+    blogs = BlogModel.get_recent_blogs_paginated(page=1, per_page=current_app.config['FEED_SIZE']).items
+    _write(RSS_FILE, _rss(blogs))
+    _write(ATOM_FILE, _atom(blogs))
+
+
+# ---------- sitemap ----------
+
+def _urlset(urls):
+    """urls: [(链接, 修改时间或 None), ...]"""
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    for loc, lastmod in urls:
+        lastmod = f'<lastmod>{_w3c(lastmod)}</lastmod>' if lastmod else ''
+        yield f'<url><loc>{escape(loc)}</loc>{lastmod}</url>'
+    yield '</urlset>\n'
+
+
+def _write_pages():
+    """首页、热门、标签云与文章最多的标签页"""
+    urls = [(url_for(endpoint, _external=True), None) for endpoint in ('blogs.index', 'blogs.hot', 'blogs.tags')]
+    names = db.session.scalars(
+        select(TagModel.name).order_by(TagModel.post_count.desc()).limit(SITEMAP_MAX_URLS - len(urls))
+    )
+    urls.extend((url_for('blogs.tag_blogs', tag=name, _external=True), None) for name in names)
+    _write(SITEMAP_PAGES_FILE, _urlset(urls))
+
+
+def _write_posts_shard(shard):
+    """重新生成一个博客分片，分片内已没有博客时删除文件"""
+    size = current_app.config['SITEMAP_SHARD_SIZE']
+    rows = db.session.execute(
+        select(BlogModel.id, BlogModel.create_time)
+        .where(BlogModel.id >= shard * size, BlogModel.id < (shard + 1) * size).order_by(BlogModel.id)
+    ).all()
+    filename = SITEMAP_POSTS_FILE.format(shard=shard)
+    if not rows:
+        _remove(filename)
+        return
+    _write(filename, _urlset((url_for('blogs.blog_detail', blog_id=blog_id, _external=True), create_time)
+                             for blog_id, create_time in rows))
+
+
+def _shard_sort_key(match):
+    return (0, 0) if match.group(1) == 'pages' else (1, int(match.group(2)))
+
+
+def _write_index():
+    """按目录中现有的分片文件生成索引，分片的修改时间即文件的修改时间"""
+    folder = _folder()
+    matches = [match for match in map(SITEMAP_FILE_RE.match, os.listdir(folder)) if match]
+    entries = []
+    for match in sorted(matches, key=_shard_sort_key):
+        filename = match.group(0)
+        modified = datetime.fromtimestamp(os.path.getmtime(os.path.join(folder, filename)), tz=timezone.utc)
+        loc = url_for('blogs.sitemap_shard', filename=filename, _external=True)
+        entries.append(f'<sitemap><loc>{escape(loc)}</loc>'
+                       f'<lastmod>{modified.isoformat(timespec="seconds")}</lastmod></sitemap>')
+    _write(SITEMAP_INDEX_FILE, [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+        *entries,
+        '</sitemapindex>\n',
+    ])
+
+
+# ---------- 生成 ----------
+
+def build_feeds():
+    """全量生成订阅与 sitemap，返回博客分片数"""
+    size = current_app.config['SITEMAP_SHARD_SIZE']
+    with _url_context():
+        _write_feeds()
+        _write_pages()
+        max_id = db.session.scalar(select(db.func.max(BlogModel.id))) or 0
+        shards = range(max_id // size + 1) if max_id else range(0)
+        for shard in shards:
+            _write_posts_shard(shard)
+        # 删除超出范围的旧分片
+        for match in filter(None, map(SITEMAP_FILE_RE.match, os.listdir(_folder()))):
+            if match.group(2) and int(match.group(2)) not in shards:
+                _remove(match.group(0))
+        _write_index()
+    current_app.logger.info(f'订阅与 sitemap 已生成，共{len(shards)}个博客分片')
+    return len(shards)
+
+
+def update_feeds(blog_id):
+    """发布博客后增量更新；尚未全量生成过时改为全量生成"""
+    if not os.path.exists(os.path.join(_folder(), SITEMAP_INDEX_FILE)):
+        build_feeds()
+        return
+    with _url_context():
+        _write_feeds()
+        # 新博客可能带来新的标签
+        _write_pages()
+        _write_posts_shard(blog_id // current_app.config['SITEMAP_SHARD_SIZE'])
+        _write_index()
+
+
+def schedule_feed_update(blog_id=None):
+    """投递更新任务，不指定 blog_id 时全量生成"""
+    from celery_app import update_feeds_task
+    update_feeds_task.delay(blog_id)
+
+
+# ---------- 发送 ----------
+
+def _build_missing():
+    """首次部署或文件被清理：由一个请求全量生成，其他请求在此期间返回 503"""
+    if not redis_client.set(FEED_BUILD_LOCK, 1, nx=True, ex=600):
+        abort(503)
+    try:
+        build_feeds()
+    finally:
+        redis_client.delete(FEED_BUILD_LOCK)
+
+
+def send_feed(filename, mimetype):
+    """发送预先生成的文件；ETag 与 Last-Modified 由文件的修改时间与大小生成"""
+    folder = _folder()
+    path = os.path.join(folder, filename)
+    if not os.path.exists(path):
+        # 索引存在说明已经生成过，请求的分片确实不存在
+        if os.path.exists(os.path.join(folder, SITEMAP_INDEX_FILE)):
+            abort(404)
+        _build_missing()
+        if not os.path.exists(path):
+            abort(404)
+    gzipped = request.accept_encodings['gzip'] > 0
+    response = send_file(path + '.gz' if gzipped else path, mimetype=mimetype, conditional=True,
+                         max_age=current_app.config['FEED_MAX_AGE'])
+    if gzipped:
+        response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -1,7 +1,7 @@
 import wtforms
 from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms.validators import Email, Length, EqualTo, InputRequired
-from models import UserModel
+from .email_filter import email_registered
 
 
 # form：验证前端提交的表单数据是否符合要求
@@ -14,22 +14,18 @@ class RegisterForm(wtforms.Form):
     password = wtforms.StringField(validators=[Length(min=6, max=20, message='密码格式错误！大于3，小于20')])
     password_confirm = wtforms.StringField(validators=[EqualTo('password', message='两次密码不一致')])
 
-    # 自定义表单验证，邮箱是否被注册
+    # 自定义表单验证，邮箱是否被注册（先查布隆过滤器，可能已注册时才查询数据库）
     def validate_email(self, field):
-        email = field.data
-        user = UserModel.query.filter_by(email=email).first()
-        if user:
+        if email_registered(field.data):
             raise wtforms.ValidationError(message='邮箱已被注册')
 
 
 class EmailForm(wtforms.Form):
     email = wtforms.StringField(validators=[Email(message='邮箱格式错误')])
 
-    # 注册时（发送验证码），检测邮箱是否被注册
+    # 注册时（发送验证码），检测邮箱是否被注册；随机邮箱在布隆过滤器处即可判定，不查询数据库
     def validate_email(self, field):
-        email = field.data
-        user = UserModel.query.filter_by(email=email).first()
-        if user:
+        if email_registered(field.data):
             raise wtforms.ValidationError(message='邮箱已被注册')
 
 
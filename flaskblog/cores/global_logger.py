@@ -14,15 +14,28 @@ def setup_global_logging(app):
 
     @app.after_request
     def log_request_end(response):
-        duration = time.time() - g.get('start_time', time.time())
+        start_time = g.get('start_time', time.time())
         user_info = f"用户ID: {g.get('user').id}" if g.get('user') else "未登录用户"
-        app.logger.info(
-            f"[请求结束] {user_info} | {request.method} {request.url} | 状态码: {response.status_code} | 耗时: {duration:.4f}秒")
+        # 查询统计由 cores/query_monitor.py 记录
+        stats = g.get('query_stats')
+        message = f"[请求结束] {user_info} | {request.method} {request.url} | 状态码: {response.status_code} | "
+
+        def log():
+            duration = time.time() - start_time
+            query_info = f" | {stats.summary()}" if stats else ""
+            app.logger.info(f"{message}耗时: {duration:.4f}秒{query_info}")
+
+        if response.is_streamed:
+            # 流式响应在发送响应体时才渲染模板，发送完毕后再记录耗时与查询
+            response.call_on_close(log)
+        else:
+            log()
         return response
 
     @app.teardown_request
     def log_request_exception(exception):
-        if exception:
+        # GeneratorExit：客户端在流式响应发送完毕前断开连接，不是错误
+        if exception and not isinstance(exception, GeneratorExit):
             duration = time.time() - g.get('start_time', time.time())
             user_info = f"用户ID: {g.get('user').id}" if g.get('user') else "未登录用户"
             app.logger.error(
@@ -0,0 +1,254 @@
+# cores/importer.py
+"""
+批量导入用户、博客与评论（用于从旧平台迁移数据）
+    iter_jsonl：逐行读取 JSONL 文件
+    iter_markdown_dir：读取 Markdown 文件目录，每个文件为一篇博客
+    BulkImporter：按块批量插入，导入结束后统一刷新缓存
+
+JSONL 每行一条记录，通过 type 区分，引用关系使用源平台的 id：
+    {"type": "user", "id": "u1", "username": "...", "email": "...", "password": "<可选，密码哈希>"}
+    {"type": "post", "id": "p1", "author_id": "u1", "title": "...", "tag": "...", "content": "..."}
+    {"type": "comment", "blog_id": "p1", "author_id": "u1", "comment": "..."}
+记录必须按 用户 -> 博客 -> 评论 的依赖顺序出现；博客也可以用 author_email 引用已存在的用户
+导入按预先分配的主键写入用户与博客，导入期间设置 IMPORT_LOCK：注册与发布博客返回 503，同一时间只能有一个导入
+"""
+import json
+import os
+import secrets
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+
+from exts import db, redis_client
+from models import UserModel, UserProfileModel, BlogModel, CommentModel
+from .render import render_markdown
+from .db_routing import use_primary
+from .tags import link_tags, recount_tags, clear_tag_cache, get_tag_names
+from .suggest import build_suggest_index
+
+IMPORT_LOCK = 'lock:content_import'
+# 每次写入后续期，导入进程异常退出时标志在该时间后失效
+IMPORT_LOCK_TIMEOUT = 600
+# 预先分配的主键在当前最大值之后留出的间隔：设置标志时已通过检查、尚未写入的请求使用间隔内的主键
+IMPORT_ID_GAP = 100
+
+
+def import_in_progress():
+    """是否有导入正在进行，注册与发布博客在此期间返回 503"""
+    return bool(redis_client.exists(IMPORT_LOCK))
+
+
+def iter_jsonl(path):
+    """逐行读取 JSONL 文件，内存占用与文件大小无关"""
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f'第{line_no}行不是合法的 JSON: {e}')
+
+
+def iter_markdown_dir(path):
+    """
+    读取目录下的 .md 文件，每个文件生成一条博客记录
+    文件开头可以使用 --- 包裹的头部信息：title、tag、author（邮箱）、date
+    """
+    for name in sorted(os.listdir(path)):
+        if not name.endswith('.md'):
+            continue
+        with open(os.path.join(path, name), encoding='utf-8') as f:
+            text = f.read()
+        meta = {}
+        if text.startswith('---\n'):
+            header, _, text = text[4:].partition('\n---\n')
+            for line in header.splitlines():
+                key, sep, value = line.partition(':')
+                if sep:
+                    meta[key.strip()] = value.strip()
+        record = {
+            'type': 'post',
+            'id': name,
+            'title': meta.get('title') or os.path.splitext(name)[0],
+            'tag': meta.get('tag', ''),
+            'content': text.strip(),
+        }
+        if meta.get('author'):
+            record['author_email'] = meta['author']
+        if meta.get('date'):
+            record['create_time'] = meta['date']
+        yield record
+
+
+def _parse_time(value):
+    if not value:
+        return datetime.now()
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    return datetime.fromisoformat(value)
+
+
+class BulkImporter:
+    """
+    批量导入器
+    作用:
+        1. 预先分配主键，按块使用 INSERT ... VALUES 批量写入，不经过 ORM 单行提交
+        2. 导入时预先渲染 Markdown 为 HTML
+        3. 导入结束后统一重新计算标签文章数、刷新缓存，而不是每行调用 clear_blog_cache
+    主键按导入开始时的最大值（加上 IMPORT_ID_GAP）顺延分配，导入期间的写入由 IMPORT_LOCK 阻止；
+    finish 释放标志，导入中途出错时由调用方调用 release
+    """
+
+    def __init__(self, chunk_size=1000, default_author_email=None):
+        self.chunk_size = chunk_size
+        self.default_author_email = default_author_email
+        self._buffers = {UserModel: [], UserProfileModel: [], BlogModel: [], CommentModel: []}
+        # 博客写入后再建立标签关联：[(blog_id, create_time, tag_text), ...]
+        self._tag_entries = []
+        # 源平台 id -> 新 id
+        self._user_ids = {}
+        self._blog_ids = {}
+        self._email_ids = {}
+        self._next_ids = {}
+        self._touched_blogs = set()
+        self._touched_tags = set()
+        self.counts = {'users': 0, 'posts': 0, 'comments': 0, 'skipped': 0}
+        # 未提供密码的用户共用一个随机密码哈希，需要通过找回密码重新设置
+        self._placeholder_password = None
+        # 主键分配与邮箱查重必须读取主库
+        use_primary(db)
+        self._lock = redis_client.lock(IMPORT_LOCK, timeout=IMPORT_LOCK_TIMEOUT)
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError('另一个导入正在进行')
+
+    def _allocate_id(self, model):
+        if model not in self._next_ids:
+            self._next_ids[model] = (db.session.scalar(select(func.max(model.id))) or 0) + 1 + IMPORT_ID_GAP
+        new_id = self._next_ids[model]
+        self._next_ids[model] += 1
+        return new_id
+
+    def _lookup_email(self, email):
+        if email not in self._email_ids:
+            self._email_ids[email] = db.session.scalar(select(UserModel.id).filter_by(email=email))
+        return self._email_ids[email]
+
+    def _resolve_author(self, record):
+        if record.get('author_id') is not None:
+            return self._user_ids.get(str(record['author_id']))
+        email = record.get('author_email') or self.default_author_email
+        return self._lookup_email(email) if email else None
+
+    def add(self, record):
+        """添加一条记录，缓冲区满时自动写入"""
+        handler = {'user': self._add_user, 'post': self._add_post, 'comment': self._add_comment}.get(record.get('type'))
+        if handler is None or not handler(record):
+            self.counts['skipped'] += 1
+        if sum(len(rows) for rows in self._buffers.values()) >= self.chunk_size:
+            self.flush()
+
+    def _add_user(self, record):
+        email = record.get('email')
+        if not email or self._lookup_email(email):
+            # 邮箱已存在时复用已有用户
+            if email:
+                self._user_ids[str(record.get('id', email))] = self._email_ids[email]
+            return False
+        password = record.get('password')
+        if not password:
+            if self._placeholder_password is None:
+                self._placeholder_password = generate_password_hash(secrets.token_urlsafe(32))
+            password = self._placeholder_password
+        user_id = self._allocate_id(UserModel)
+        self._user_ids[str(record.get('id', email))] = user_id
+        self._email_ids[email] = user_id
+        self._buffers[UserModel].append({
+            'id': user_id,
+            'username': record.get('username') or email.split('@')[0],
+            'password': password,
+            'email': email,
+            'join_time': _parse_time(record.get('join_time')),
+        })
+        self._buffers[UserProfileModel].append({'user_id': user_id})
+        self.counts['users'] += 1
+        return True
+
+    def _add_post(self, record):
+        author_id = self._resolve_author(record)
+        if not author_id or not record.get('title') or not record.get('content'):
+            return False
+        blog_id = self._allocate_id(BlogModel)
+        if record.get('id') is not None:
+            self._blog_ids[str(record['id'])] = blog_id
+        row = {
+            'id': blog_id,
+            'title': record['title'][:50],
+            'tag': (record.get('tag') or '')[:100],
+            'content': record['content'],
+            'content_html': render_markdown(record['content']),
+            'create_time': _parse_time(record.get('create_time')),
+            'author_id': author_id,
+        }
+        self._buffers[BlogModel].append(row)
+        self._tag_entries.append((blog_id, row['create_time'], row['tag']))
+        self.counts['posts'] += 1
+        return True
+
+    def _add_comment(self, record):
+        blog_id = self._blog_ids.get(str(record.get('blog_id')))
+        author_id = self._resolve_author(record)
+        if not blog_id or not author_id or not record.get('comment'):
+            return False
+        self._buffers[CommentModel].append({
+            'comment': record['comment'],
+            'create_time': _parse_time(record.get('create_time')),
+            'blog_id': blog_id,
+            'author_id': author_id,
+        })
+        self._touched_blogs.add(blog_id)
+        self.counts['comments'] += 1
+        return True
+
+    def flush(self):
+        """按外键依赖顺序写入缓冲区中的数据并提交"""
+        for model, rows in self._buffers.items():
+            if rows:
+                db.session.execute(insert(model), rows)
+                rows.clear()
+        if self._tag_entries:
+            # 文章数在导入结束时统一重新计算
+            self._touched_tags.update(link_tags(self._tag_entries))
+            self._tag_entries = []
+        db.session.commit()
+        self._lock.reacquire()
+
+    def finish(self):
+        """写入剩余数据，并统一刷新缓存"""
+        from .blogs import clear_blog_cache, clear_comment_cache_many
+        from .feeds import schedule_feed_update
+        from .email_filter import build_email_filter
+
+        try:
+            self.flush()
+        finally:
+            # 数据已全部写入，此后的刷新缓存不需要阻止写入
+            self.release()
+        recount_tags()
+        clear_blog_cache()
+        clear_comment_cache_many(self._touched_blogs)
+        clear_tag_cache(get_tag_names(self._touched_tags))
+        build_suggest_index()
+        if self.counts['users']:
+            # 批量插入绕过了注册流程，重新构建邮箱过滤器
+            build_email_filter()
+        # 导入的博客分布在多个 sitemap 分片中，后台全量生成
+        schedule_feed_update()
+        return self.counts
+
+    def release(self):
+        """释放导入标志，可重复调用"""
+        if self._lock.owned():
+            self._lock.release()
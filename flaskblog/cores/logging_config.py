@@ -12,7 +12,7 @@ class AdvancedRequestFilter(logging.Filter):
                          '.map'}
 
     # 需要记录的路由端点前缀
-    ALLOWED_ENDPOINTS = ['auth.', 'blogs.', 'users.']
+    ALLOWED_ENDPOINTS = ['auth.', 'blogs.', 'users.', 'admin.', 'api.']
 
     def filter(self, record):
         # 如果不在请求上下文中，允许记录
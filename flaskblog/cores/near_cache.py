@@ -0,0 +1,205 @@
+# cores/near_cache.py
+"""
+进程内近端缓存
+在 Redis 缓存前增加一层按字节数限制大小的 LRU，只保存最热的键（首页、热门博客、博客详情），
+命中时无需网络往返；条目有效期很短（NEAR_CACHE_TTL），
+本地保存的是序列化后的字节，每次命中反序列化出独立的副本（与 Redis 命中一样是脱离会话的对象），
+不会把一个请求的 ORM 对象交给其他请求或线程；
+写入与删除缓存时通过 Redis 发布/订阅通知其他进程清除本地副本，下次读取时从 Redis 取得新值
+"""
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict, Counter
+
+from flask import current_app
+
+from exts import cache, redis_client
+
+
+class NearCache:
+    """
+    进程内 LRU 缓存
+    - get/set 与 flask-caching 的 cache 用法一致，未命中或键不在 NEAR_CACHE_PREFIXES 中时读写 Redis
+    - set 写入 Redis 后广播给其他进程清除旧的本地副本
+    - delete_many 删除 Redis 中的键，并广播给所有进程清除本地副本
+    - 每个进程（包括 fork 出的 worker）首次使用时订阅失效通知，订阅成功后才开始缓存
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._origin = None  # 本进程发出的通知带有该标识，收到时忽略
+        self._thread = None
+        self._entries = OrderedDict()  # key -> (序列化后的字节, expires, size)
+        self._size = 0
+        self._stats = Counter()
+        self._key_hits = Counter()
+
+    # ---------- 配置 ----------
+
+    @staticmethod
+    def _config(name):
+        return current_app.config[name]
+
+    def _is_near(self, key):
+        return self._config('NEAR_CACHE_ENABLED') and key.startswith(tuple(self._config('NEAR_CACHE_PREFIXES')))
+
+    # ---------- 订阅失效通知 ----------
+
+    def _ensure_subscribed(self):
+        """当前进程尚未订阅时订阅失效频道；订阅失败返回 False，本次不使用本地缓存"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return True
+        with self._lock:
+            if self._pid == pid:
+                return True
+            # fork 后继承的本地条目与统计无效
+            self._reset()
+            self._origin = uuid.uuid4().hex
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self._config('NEAR_CACHE_CHANNEL'): self._on_message})
+                self._thread = pubsub.run_in_thread(sleep_time=1, daemon=True,
+                                                    exception_handler=self._on_subscribe_error)
+            except Exception as e:
+                current_app.logger.warning(f'近端缓存订阅失败，暂不使用本地缓存: {e}')
+                return False
+            self._pid = pid
+            return True
+
+    def _publish(self, keys):
+        message = {'origin': self._origin, 'keys': keys}
+        redis_client.publish(self._config('NEAR_CACHE_CHANNEL'), json.dumps(message))
+
+    def _on_message(self, message):
+        message = json.loads(message['data'])
+        if message['origin'] == self._origin:
+            # 本进程写入的新值已经在本地，不能清除
+            return
+        keys = message['keys']
+        with self._lock:
+            for key in keys:
+                if self._pop(key):
+                    self._stats['invalidations'] += 1
+
+    def _on_subscribe_error(self, exc, pubsub, thread):
+        """连接中断期间可能错过失效通知，清空本地缓存；pubsub 会在下次读取时自动重连并重新订阅"""
+        with self._lock:
+            self._entries.clear()
+            self._key_hits.clear()
+            self._size = 0
+            self._stats['resets'] += 1
+        time.sleep(1)
+
+    # ---------- 本地 LRU ----------
+
+    def _reset(self):
+        self._entries.clear()
+        self._size = 0
+        self._stats.clear()
+        self._key_hits.clear()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+            self._key_hits.pop(key, None)
+        return entry
+
+    def _put(self, key, value, ttl):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        size = len(data)
+        max_bytes = self._config('NEAR_CACHE_MAX_BYTES')
+        if size > max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (data, time.monotonic() + ttl, size)
+            self._size += size
+            # 超出字节上限时淘汰最久未使用的条目
+            while self._size > max_bytes:
+                evicted, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._key_hits.pop(evicted, None)
+                self._stats['evictions'] += 1
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self._pop(key)
+                self._stats['expirations'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            self._key_hits[key] += 1
+            data = entry[0]
+        return pickle.loads(data)
+
+    # ---------- 对外接口 ----------
+
+    def get(self, key):
+        if not (self._is_near(key) and self._ensure_subscribed()):
+            return cache.get(key)
+        value = self._get_local(key)
+        if value is not None:
+            return value
+        self._stats['misses'] += 1
+        value = cache.get(key)
+        if value is not None:
+            self._put(key, value, self._config('NEAR_CACHE_TTL'))
+        return value
+
+    def set(self, key, value, timeout=None):
+        """写入缓存，并通知其他进程清除旧的本地副本"""
+        cache.set(key, value, timeout=timeout)
+        if not self._is_near(key):
+            return
+        if self._ensure_subscribed():
+            ttl = self._config('NEAR_CACHE_TTL')
+            self._put(key, value, min(ttl, timeout) if timeout else ttl)
+        self._publish([key])
+
+    def delete_many(self, *keys):
+        """删除缓存，并通知所有进程清除本地副本"""
+        if not keys:
+            return
+        cache.delete_many(*keys)
+        if not self._config('NEAR_CACHE_ENABLED'):
+            return
+        near_keys = [key for key in keys if self._is_near(key)]
+        if near_keys:
+            with self._lock:
+                for key in near_keys:
+                    self._pop(key)
+            self._publish(near_keys)
+
+    def stats(self, top=10):
+        """当前进程的命中、淘汰统计，以及本地缓存中命中次数最多的键"""
+        with self._lock:
+            hits, misses = self._stats['hits'], self._stats['misses']
+            return {
+                'pid': os.getpid(),
+                'subscribed': self._pid == os.getpid(),
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self._config('NEAR_CACHE_MAX_BYTES'),
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'evictions': self._stats['evictions'],
+                'expirations': self._stats['expirations'],
+                'invalidations': self._stats['invalidations'],
+                'resets': self._stats['resets'],
+                'top_keys': self._key_hits.most_common(top),
+            }
+
+
+near_cache = NearCache()
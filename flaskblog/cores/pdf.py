@@ -0,0 +1,134 @@
+# cores/pdf.py
+"""
+博客 PDF 生成
+reportlab 体积较大，本模块只在 Celery 任务执行时按需导入，Web 进程不会加载
+"""
+import io
+import os
+import platform
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.colors import gray
+
+from cores.render import render_markdown
+
+
+# 注册中文字体函数
+def register_chinese_fonts():
+    try:
+        # 尝试使用项目 static/fonts 目录下的字体
+        static_font_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'fonts')
+        project_fonts = [
+            os.path.join(static_font_dir, 'simfang.ttf'),
+            os.path.join(static_font_dir, 'simsun.ttc')
+        ]
+
+        for font_path in project_fonts:
+            if os.path.exists(font_path):
+                font_name = os.path.splitext(os.path.basename(font_path))[0]
+                pdfmetrics.registerFont(TTFont(font_name, font_path))
+                return font_name
+        # 如果项目目录下没有字体文件，则尝试使用系统字体
+        system = platform.system()
+        if system == "Windows":
+            # 尝试使用Windows系统字体
+            windows_font_paths = [
+                ("SimFang", "C:/Windows/Fonts/simfang.ttf"),
+                ("SimHei", "C:/Windows/Fonts/simhei.ttf"),
+                ("SimSun", "C:/Windows/Fonts/simsun.ttc")
+            ]
+            for font_name, font_path in windows_font_paths:
+                if os.path.exists(font_path):
+                    pdfmetrics.registerFont(TTFont(font_name, font_path))
+                    return font_name
+        return False
+    except Exception as e:
+        print(f"字体注册失败: {e}")
+        return False
+
+
+def markdown_to_paragraph_html(content):
+    """将 Markdown 渲染结果转换为 reportlab Paragraph 支持的简单标签"""
+    content_html = render_markdown(content)
+
+    # 简单的HTML标签转换以支持基本格式
+    content_html = content_html.replace('<h1>', '<font size="16" color="black"><b>').replace('</h1>',
+                                                                                             '</b></font><br/>')
+    content_html = content_html.replace('<h2>', '<font size="14" color="black"><b>').replace('</h2>',
+                                                                                             '</b></font><br/>')
+    content_html = content_html.replace('<h3>', '<font size="12" color="black"><b>').replace('</h3>',
+                                                                                             '</b></font><br/>')
+    content_html = content_html.replace('<strong>', '<b>').replace('</strong>', '</b>')
+    content_html = content_html.replace('<em>', '<i>').replace('</em>', '</i>')
+    content_html = content_html.replace('<p>', '').replace('</p>', '<br/>')
+    content_html = content_html.replace('<ul>', '').replace('</ul>', '<br/>')
+    content_html = content_html.replace('<li>', '• ').replace('</li>', '<br/>')
+    content_html = content_html.replace('<blockquote>', '<font color="gray"><i>').replace('</blockquote>',
+                                                                                          '</i></font><br/>')
+    return content_html
+
+
+def build_blog_pdf(blog):
+    """
+    生成博客 PDF
+    参数:
+        blog: BlogModel 实例
+    返回:
+        bytes: PDF 文件内容
+    """
+    # 注册中文字体，如果没有可用字体，使用默认字体
+    font_name = register_chinese_fonts() or 'Helvetica'
+
+    # 创建PDF文档到内存
+    pdf_buffer = io.BytesIO()
+    doc = SimpleDocTemplate(pdf_buffer, pagesize=A4)
+    styles = getSampleStyleSheet()
+
+    # 创建内容列表
+    story = []
+
+    # 标题样式 - 居中显示
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        alignment=TA_CENTER,  # 居中
+        spaceAfter=30,
+        fontName=font_name
+    )
+    story.append(Paragraph(blog.title, title_style))
+
+    # 作者和时间信息 - 居中显示
+    info_style = ParagraphStyle(
+        'CustomInfo',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=TA_CENTER,  # 居中
+        textColor=gray,
+        fontName=font_name
+    )
+    info_text = f"作者：{blog.author.username}  发布时间：{blog.create_time.strftime('%Y-%m-%d %H:%M:%S')}"
+    story.append(Paragraph(info_text, info_style))
+    story.append(Spacer(1, 20))
+
+    # 内容样式
+    content_style = ParagraphStyle(
+        'CustomContent',
+        parent=styles['Normal'],
+        fontSize=12,
+        alignment=TA_LEFT,
+        fontName=font_name
+    )
+    story.append(Paragraph(markdown_to_paragraph_html(blog.content), content_style))
+
+    # 构建PDF
+    doc.build(story)
+
+    pdf_data = pdf_buffer.getvalue()
+    pdf_buffer.close()
+    return pdf_data
@@ -0,0 +1,148 @@
+# cores/popularity.py
+"""
+阅读量统计与热门博客排行
+    record_view：详情页访问时调用，只写 Redis（计数、HyperLogLog 独立访客、热度有序集合），不写数据库
+    flush_views：定时将累计的阅读量与独立访客数批量写回 blog 表
+    get_hot_blogs：按随时间衰减的热度返回热门博客（带缓存）
+
+热度衰减：每次访问为有序集合增加 2^((now - epoch) / half_life)，越新的访问权重越大，
+等价于旧访问的权重每经过一个半衰期减半。为避免浮点数溢出，每 REBASE_EXPONENT 个半衰期换用一个新的
+有序集合（epoch 前移），读取排行时把上一个集合按 2^-REBASE_EXPONENT 缩放后合并。
+epoch 完全由当前时间计算，记录访问时不需要额外读取 Redis
+"""
+import time
+
+from flask import current_app
+from sqlalchemy import bindparam, update
+
+from exts import db, redis_client
+from models import BlogModel
+from .near_cache import near_cache
+from .suggest import add_blog_views
+
+# 待写回的阅读量增量：blog_id -> 增量
+VIEWS_PENDING_KEY = 'blog_views_pending'
+VIEWS_FLUSHING_KEY = 'blog_views_flushing'
+VIEWS_FLUSH_LOCK = 'lock:blog_views:flush'
+VIEWS_FLUSH_LOCK_TIMEOUT = 300
+# 每篇博客的独立访客 HyperLogLog
+UNIQUE_VISITORS_KEY = 'blog_uv_{blog_id}'
+# 热度有序集合（按周期分片）及合并结果
+HOT_RANKING_KEY = 'hot_blogs_ranking_{period}'
+HOT_MERGED_KEY = 'hot_blogs_ranking_merged'
+HOT_CACHE_KEY = 'hot_blogs'
+# 每个周期包含的半衰期数：周期内权重最大为 2^REBASE_EXPONENT
+REBASE_EXPONENT = 20
+
+# 把待写回的增量合并到写回中的哈希（HINCRBY），再删除待写回的哈希；
+# 上次写回失败留下的增量不会被覆盖，本次一并写回
+_MERGE_PENDING = """
+local data = redis.call('HGETALL', KEYS[1])
+for i = 1, #data, 2 do
+    redis.call('HINCRBY', KEYS[2], data[i], data[i + 1])
+end
+redis.call('DEL', KEYS[1])
+return #data / 2
+"""
+
+
+def _hot_period(now):
+    """返回 (周期编号, 周期起点)"""
+    length = REBASE_EXPONENT * current_app.config['HOT_HALF_LIFE']
+    period = int(now // length)
+    return period, period * length
+
+
+def record_view(blog_id, visitor):
+    """
+    记录一次阅读
+    参数:
+        blog_id: 博客ID
+        visitor: 访客标识（用户ID或IP），用于统计独立访客
+    """
+    now = time.time()
+    period, epoch = _hot_period(now)
+    ranking_key = HOT_RANKING_KEY.format(period=period)
+    weight = 2 ** ((now - epoch) / current_app.config['HOT_HALF_LIFE'])
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hincrby(VIEWS_PENDING_KEY, blog_id, 1)
+    pipe.pfadd(UNIQUE_VISITORS_KEY.format(blog_id=blog_id), visitor)
+    pipe.zincrby(ranking_key, weight, blog_id)
+    # 保留两个周期：读取排行时还需要上一个周期的数据
+    pipe.expire(ranking_key, int(2 * REBASE_EXPONENT * current_app.config['HOT_HALF_LIFE']))
+    pipe.execute()
+
+
+def flush_views():
+    """
+    将累计的阅读量批量写回数据库，并整理热度排行
+    返回:
+        int: 更新的博客数
+    """
+    # 同一时间只有一个写回：并发的写回会重复读取同一个哈希，把增量写入两次
+    lock = redis_client.lock(VIEWS_FLUSH_LOCK, timeout=VIEWS_FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        current_app.logger.info('阅读量正在由其他任务写回，跳过')
+        return 0
+    try:
+        pending = _flush_pending()
+    finally:
+        lock.release()
+
+    # 只保留热度最高的一部分博客
+    period, _ = _hot_period(time.time())
+    redis_client.zremrangebyrank(HOT_RANKING_KEY.format(period=period), 0,
+                                 -current_app.config['HOT_RANKING_SIZE'] - 1)
+    current_app.logger.info(f'阅读量已写回数据库，涉及{len(pending)}篇博客')
+    return len(pending)
+
+
+def _flush_pending():
+    """写回阅读量增量，返回涉及的博客数；提交成功后才删除写回中的哈希，失败时留给下次写回"""
+    # 合并是原子操作，写回期间产生的新访问会累计到新的哈希中
+    redis_client.eval(_MERGE_PENDING, 2, VIEWS_PENDING_KEY, VIEWS_FLUSHING_KEY)
+    pending = redis_client.hgetall(VIEWS_FLUSHING_KEY)
+    if not pending:
+        return {}
+
+    blog_ids = [int(blog_id) for blog_id in pending]
+    pipe = redis_client.pipeline(transaction=False)
+    for blog_id in blog_ids:
+        pipe.pfcount(UNIQUE_VISITORS_KEY.format(blog_id=blog_id))
+    unique_counts = pipe.execute()
+
+    table = BlogModel.__table__
+    stmt = update(table).where(table.c.id == bindparam('b_id')).values(
+        views=table.c.views + bindparam('delta'),
+        unique_visitors=bindparam('uv'),
+    )
+    db.session.execute(stmt, [
+        {'b_id': blog_id, 'delta': int(pending[key]), 'uv': uv}
+        for blog_id, key, uv in zip(blog_ids, pending, unique_counts)
+    ])
+    db.session.commit()
+    redis_client.delete(VIEWS_FLUSHING_KEY)
+    # 删除写回中的哈希之后再同步，失败时不会导致数据库重复累加
+    add_blog_views({blog_id: int(pending[key]) for blog_id, key in zip(blog_ids, pending)})
+    return pending
+
+
+def get_hot_blog_ids(limit):
+    """合并当前周期与上一个周期（缩放到当前周期的量级）后取前 limit 个"""
+    period, _ = _hot_period(time.time())
+    redis_client.zunionstore(HOT_MERGED_KEY, {
+        HOT_RANKING_KEY.format(period=period): 1,
+        HOT_RANKING_KEY.format(period=period - 1): 2 ** -REBASE_EXPONENT,
+    })
+    return [int(blog_id) for blog_id in redis_client.zrevrange(HOT_MERGED_KEY, 0, limit - 1)]
+
+
+def get_hot_blogs(limit=None):
+    """热门博客列表，按热度排序，缓存 HOT_CACHE_TIMEOUT 秒"""
+    limit = limit or current_app.config['HOT_LIST_SIZE']
+    blogs = near_cache.get(HOT_CACHE_KEY)
+    if blogs is None:
+        blogs = BlogModel.get_by_ids(get_hot_blog_ids(limit))
+        near_cache.set(HOT_CACHE_KEY, blogs, timeout=current_app.config['HOT_CACHE_TIMEOUT'])
+    return blogs
@@ -0,0 +1,211 @@
+# cores/profiler.py
+"""
+按请求的采样分析器
+被选中的请求（管理员带 PROFILE_HEADER 请求头，或按 PROFILE_SAMPLE_RATE 随机抽样）在执行期间，
+由每个进程唯一的后台线程每隔 PROFILE_INTERVAL 秒读取一次请求线程的调用栈（sys._current_frames），
+请求结束后按端点保存为折叠栈格式（每行 "帧;帧;帧 次数"，可直接交给 flamegraph.pl / speedscope）：
+    logs/profiles/<端点>/<时间>-<编号>-<耗时>ms.folded
+每个端点最多保留 PROFILE_MAX_FILES 个结果；流式响应（详情页）采样到响应发送完毕，
+结果只出现在管理员页面中，没有 X-Profile-Id 响应头（响应头发送时分析尚未结束）
+不插桩、不影响未被选中的请求；没有请求在分析时后台线程处于等待状态
+    register_profiler：注册请求钩子
+    list_profiles：最近的分析结果（管理员页面）
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, request, g
+
+PROFILE_SUFFIX = '.folded'
+# 栈中只保留路径的最后几级，折叠栈更短也更易读
+_PATH_MARKERS = ('site-packages' + os.sep, 'lib' + os.sep + 'python')
+_short_paths = {}
+
+
+def _short_path(filename):
+    short = _short_paths.get(filename)
+    if short is None:
+        short = filename
+        for marker in _PATH_MARKERS:
+            index = filename.rfind(marker)
+            if index != -1:
+                short = filename[index + len(marker):].lstrip(os.sep)
+                break
+        else:
+            short = os.path.relpath(filename) if os.path.isabs(filename) else filename
+        _short_paths[filename] = short
+    return short
+
+
+def _collapse(frame):
+    """从最外层到当前执行位置，以分号连接的调用栈"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({_short_path(code.co_filename)})'.replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+class StackSampler:
+    """
+    每个进程一个采样线程，同时为多个请求线程采样
+    start(thread_id) 开始记录，stop(thread_id) 停止并返回 Counter(折叠栈 -> 样本数)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}  # thread_id -> Counter
+        self._wakeup = threading.Event()
+        self._pid = None
+        self.interval = 0.005
+
+    def _ensure_thread(self):
+        # fork 出的 worker 进程需要重新启动线程
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid = pid
+            self._active.clear()
+            threading.Thread(target=self._run, name='stack-sampler', daemon=True).start()
+
+    def start(self, thread_id):
+        with self._lock:
+            self._ensure_thread()
+            self._active[thread_id] = Counter()
+        self._wakeup.set()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, counter in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counter[_collapse(frame)] += 1
+
+
+sampler = StackSampler()
+
+
+def _folder():
+    return current_app.config['PROFILE_FOLDER']
+
+
+def _should_profile():
+    config = current_app.config
+    if request.headers.get(config['PROFILE_HEADER']):
+        # 请求头只对管理员生效，否则任何人都可以让服务器做额外的工作
+        return bool(g.get('user') and g.user.email in config.get('ADMIN_EMAILS', set()))
+    rate = config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+
+def _trim(folder, keep):
+    """端点目录中只保留最近的 keep 个结果"""
+    files = [entry for entry in os.scandir(folder) if entry.name.endswith(PROFILE_SUFFIX)]
+    if len(files) > keep:
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - keep]:
+            os.remove(entry.path)
+
+
+def _save(endpoint, stacks, duration):
+    folder = os.path.join(_folder(), endpoint)
+    os.makedirs(folder, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}-{int(duration * 1000)}ms{PROFILE_SUFFIX}"
+    with open(os.path.join(folder, name), 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    _trim(folder, current_app.config['PROFILE_MAX_FILES'])
+    return f'{endpoint}/{name}'
+
+
+def list_profiles(endpoint=None, limit=200):
+    """最近的分析结果 [{'path', 'endpoint', 'time', 'duration_ms', 'size'}, ...]，按时间倒序"""
+    folder = _folder()
+    if not os.path.isdir(folder):
+        return []
+    profiles = []
+    for endpoint_dir in os.scandir(folder):
+        if not endpoint_dir.is_dir() or (endpoint and endpoint_dir.name != endpoint):
+            continue
+        for entry in os.scandir(endpoint_dir.path):
+            if not entry.name.endswith(PROFILE_SUFFIX):
+                continue
+            stat = entry.stat()
+            profiles.append({
+                'path': f'{endpoint_dir.name}/{entry.name}',
+                'endpoint': endpoint_dir.name,
+                'time': datetime.fromtimestamp(stat.st_mtime),
+                'duration_ms': int(entry.name[:-len(PROFILE_SUFFIX)].rsplit('-', 1)[-1].rstrip('ms')),
+                'size': stat.st_size,
+            })
+    profiles.sort(key=lambda profile: profile['time'], reverse=True)
+    return profiles[:limit]
+
+
+def register_profiler(app):
+    """在 register_hooks 之后调用：判断管理员请求头时需要 g.user"""
+    sampler.interval = app.config['PROFILE_INTERVAL']
+
+    @app.before_request
+    def start_profile():
+        if request.endpoint in (None, 'static') or not _should_profile():
+            return
+        g.profile_start = time.time()
+        sampler.start(threading.get_ident())
+
+    @app.after_request
+    def add_profile_header(response):
+        if 'profile_start' not in g:
+            return response
+        if response.is_streamed:
+            # 流式响应的模板在发送响应体时渲染，响应关闭时才停止采样；此时请求上下文已经结束
+            g.profile_id = None
+            endpoint, start, thread_id = request.endpoint, g.profile_start, threading.get_ident()
+
+            def finish_after_close():
+                with app.app_context():
+                    _finish_profile(endpoint, start, thread_id)
+
+            response.call_on_close(finish_after_close)
+            return response
+        g.profile_id = _finish_profile(request.endpoint, g.profile_start, threading.get_ident())
+        if g.profile_id:
+            response.headers['X-Profile-Id'] = g.profile_id
+        return response
+
+    @app.teardown_request
+    def stop_profile(exception):
+        # 视图抛出异常时 after_request 不会执行
+        if 'profile_start' in g and 'profile_id' not in g:
+            g.profile_id = _finish_profile(request.endpoint, g.profile_start, threading.get_ident())
+
+
+def _finish_profile(endpoint, start, thread_id):
+    """停止采样并保存，返回结果路径"""
+    stacks = sampler.stop(thread_id)
+    duration = time.time() - start
+    if not stacks:
+        # 请求短于一个采样间隔
+        return None
+    try:
+        return _save(endpoint, stacks, duration)
+    except OSError as e:
+        current_app.logger.warning(f'保存性能分析结果失败: {e}')
+        return None
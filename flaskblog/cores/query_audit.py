@@ -0,0 +1,149 @@
+# cores/query_audit.py
+"""
+查询计划审计
+依次执行 models.py 与 cores/ 中的每条查询路径，捕获实际发出的 SELECT 语句，
+对每条语句执行 EXPLAIN（MySQL）或 EXPLAIN QUERY PLAN（SQLite），标记全表扫描、文件排序与临时表
+    QUERY_PATHS：需要审计的查询路径
+    audit_queries：执行审计，返回每条语句的计划与问题
+配置了只读副本（DB_REPLICA_BINDS）时 SELECT 发往副本，因此监听所有引擎，并在实际执行语句的引擎上 EXPLAIN；
+某条路径没有捕获到任何语句时报告 no_statements，避免审计在配置变化后静默通过
+"""
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event, select
+from werkzeug.exceptions import HTTPException
+
+from exts import db
+from models import UserModel, UserProfileModel, BlogModel, CommentModel, TagModel
+
+# 已知且可以接受的问题：(查询路径, 问题类型)
+# 搜索使用 LIKE '%关键字%'，无法使用 B-Tree 索引；导出本身就是按主键顺序读取整张表
+KNOWN_FINDINGS = {
+    ('search', 'full_scan'),
+    ('export_users', 'full_scan'),
+    ('export_blogs', 'full_scan'),
+    ('export_comments', 'full_scan'),
+}
+
+
+def _sample(db_session):
+    """取已有数据作为查询参数，空库时使用占位值"""
+    blog_id = db_session.scalar(select(BlogModel.id).limit(1)) or 1
+    user = db_session.scalar(select(UserModel).limit(1))
+    tag = db_session.scalar(select(TagModel).order_by(TagModel.post_count.desc()).limit(1))
+    return {
+        'blog_id': blog_id,
+        'user_id': user.id if user else 1,
+        'email': user.email if user else 'audit@example.com',
+        'tag': tag or TagModel(id=1, name='audit', post_count=0),
+    }
+
+
+def _query_paths(sample):
+    """查询路径：名称 -> 执行查询的函数"""
+    from .exporter import iter_rows, EXPORT_TABLES
+
+    paths = {
+        'index': lambda: BlogModel.get_recent_blogs_paginated(page=2),
+        'search': lambda: BlogModel.search_blog_ids('flask', page=1),
+        'tag_blogs': lambda: BlogModel.get_blogs_by_tag_paginated(sample['tag'], page=2),
+        'blog_detail': lambda: BlogModel.get_detail_or_404(sample['blog_id']),
+        'blog_comments': lambda: CommentModel.get_blog_comments_before(sample['blog_id'], before=(datetime.now(), 0)),
+        'blog_comment_count': lambda: CommentModel.count_blog_comments(sample['blog_id']),
+        'hot_blogs': lambda: BlogModel.get_by_ids([sample['blog_id'], sample['blog_id'] + 1]),
+        'tag_cloud': lambda: TagModel.get_top_tags(100),
+        'login': lambda: UserModel.query.filter_by(email=sample['email']).first(),
+        'load_user': lambda: UserModel.query.get(sample['user_id']),
+        'user_profile': lambda: UserProfileModel.query.filter_by(user_id=sample['user_id']).first(),
+        'tag_lookup': lambda: TagModel.query.filter_by(name=sample['tag'].name).first(),
+    }
+    for table in EXPORT_TABLES:
+        paths[f'export_{table}'] = lambda table=table: next(iter_rows(table, batch_size=10), None)
+    return paths
+
+
+@contextmanager
+def _capture_statements(engines, statements):
+    """捕获所有引擎上执行的 SELECT：[(引擎, 语句, 参数), ...]"""
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((conn.engine, statement, parameters))
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        yield
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', capture)
+
+
+def _explain(connection, statement, parameters):
+    """返回 (计划文本列表, 问题集合)"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).mappings().all()
+        plan = [row['detail'] for row in rows]
+        findings = set()
+        for detail in plan:
+            # SCAN 表且未使用索引为全表扫描；USE TEMP B-TREE 为额外排序
+            if detail.startswith('SCAN ') and 'USING' not in detail and 'SUBQUERY' not in detail:
+                findings.add('full_scan')
+            if 'USE TEMP B-TREE' in detail:
+                findings.add('filesort')
+        return plan, findings
+
+    rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings().all()
+    plan = []
+    findings = set()
+    for row in rows:
+        row = {key.lower(): value for key, value in row.items()}
+        extra = row.get('extra') or ''
+        plan.append(f"{row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')} {extra}")
+        if row.get('type') == 'ALL':
+            findings.add('full_scan')
+        if 'Using filesort' in extra:
+            findings.add('filesort')
+        if 'Using temporary' in extra:
+            findings.add('temporary')
+    return plan, findings
+
+
+def audit_queries(names=None):
+    """
+    执行审计
+    返回:
+        list[dict]: 每条语句的 path、statement、plan、findings、known
+    """
+    sample = _sample(db.session)
+    paths = _query_paths(sample)
+    # 同一个引擎可能对应多个绑定键
+    engines = list({id(engine): engine for engine in db.engines.values()}.values())
+    results = []
+    for name, run in paths.items():
+        if names and name not in names:
+            continue
+        statements = []
+        with _capture_statements(engines, statements):
+            try:
+                run()
+            except HTTPException:
+                # 空库时占位参数查不到数据（如 get_detail_or_404），语句已经执行并被捕获
+                pass
+        db.session.rollback()
+        if not statements:
+            results.append({'path': name, 'statement': None, 'plan': [],
+                            'findings': ['no_statements'], 'known': []})
+            continue
+        for engine, statement, parameters in statements:
+            with engine.connect() as connection:
+                plan, findings = _explain(connection, statement, parameters)
+                results.append({
+                    'path': name,
+                    'statement': ' '.join(statement.split()),
+                    'plan': plan,
+                    'findings': sorted(findings),
+                    'known': sorted(finding for finding in findings if (name, finding) in KNOWN_FINDINGS),
+                })
+    return results
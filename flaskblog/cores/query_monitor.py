@@ -0,0 +1,155 @@
+# cores/query_monitor.py
+"""
+SQL 查询统计、慢查询日志与 N+1 检测
+通过 SQLAlchemy 引擎事件（before/after_cursor_execute）记录当前应用上下文（每个请求、每个 Celery 任务）中的查询：
+    1. 查询次数、数据库总耗时与最慢的语句，写入"请求结束"日志（global_logger）
+    2. 耗时超过 SLOW_QUERY_THRESHOLD 的语句写入慢查询日志，附带端点与发起查询的代码位置
+    3. 同一条语句（参数不同）在一个请求中执行超过 SQL_REPEAT_THRESHOLD 次，通常是模板中逐行访问
+       未预先加载的关联（如 blog.author）；默认记录警告，SQL_STRICT 为 True 时（测试、CI）抛出 RepeatedQueryError
+流式响应（详情页）的统计包含发送响应体期间的查询，在响应关闭时记录与检查
+与数据库类型无关，SQLite 下同样可用
+"""
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+
+from flask import g, has_app_context, has_request_context, request, current_app
+from sqlalchemy import event
+
+from exts import db
+
+SLOW_QUERY_LOGGER = 'flaskblog.slow_query'
+_START_KEY = 'query_monitor_start'
+# 定位发起查询的代码时跳过的模块
+_SKIP_PATHS = (os.sep + 'site-packages' + os.sep, os.sep + 'lib' + os.sep + 'python', __file__)
+
+slow_logger = logging.getLogger(SLOW_QUERY_LOGGER)
+
+
+class RepeatedQueryError(AssertionError):
+    """严格模式下，一个请求中重复执行了同一条语句（N+1 查询）"""
+
+
+class QueryStats:
+    """一个应用上下文内的查询统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.statements = Counter()
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+    def repeated(self, threshold):
+        """[(语句, 次数), ...]，执行次数超过 threshold 的语句"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count > threshold]
+
+    def summary(self):
+        """日志中的一段文本"""
+        if not self.count:
+            return 'SQL: 0条'
+        slowest = ' '.join(self.slowest_statement.split())[:120]
+        return (f'SQL: {self.count}条 {self.total_time * 1000:.1f}ms'
+                f'（最慢 {self.slowest_time * 1000:.1f}ms: {slowest}）')
+
+
+def get_query_stats():
+    """当前应用上下文的查询统计，不存在时创建"""
+    stats = g.get('query_stats')
+    if stats is None:
+        stats = g.query_stats = QueryStats()
+    return stats
+
+
+def _caller():
+    """发起查询的应用代码位置（跳过 SQLAlchemy、Flask 等第三方库）"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not any(path in filename for path in _SKIP_PATHS) and not filename.startswith('<'):
+            return f'{os.path.relpath(filename)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return '未知'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info[_START_KEY].pop()
+    if not has_app_context():
+        return
+    get_query_stats().add(statement, duration)
+    if duration >= current_app.config['SLOW_QUERY_THRESHOLD']:
+        endpoint = request.endpoint if has_request_context() else '-'
+        slow_logger.warning(f"[慢查询] {duration * 1000:.1f}ms | 端点: {endpoint} | 位置: {_caller()} | "
+                            f"{' '.join(statement.split())} | 参数: {parameters!r:.200}")
+
+
+def check_repeated_queries(stats=None, endpoint=None):
+    """检查 N+1 查询：记录警告，严格模式下抛出 RepeatedQueryError"""
+    config = current_app.config
+    stats = stats or get_query_stats()
+    repeated = stats.repeated(config['SQL_REPEAT_THRESHOLD'])
+    if not repeated:
+        return
+    if endpoint is None:
+        endpoint = request.endpoint if has_request_context() else '-'
+    details = '; '.join(f"{count}次: {' '.join(statement.split())[:200]}" for statement, count in repeated)
+    message = f'端点 {endpoint} 重复执行了相同的语句（可能是 N+1 查询）: {details}'
+    if config['SQL_STRICT']:
+        raise RepeatedQueryError(message)
+    current_app.logger.warning(message)
+
+
+def _setup_slow_query_log(app):
+    path = app.config['SLOW_QUERY_LOG']
+    if any(getattr(handler, 'baseFilename', None) == os.path.abspath(path) for handler in slow_logger.handlers):
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=1024 * 1024 * 10, backupCount=5, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s'))
+    slow_logger.addHandler(handler)
+    slow_logger.setLevel(logging.WARNING)
+
+
+def register_query_monitor(app):
+    """在 register_hooks 之前调用，使加载当前用户的查询也计入本次请求"""
+    _setup_slow_query_log(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def reset_query_stats():
+        # 测试中多个请求可能共用同一个应用上下文
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def detect_repeated_queries(response):
+        if not response.is_streamed:
+            check_repeated_queries()
+            return response
+        # 流式响应的模板在发送响应体时才渲染，其中的查询要等响应关闭（服务器发送完毕）后再检查；
+        # 此时请求上下文已经结束，严格模式下的 RepeatedQueryError 由服务器记录，状态码无法再改变
+        stats, endpoint = g.query_stats, request.endpoint
+
+        def check_after_close():
+            with app.app_context():
+                check_repeated_queries(stats, endpoint)
+
+        response.call_on_close(check_after_close)
+        return response
@@ -0,0 +1,40 @@
+# cores/render.py
+"""
+Markdown 渲染与流式模板输出
+markdown 库只在第一次渲染时导入，Web 进程启动时不加载
+"""
+from flask import current_app, stream_template
+
+
+def render_markdown(text):
+    """将 Markdown 文本渲染为 HTML"""
+    from markdown import markdown
+    return markdown(text)
+
+
+def _coalesce(chunks, size):
+    """合并小片段，至少 size 个字符输出一次；本身超过 size 的片段（如博客正文）先输出缓冲区，再单独作为一块输出"""
+    buffer, length = [], 0
+    for chunk in chunks:
+        if len(chunk) >= size:
+            if buffer:
+                yield ''.join(buffer)
+                buffer, length = [], 0
+            yield chunk
+            continue
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_page(template_name, **context):
+    """
+    流式渲染模板，返回可直接作为响应体的生成器
+    Jinja 为模板中的每段文本、每个表达式各产出一个片段，逐个发送会产生大量很小的网络写入，
+    这里按 STREAM_CHUNK_SIZE 合并后输出；页头与导航栏渲染完即发送，不等待页面其余部分
+    """
+    return _coalesce(stream_template(template_name, **context), current_app.config['STREAM_CHUNK_SIZE'])
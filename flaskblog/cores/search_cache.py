@@ -0,0 +1,170 @@
+# cores/search_cache.py
+"""
+搜索结果缓存
+    1. 每个 (规范化后的关键字, 页码) 只缓存有序的博客ID列表与总数，不再复制博客数据
+    2. 缓存键数量有上限：Redis 有序集合记录每个键的最近访问时间，超出 SEARCH_CACHE_MAX_KEYS 时淘汰最久未访问的键
+    3. 博客摘要按篇缓存（blog_summary_<id>），展示时一次 MGET 取回，未命中的博客用一条 IN 查询补齐；
+       博客修改后只需删除对应的摘要缓存，引用它的搜索结果无需清理
+    4. 按规范化后的关键字统计搜索次数，缓存预热时重建热门关键字的第一页；
+       计数按 SEARCH_POPULAR_BUCKET 秒分段保存，过期自动删除，每段写入时裁剪到 SEARCH_POPULAR_SIZE 个关键字，
+       任意输入不会让统计无限增长；读取时合并最近 SEARCH_POPULAR_WINDOW 段
+"""
+import hashlib
+import re
+import time
+import unicodedata
+
+from flask import current_app
+
+from exts import cache, redis_client
+from models import BlogModel
+from .caching import CachedPagination, cached_fetch, warm_cache
+from .near_cache import near_cache
+
+# 搜索缓存键的最近访问时间：key -> 时间戳
+SEARCH_LRU_KEY = 'search_cache_lru'
+# 关键字的搜索次数（按时间分段）：规范化后的关键字 -> 次数
+SEARCH_POPULAR_KEY = 'search_popular:{bucket}'
+SEARCH_POPULAR_MERGED_KEY = 'search_popular_merged'
+SEARCH_CACHE_KEY = 'search:{digest}:{page}'
+BLOG_SUMMARY_CACHE_KEY = 'blog_summary_{blog_id}'
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(q):
+    """全角转半角、统一大小写、合并空白，使等价的关键字共用同一份缓存"""
+    q = unicodedata.normalize('NFKC', q or '')
+    return _WHITESPACE_RE.sub(' ', q).strip().casefold()
+
+
+def _search_cache_key(q, page):
+    digest = hashlib.sha1(q.encode('utf-8')).hexdigest()[:16]
+    return SEARCH_CACHE_KEY.format(digest=digest, page=page)
+
+
+def _trim_search_cache():
+    """超过上限时淘汰最久未访问的搜索缓存"""
+    overflow = redis_client.zcard(SEARCH_LRU_KEY) - current_app.config['SEARCH_CACHE_MAX_KEYS']
+    if overflow > 0:
+        evicted = [key.decode() for key, _ in redis_client.zpopmin(SEARCH_LRU_KEY, overflow)]
+        cache.delete_many(*evicted)
+        current_app.logger.info(f'淘汰了{len(evicted)}条搜索缓存')
+
+
+def _load_search_ids(q, page, per_page):
+    ids, total = BlogModel.search_blog_ids(q, page=page, per_page=per_page)
+    return {'ids': ids, 'total': total}
+
+
+def get_search_ids(q, page, per_page):
+    """
+    返回 (当前页的ID列表, 总数)，q 需已规范化
+    同一关键字同时只查询一次数据库（cached_fetch）
+    """
+    cache_key = _search_cache_key(q, page)
+    loaded = []
+
+    def load():
+        loaded.append(True)
+        return _load_search_ids(q, page, per_page)
+
+    result = cached_fetch(cache_key, load, timeout=current_app.config['SEARCH_CACHE_TIMEOUT'])
+    # 每次访问都刷新时间，淘汰按最近访问顺序进行；只有新写入缓存时键的数量才会增加
+    redis_client.zadd(SEARCH_LRU_KEY, {cache_key: time.time()})
+    if loaded:
+        _trim_search_cache()
+    return result['ids'], result['total']
+
+
+def _summarize(blog):
+    """列表页展示所需的字段；模板中 blog.author.username 对字典同样有效"""
+    return {
+        'id': blog.id,
+        'title': blog.title,
+        'tag': blog.tag,
+        'create_time': blog.create_time,
+        'author': {'username': blog.author.username},
+    }
+
+
+def get_blog_summaries(blog_ids):
+    """按给定顺序返回博客摘要：一次 MGET，未命中的用一条 IN 查询补齐并回写缓存"""
+    if not blog_ids:
+        return []
+    keys = [BLOG_SUMMARY_CACHE_KEY.format(blog_id=blog_id) for blog_id in blog_ids]
+    summaries = dict(zip(blog_ids, cache.get_many(*keys)))
+    missing = [blog_id for blog_id, summary in summaries.items() if summary is None]
+    if missing:
+        fetched = {blog.id: _summarize(blog) for blog in BlogModel.get_by_ids(missing)}
+        if fetched:
+            cache.set_many({BLOG_SUMMARY_CACHE_KEY.format(blog_id=blog_id): summary
+                            for blog_id, summary in fetched.items()},
+                           timeout=current_app.config['BLOG_SUMMARY_CACHE_TIMEOUT'])
+        summaries.update(fetched)
+    # 已删除的博客直接跳过
+    return [summaries[blog_id] for blog_id in blog_ids if summaries.get(blog_id)]
+
+
+def _popular_bucket(now):
+    return int(now // current_app.config['SEARCH_POPULAR_BUCKET'])
+
+
+def _count_search(q):
+    """计入当前时间段；同时设置过期时间并裁剪，只淘汰次数最少的关键字"""
+    config = current_app.config
+    key = SEARCH_POPULAR_KEY.format(bucket=_popular_bucket(time.time()))
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zincrby(key, 1, q)
+    pipe.expire(key, config['SEARCH_POPULAR_BUCKET'] * (config['SEARCH_POPULAR_WINDOW'] + 1))
+    pipe.zremrangebyrank(key, 0, -config['SEARCH_POPULAR_SIZE'] - 1)
+    pipe.execute()
+
+
+def search_blogs(q, page, per_page):
+    """搜索并返回可直接交给 index.html 的分页对象"""
+    q = normalize_query(q)
+    if page == 1:
+        # 翻页不计入搜索次数
+        _count_search(q)
+    ids, total = get_search_ids(q, page, per_page)
+    return CachedPagination(page=page, per_page=per_page, max_per_page=None, error_out=False,
+                            items=get_blog_summaries(ids), total=total)
+
+
+def clear_search_cache(batch_size=500):
+    """删除全部搜索缓存（发布新博客后结果可能变化）"""
+    keys = [key.decode() for key in redis_client.zrange(SEARCH_LRU_KEY, 0, -1)]
+    redis_client.delete(SEARCH_LRU_KEY)
+    for start in range(0, len(keys), batch_size):
+        near_cache.delete_many(*keys[start:start + batch_size])
+
+
+def get_popular_searches(limit):
+    """最近 SEARCH_POPULAR_WINDOW 个时间段内搜索次数最多的关键字（已规范化）"""
+    current = _popular_bucket(time.time())
+    keys = [SEARCH_POPULAR_KEY.format(bucket=bucket)
+            for bucket in range(current - current_app.config['SEARCH_POPULAR_WINDOW'] + 1, current + 1)]
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zunionstore(SEARCH_POPULAR_MERGED_KEY, keys)
+    pipe.zrevrange(SEARCH_POPULAR_MERGED_KEY, 0, limit - 1)
+    return [q.decode() for q in pipe.execute()[1]]
+
+
+def warm_search(q, per_page, min_ttl=0):
+    """预热关键字第一页的搜索结果及其中博客的摘要，q 需已规范化；返回是否重建"""
+    cache_key = _search_cache_key(q, 1)
+    loaded = []
+
+    def load():
+        result = _load_search_ids(q, 1, per_page)
+        loaded.append(result)
+        return result
+
+    if not warm_cache(cache_key, load, timeout=current_app.config['SEARCH_CACHE_TIMEOUT'], min_ttl=min_ttl):
+        return False
+    # 与 get_search_ids 一样登记到 LRU，发布博客时才能被 clear_search_cache 清理
+    redis_client.zadd(SEARCH_LRU_KEY, {cache_key: time.time()})
+    _trim_search_cache()
+    get_blog_summaries(loaded[0]['ids'])
+    return True
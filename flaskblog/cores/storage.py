@@ -0,0 +1,246 @@
+# cores/storage.py
+"""
+媒体文件存储
+用户上传的图片、视频通过存储后端保存，STORAGE_BACKEND 选择后端：
+    local   LocalStorage，保存在 UPLOAD_FOLDER 中，由 static 路由（或前端服务器）提供下载；
+            只适用于单台服务器或多台服务器挂载同一目录
+    s3      S3Storage，S3 兼容的对象存储（AWS S3、MinIO 等），需要安装 boto3（按需导入）
+上传与下载不经过 Web 进程：
+    1. 前端请求上传地址，presigned_upload 返回预签名的表单（url + fields），浏览器直接 POST 到对象存储
+       （本地存储时 POST 到带签名令牌的 /uploads/local/<token>，这种情况下文件仍由 Web 进程写入）
+    2. 前端通知服务器上传完成，服务器检查对象存在后更新数据库
+    3. 页面中的地址由 media_url 生成：本地存储为静态文件地址，对象存储为预签名的下载地址（或 STORAGE_S3_PUBLIC_URL）
+被替换的旧文件由 Celery 任务延迟 STORAGE_DELETE_DELAY 秒后删除（schedule_media_delete）
+以 uploads/ 开头的值是改用存储后端之前保存在 static/uploads 中的文件，始终按本地静态文件处理
+"""
+import os
+import shutil
+import tempfile
+
+from flask import current_app, url_for, request, abort
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+from exts import csrf
+
+LEGACY_PREFIX = 'uploads/'
+UPLOAD_TOKEN_SALT = 'storage-upload'
+
+
+class Storage:
+    """存储后端接口，key 为以 / 分隔的相对路径（如 images/1/xxx.png）"""
+
+    def save(self, fileobj, key, content_type=None):
+        """保存文件对象（经过 Web 进程的上传）"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """删除文件，不存在时忽略"""
+        raise NotImplementedError
+
+    def size(self, key):
+        """文件大小，不存在时返回 None"""
+        raise NotImplementedError
+
+    def url(self, key):
+        """浏览器下载文件的地址"""
+        raise NotImplementedError
+
+    def presigned_upload(self, key, content_type, max_size):
+        """浏览器直接上传的表单 {'url', 'fields'}：把 fields 与文件（字段名 file）一起 POST 到 url"""
+        raise NotImplementedError
+
+
+class LocalStorage(Storage):
+    """保存在本地目录中，目录需位于 static 目录下"""
+
+    def __init__(self, root, static_folder):
+        self.root = os.path.abspath(root)
+        self.static_folder = os.path.abspath(static_folder)
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, *key.split('/')))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f'非法的文件路径: {key}')
+        return path
+
+    def save(self, fileobj, key, content_type=None):
+        # 先写临时文件再替换，下载方不会读到写了一半的文件
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(fileobj, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def size(self, key):
+        try:
+            return os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            return None
+
+    def url(self, key):
+        filename = os.path.relpath(self._path(key), self.static_folder).replace(os.sep, '/')
+        return url_for('static', filename=filename)
+
+    def presigned_upload(self, key, content_type, max_size):
+        serializer = URLSafeTimedSerializer(current_app.secret_key, salt=UPLOAD_TOKEN_SALT)
+        token = serializer.dumps({'key': key, 'content_type': content_type, 'max_size': max_size})
+        return {'url': url_for('storage_upload', token=token), 'fields': {}}
+
+
+class S3Storage(Storage):
+    """
+    S3 兼容的对象存储
+    endpoint_url 为 None 时连接 AWS S3，指定时（如 MinIO 的 http://127.0.0.1:9000）使用路径形式的地址；
+    浏览器直接上传需要在存储桶上配置 CORS，允许站点域名 POST
+    """
+
+    def __init__(self, bucket, endpoint_url=None, region=None, access_key=None, secret_key=None, public_url=None):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.public_url = public_url.rstrip('/') if public_url else None
+        self._client = None
+
+    @property
+    def client(self):
+        # boto3 只在第一次使用对象存储时导入；客户端是线程安全的，每个进程创建一次
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+
+            addressing_style = 'path' if self.endpoint_url else 'auto'
+            self._client = boto3.client(
+                's3', endpoint_url=self.endpoint_url, region_name=self.region,
+                aws_access_key_id=self.access_key, aws_secret_access_key=self.secret_key,
+                config=Config(signature_version='s3v4', s3={'addressing_style': addressing_style}),
+            )
+        return self._client
+
+    def save(self, fileobj, key, content_type=None):
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra_args)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def size(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)['ContentLength']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def url(self, key):
+        if self.public_url:
+            return f'{self.public_url}/{key}'
+        # 签名在本地计算，不需要请求对象存储
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=current_app.config['STORAGE_URL_EXPIRES'],
+        )
+
+    def presigned_upload(self, key, content_type, max_size):
+        # 签名限定了文件名、类型与大小，浏览器无法借此上传其他文件
+        post = self.client.generate_presigned_post(
+            self.bucket, key,
+            Fields={'Content-Type': content_type},
+            Conditions=[{'Content-Type': content_type}, ['content-length-range', 1, max_size]],
+            ExpiresIn=current_app.config['STORAGE_UPLOAD_EXPIRES'],
+        )
+        return {'url': post['url'], 'fields': post['fields']}
+
+
+def _create_storage(app):
+    config = app.config
+    backend = config['STORAGE_BACKEND']
+    if backend == 'local':
+        return LocalStorage(os.path.join(app.root_path, config['UPLOAD_FOLDER']), app.static_folder)
+    if backend == 's3':
+        return S3Storage(
+            config['STORAGE_S3_BUCKET'], endpoint_url=config['STORAGE_S3_ENDPOINT_URL'],
+            region=config['STORAGE_S3_REGION'], access_key=config['STORAGE_S3_ACCESS_KEY'],
+            secret_key=config['STORAGE_S3_SECRET_KEY'], public_url=config['STORAGE_S3_PUBLIC_URL'],
+        )
+    raise ValueError(f'未知的存储后端: {backend}')
+
+
+def get_storage():
+    """当前应用的存储后端（每个应用创建一次）"""
+    storage = current_app.extensions.get('storage')
+    if storage is None:
+        storage = current_app.extensions['storage'] = _create_storage(current_app)
+    return storage
+
+
+def _is_legacy(value):
+    return value.startswith(LEGACY_PREFIX)
+
+
+def media_url(value):
+    """数据库中保存的文件（存储的 key 或旧的 uploads/ 路径）的下载地址，模板中可直接使用"""
+    if not value:
+        return ''
+    if _is_legacy(value):
+        return url_for('static', filename=value)
+    return get_storage().url(value)
+
+
+def delete_media(value):
+    """删除数据库中引用过的文件"""
+    if _is_legacy(value):
+        path = os.path.join(current_app.static_folder, *value.split('/'))
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    get_storage().delete(value)
+
+
+def schedule_media_delete(*values):
+    """数据库更新后调用：延迟删除被替换的文件，已渲染的页面在此期间仍可访问旧地址"""
+    values = [value for value in values if value]
+    if not values:
+        return
+    from celery_app import delete_media_task
+    delete_media_task.apply_async(args=[values], countdown=current_app.config['STORAGE_DELETE_DELAY'])
+
+
+def _upload_local(token):
+    """本地存储的上传地址：令牌由 presigned_upload 签发，限定了文件名与大小；令牌本身即授权，不检查 CSRF"""
+    serializer = URLSafeTimedSerializer(current_app.secret_key, salt=UPLOAD_TOKEN_SALT)
+    try:
+        data = serializer.loads(token, max_age=current_app.config['STORAGE_UPLOAD_EXPIRES'])
+    except BadSignature:
+        abort(403)
+    file = request.files.get('file')
+    if not file:
+        abort(400)
+    storage = get_storage()
+    storage.save(file.stream, data['key'], data['content_type'])
+    if storage.size(data['key']) > data['max_size']:
+        storage.delete(data['key'])
+        abort(413)
+    # 与 S3 预签名表单上传成功的状态码一致
+    return '', 204
+
+
+def register_storage(app):
+    """注册模板函数 media_url，本地存储时注册上传地址"""
+    app.jinja_env.globals['media_url'] = media_url
+    if app.config['STORAGE_BACKEND'] == 'local':
+        app.add_url_rule('/uploads/local/<token>', 'storage_upload', csrf.exempt(_upload_local), methods=['POST'])
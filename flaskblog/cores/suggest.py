@@ -0,0 +1,194 @@
+# cores/suggest.py
+"""
+搜索联想
+前缀索引保存在 Redis 中：
+    suggest:index    有序集合，所有成员分数为 0，按字典序排列，成员为 "<规范化的词>\\x00<条目>"，
+                     用 ZRANGEBYLEX 取出以输入为前缀的成员
+    suggest:text     哈希，条目 -> 展示文本（博客标题或标签名）
+    suggest:weight   哈希，条目 -> 权重（博客阅读量、标签文章数），用于排序；阅读量写回数据库时同步增加
+条目为 "b:<博客ID>" 或 "t:<标签名>"。标题整体、标题中的每个词、以及中文词的每个后缀都会建立索引，
+因此输入"性能"可以匹配到"数据库性能优化"
+    build_suggest_index：根据数据库全量重建（启动时或命令行执行）
+    add_blog_suggestions：发布博客时增量更新
+    add_blog_views：阅读量写回数据库后同步博客权重
+    suggest：按前缀查询联想结果
+"""
+import re
+import threading
+
+from flask import current_app
+from sqlalchemy import select
+
+from exts import db, redis_client
+from models import BlogModel, TagModel
+from .search_cache import normalize_query
+
+SUGGEST_INDEX_KEY = 'suggest:index'
+SUGGEST_TEXT_KEY = 'suggest:text'
+SUGGEST_WEIGHT_KEY = 'suggest:weight'
+SUGGEST_BUILD_LOCK = 'lock:suggest:build'
+
+_SEPARATOR = '\x00'
+_WORD_SPLIT_RE = re.compile(r'[\s,，、;；:：#/|()（）\[\]【】《》<>"“”\'!！?？.。-]+')
+_CJK_RE = re.compile(r'[㐀-鿿]')
+# 单个词最多建立索引的长度，超出部分无法作为前缀匹配
+MAX_TERM_LENGTH = 30
+
+
+def _terms(text):
+    """需要建立索引的词：整体文本、每个词、中文词的每个后缀"""
+    text = normalize_query(text).replace(_SEPARATOR, '')[:MAX_TERM_LENGTH * 2]
+    terms = {text[:MAX_TERM_LENGTH]} if text else set()
+    for word in _WORD_SPLIT_RE.split(text):
+        word = word[:MAX_TERM_LENGTH]
+        if not word:
+            continue
+        terms.add(word)
+        # 中文没有空格分词，为每个汉字开始的后缀建立索引
+        if _CJK_RE.search(word):
+            terms.update(word[i:] for i in range(1, len(word)) if _CJK_RE.match(word[i]))
+    return terms
+
+
+def _add_item(pipe, index_key, item, text):
+    pipe.zadd(index_key, {f'{term}{_SEPARATOR}{item}': 0 for term in _terms(text)})
+
+
+def _blog_item(blog_id):
+    return f'b:{blog_id}'
+
+
+def _tag_item(name):
+    return f't:{name}'
+
+
+def build_suggest_index(batch_size=1000):
+    """
+    根据数据库全量重建联想索引，返回条目数
+    先写入临时键，完成后 RENAME 替换，重建期间查询不受影响
+    """
+    tmp = {key: f'{key}:building' for key in (SUGGEST_INDEX_KEY, SUGGEST_TEXT_KEY, SUGGEST_WEIGHT_KEY)}
+    redis_client.delete(*tmp.values())
+    total = 0
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            select(BlogModel.id, BlogModel.title, BlogModel.views)
+            .where(BlogModel.id > last_id).order_by(BlogModel.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        pipe = redis_client.pipeline(transaction=False)
+        for blog_id, title, views in batch:
+            item = _blog_item(blog_id)
+            _add_item(pipe, tmp[SUGGEST_INDEX_KEY], item, title)
+            pipe.hset(tmp[SUGGEST_TEXT_KEY], item, title)
+            pipe.hset(tmp[SUGGEST_WEIGHT_KEY], item, views or 0)
+        pipe.execute()
+        total += len(batch)
+        last_id = batch[-1][0]
+
+    pipe = redis_client.pipeline(transaction=False)
+    for name, post_count in db.session.execute(select(TagModel.name, TagModel.post_count)):
+        item = _tag_item(name)
+        _add_item(pipe, tmp[SUGGEST_INDEX_KEY], item, name)
+        pipe.hset(tmp[SUGGEST_TEXT_KEY], item, name)
+        pipe.hset(tmp[SUGGEST_WEIGHT_KEY], item, post_count)
+        total += 1
+    pipe.execute()
+
+    pipe = redis_client.pipeline()
+    for key, tmp_key in tmp.items():
+        # 空库时临时键不存在，RENAME 会报错
+        if redis_client.exists(tmp_key):
+            pipe.rename(tmp_key, key)
+        else:
+            pipe.delete(key)
+    pipe.execute()
+    current_app.logger.info(f'搜索联想索引已重建，共{total}个条目')
+    return total
+
+
+def add_blog_suggestions(blog, tag_names):
+    """发布博客后增量更新：加入博客标题，新标签加入索引，已有标签的权重加一"""
+    pipe = redis_client.pipeline(transaction=False)
+    item = _blog_item(blog.id)
+    _add_item(pipe, SUGGEST_INDEX_KEY, item, blog.title)
+    pipe.hset(SUGGEST_TEXT_KEY, item, blog.title)
+    pipe.hset(SUGGEST_WEIGHT_KEY, item, 0)
+    for name in tag_names:
+        item = _tag_item(name)
+        _add_item(pipe, SUGGEST_INDEX_KEY, item, name)
+        pipe.hset(SUGGEST_TEXT_KEY, item, name)
+        pipe.hincrby(SUGGEST_WEIGHT_KEY, item, 1)
+    pipe.execute()
+
+
+def add_blog_views(deltas):
+    """阅读量写回数据库后同步博客的权重，deltas 为 {博客ID: 阅读量增量}"""
+    if not deltas:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for blog_id, delta in deltas.items():
+        pipe.hincrby(SUGGEST_WEIGHT_KEY, _blog_item(blog_id), delta)
+    pipe.execute()
+
+
+def suggest(q, limit=None):
+    """
+    返回以 q 为前缀的联想结果 [(类型, 标识, 展示文本), ...]，按权重从高到低排序
+    类型为 'blog'（标识为博客ID）或 'tag'（标识为标签名）
+    两次 Redis 往返：ZRANGEBYLEX 取候选，HMGET 取展示文本与权重
+    限制：索引按字典序排列，只有前 SUGGEST_CANDIDATES 个候选参与按权重排序；
+    匹配条目超过该数量的短前缀（如单个字母）可能漏掉排在字典序后面的高权重条目，输入更多字符后即可匹配
+    """
+    config = current_app.config
+    limit = limit or config['SUGGEST_LIMIT']
+    prefix = normalize_query(q)[:MAX_TERM_LENGTH]
+    if not prefix:
+        return []
+    start = b'[' + prefix.encode('utf-8')
+    # UTF-8 编码中不会出现 0xff，作为前缀范围的上界
+    members = redis_client.zrangebylex(SUGGEST_INDEX_KEY, start, start + b'\xff',
+                                       start=0, num=config['SUGGEST_CANDIDATES'])
+    items = list(dict.fromkeys(member.split(b'\x00', 1)[1].decode() for member in members))
+    if not items:
+        return []
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hmget(SUGGEST_TEXT_KEY, items)
+    pipe.hmget(SUGGEST_WEIGHT_KEY, items)
+    texts, weights = pipe.execute()
+
+    results = []
+    for item, text, weight in zip(items, texts, weights):
+        if text is None:
+            continue
+        kind, key = item.split(':', 1)
+        results.append((int(weight or 0), 'blog' if kind == 'b' else 'tag', key, text.decode()))
+    results.sort(key=lambda result: -result[0])
+    return [result[1:] for result in results[:limit]]
+
+
+def register_suggest_index(app):
+    """
+    启动时在后台线程中构建联想索引
+    索引已存在（其他进程已构建）或其他进程正在构建时跳过；数据表尚未创建等错误只记录日志
+    """
+    if not app.config['SUGGEST_BUILD_ON_STARTUP']:
+        return
+
+    def build():
+        with app.app_context():
+            try:
+                if redis_client.exists(SUGGEST_INDEX_KEY):
+                    return
+                if not redis_client.set(SUGGEST_BUILD_LOCK, 1, nx=True, ex=600):
+                    return
+                try:
+                    build_suggest_index()
+                finally:
+                    redis_client.delete(SUGGEST_BUILD_LOCK)
+            except Exception as e:
+                app.logger.warning(f'启动时构建搜索联想索引失败: {e}')
+
+    threading.Thread(target=build, name='suggest-index-build', daemon=True).start()
@@ -0,0 +1,156 @@
+# cores/tags.py
+"""
+标签索引
+BlogModel.tag 为自由文本，按空格、逗号等分隔解析为标签，保存在 tag / blog_tag 表中
+    parse_tags：从文本中解析标签
+    link_tags：批量建立博客与标签的关联（不存在的标签自动创建）
+    attach_tags：发布博客时调用，关联标签并增量更新文章数
+    recount_tags：根据关联表重新计算所有标签的文章数
+    rebuild_tag_index：根据所有博客重建标签索引
+    get_tag_cloud：带缓存的标签云（按文章数排序）
+"""
+import re
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from exts import db, cache
+from models import BlogModel, TagModel, BlogTagModel
+from .near_cache import near_cache
+
+TAG_SPLIT_RE = re.compile(r'[\s,，、;；#]+')
+MAX_TAG_LENGTH = 30
+MAX_TAGS_PER_BLOG = 10
+
+TAG_CLOUD_CACHE_KEY = 'tag_cloud'
+# 分页缓存只按数据库中保存的标签名写入，其他写法的链接重定向到该写法
+TAG_PAGE_CACHE_KEY = 'tag_{tag}_{page}'
+# 每个标签缓存的最大页数
+TAG_CACHED_PAGES = 10
+
+
+def parse_tags(text):
+    """解析标签文本，忽略大小写去重（MySQL 的 _ci 排序规则下 Flask 与 flask 是同一个标签），保留第一次出现的写法"""
+    tags = []
+    seen = set()
+    for name in TAG_SPLIT_RE.split(text or ''):
+        name = name.strip()[:MAX_TAG_LENGTH]
+        if name and name.casefold() not in seen:
+            seen.add(name.casefold())
+            tags.append(name)
+    return tags[:MAX_TAGS_PER_BLOG]
+
+
+def _get_or_create_tag_ids(names):
+    """
+    批量获取标签ID，不存在的标签逐个创建（并发创建同名标签时以已存在的为准）
+    数据库按排序规则比较名称：MySQL 中只差大小写的名称对应同一个标签，返回的名称可能与查询的写法不同，
+    因此先按原样、再忽略大小写匹配；只差大小写的多个新名称只创建一次
+    """
+    names = set(names)
+    if not names:
+        return {}
+    rows = db.session.execute(select(TagModel.name, TagModel.id).where(TagModel.name.in_(names))).all()
+    exact = dict(rows)
+    folded = {name.casefold(): tag_id for name, tag_id in rows}
+    ids = {}
+    for name in sorted(names):
+        tag_id = exact.get(name) or folded.get(name.casefold())
+        if tag_id is None:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(TagModel).values(name=name, post_count=0))
+            except IntegrityError:
+                pass
+            tag_id = folded[name.casefold()] = db.session.scalar(select(TagModel.id).where(TagModel.name == name))
+        ids[name] = tag_id
+    return ids
+
+
+def link_tags(entries):
+    """
+    批量建立关联
+    参数:
+        entries: [(blog_id, create_time, tag_text), ...]
+    返回:
+        dict: tag_id -> 新增关联数
+    """
+    parsed = [(blog_id, create_time, parse_tags(text)) for blog_id, create_time, text in entries]
+    tag_ids = _get_or_create_tag_ids(name for _, _, names in parsed for name in names)
+    # 不同的名称可能对应同一个标签，(tag_id, blog_id) 是关联表的主键
+    rows = list({(tag_ids[name], blog_id): {'tag_id': tag_ids[name], 'blog_id': blog_id, 'create_time': create_time}
+                 for blog_id, create_time, names in parsed for name in names}.values())
+    if rows:
+        db.session.execute(insert(BlogTagModel), rows)
+    added = {}
+    for row in rows:
+        added[row['tag_id']] = added.get(row['tag_id'], 0) + 1
+    return added
+
+
+def attach_tags(blog):
+    """
+    发布博客时关联标签（与博客在同一事务中，由调用方提交），并增量更新文章数
+    返回:
+        list: 数据库中保存的标签名（写法可能与博客中的不同，分页缓存按此清理）
+    """
+    added = link_tags([(blog.id, blog.create_time, blog.tag)])
+    if added:
+        db.session.execute(
+            update(TagModel).where(TagModel.id.in_(added)).values(post_count=TagModel.post_count + 1)
+        )
+    return get_tag_names(added)
+
+
+def get_tag_names(tag_ids):
+    """标签ID对应的标签名"""
+    if not tag_ids:
+        return []
+    return list(db.session.scalars(select(TagModel.name).where(TagModel.id.in_(list(tag_ids)))))
+
+
+def recount_tags():
+    """用一条 UPDATE 重新计算所有标签的文章数"""
+    counts = select(func.count()).where(BlogTagModel.tag_id == TagModel.id).scalar_subquery()
+    db.session.execute(update(TagModel).values(post_count=counts))
+    db.session.commit()
+
+
+def rebuild_tag_index(batch_size=1000):
+    """根据所有博客的 tag 文本重建标签索引，返回处理的博客数"""
+    db.session.execute(delete(BlogTagModel))
+    # 按主键分段读取（而不是服务端游标），读取与写入可以使用同一个连接
+    total = 0
+    last_id = 0
+    while True:
+        batch = [tuple(row) for row in db.session.execute(
+            select(BlogModel.id, BlogModel.create_time, BlogModel.tag)
+            .where(BlogModel.id > last_id).order_by(BlogModel.id).limit(batch_size)
+        )]
+        if not batch:
+            break
+        link_tags(batch)
+        total += len(batch)
+        last_id = batch[-1][0]
+    recount_tags()
+    clear_tag_cache()
+    return total
+
+
+def clear_tag_cache(names=None):
+    """清理标签云缓存，以及指定标签的分页缓存（names 为数据库中保存的标签名）"""
+    keys = [TAG_CLOUD_CACHE_KEY]
+    for name in names or []:
+        keys.extend(TAG_PAGE_CACHE_KEY.format(tag=name, page=page) for page in range(1, TAG_CACHED_PAGES + 1))
+    near_cache.delete_many(*keys)
+
+
+def get_tag_cloud(limit=None):
+    """文章数最多的标签：[(name, post_count), ...]，直接读取预先计算的文章数"""
+    limit = limit or current_app.config['TAG_CLOUD_SIZE']
+    tags = cache.get(TAG_CLOUD_CACHE_KEY)
+    if tags is None:
+        tags = TagModel.get_top_tags(limit)
+        cache.set(TAG_CLOUD_CACHE_KEY, tags, timeout=current_app.config['TAG_CLOUD_CACHE_TIMEOUT'])
+    return tags
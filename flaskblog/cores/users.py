@@ -1,120 +1,173 @@
-import os
-import time
-from werkzeug.utils import secure_filename
-from flask import Blueprint, render_template, request, flash, redirect, url_for, g, current_app
+import mimetypes
+import uuid
+from flask import Blueprint, render_template, request, flash, redirect, url_for, g, current_app, jsonify
 from decorators import login_required
 from models import UserProfileModel
 from cores.forms import UserProfileForm
+from cores.storage import get_storage, media_url, schedule_media_delete
 from exts import db
 
 bp = Blueprint('users', __name__, url_prefix='/users')
+"""
+    用户资料
+    profile：查看资料；表单上传（浏览器不支持脚本时的兼容方式，文件经过 Web 进程）
+    request_upload：申请直传地址，返回预签名表单，浏览器把文件直接上传到存储后端
+    confirm_upload：直传完成后确认，检查文件已存在，更新资料并延迟删除旧文件
+"""
 
+# 资料中的媒体类型 -> 允许的扩展名（与 UserProfileForm 一致）
+MEDIA_EXTENSIONS = {
+    'image': {'png', 'jpg', 'jpeg', 'gif'},
+    'video': {'mp4', 'avi', 'mov', 'wmv'},
+}
 
-def allowed_file(filename):
+
+def _extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def allowed_file(filename, kind):
     """检查文件扩展名是否允许"""
-    return '.' in filename and \
-        filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+    return _extension(filename) in MEDIA_EXTENSIONS[kind] & current_app.config['ALLOWED_EXTENSIONS']
+
+
+def _media_prefix(kind):
+    return f"{kind}s/{g.user.id}/"
+
 
+def _new_key(kind, filename):
+    """存储中的文件名：按类型与用户分目录，随机文件名保证唯一"""
+    return f"{_media_prefix(kind)}{uuid.uuid4().hex}.{_extension(filename)}"
 
-def save_file(file, folder):
-    """保存文件并返回相对路径"""
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # 确保文件名唯一
-        name, ext = os.path.splitext(filename)
-        timestamp = int(time.time())
-        filename = f"{name}_{timestamp}{ext}" if name else f"{timestamp}{ext}"
 
-        # 创建上传目录
-        upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], folder)
-        os.makedirs(upload_folder, exist_ok=True)
+def _content_type(key):
+    """按已校验的扩展名确定文件类型，不使用客户端提供的类型（否则可以把 HTML 以图片的名义上传并按 HTML 下载）"""
+    return mimetypes.guess_type(key)[0] or 'application/octet-stream'
 
-        # 保存文件
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
 
-        # 返回相对URL路径
-        return f"uploads/{folder}/{filename}"
+def save_file(file, kind):
+    """通过存储后端保存上传的文件并返回 key，格式不支持时返回 None"""
+    if file and allowed_file(file.filename, kind):
+        key = _new_key(kind, file.filename)
+        get_storage().save(file.stream, key, _content_type(key))
+        return key
     return None
 
 
-@bp.route('/profile/', methods=['GET', 'POST'])
-@login_required
-def profile():
-    # 获取当前用户的资料
+def _get_or_create_profile():
     user_profile = UserProfileModel.query.filter_by(user_id=g.user.id).first()
-    # 如果不存在用户资料，则创建一个
     if not user_profile:
         user_profile = UserProfileModel(user_id=g.user.id)
         db.session.add(user_profile)
-        try:
-            db.session.commit()
-            print(user_profile.user.username)
-        except Exception as e:
-            db.session.rollback()
-            flash("系统错误，请重试")
-            return redirect(url_for('users.profile'))
+        db.session.commit()
+    return user_profile
+
+
+def _error(message, status=400):
+    return jsonify({'status': 'error', 'message': message}), status
+
+
+@bp.route('/profile/', methods=['GET', 'POST'])
+@login_required
+def profile():
+    # 获取当前用户的资料，不存在则创建
+    try:
+        user_profile = _get_or_create_profile()
+    except Exception:
+        db.session.rollback()
+        flash("系统错误，请重试")
+        return redirect(url_for('users.profile'))
     if request.method == 'GET':
         form = UserProfileForm()
         return render_template('user_profile.html', form=form, user_profile=user_profile)
-    else:
-        form = UserProfileForm(request.form)  # 同时处理表单和文件数据
-
-        if not form.validate():
-            flash("表单填写有误")
-            return render_template('user_profile.html', form=form, user_profile=user_profile)
-
-        # 检查表单中的文件
-        image_file = request.files.get('image')
-        video_file = request.files.get('video')
-
-        # 如果有文件上传，则处理文件
-        image_path = None
-        video_path = None
-
-        if image_file and image_file.filename != '':
-            image_path = save_file(image_file, 'images')
-            if not image_path:
-                flash("图片文件格式不支持")
-                return redirect(request.url)
-
-        if video_file and video_file.filename != '':
-            video_path = save_file(video_file, 'videos')
-            if not video_path:
-                flash("视频文件格式不支持")
-                return redirect(request.url)
-
-        if user_profile:
-            # 更新现有资料，并删除旧文件
-            if image_path:
-                # 删除旧的图片文件
-                if user_profile.image:
-                    old_image_path = os.path.join(current_app.root_path, 'static', user_profile.image)
-                    if os.path.exists(old_image_path):
-                        os.remove(old_image_path)
-                user_profile.image = image_path
-            if video_path:
-                # 删除旧的视频文件
-                if user_profile.video:
-                    old_video_path = os.path.join(current_app.root_path, 'static', user_profile.video)
-                    if os.path.exists(old_video_path):
-                        os.remove(old_video_path)
-                user_profile.video = video_path
-        else:
-            # 创建新资料
-            user_profile = UserProfileModel(
-                image=image_path,
-                video=video_path,
-                user_id=g.user.id
-            )
-            db.session.add(user_profile)
-            current_app.logger.info(f"{user_profile.user.username}资料已创建")
-        try:
-            db.session.commit()
-            current_app.logger.info(f"{user_profile.user.username}资料已更新")
-            flash("用户资料已更新")
-        except Exception:
-            db.session.rollback()
-            current_app.logger.error(f"{user_profile.user.username}用户资料更新失败")
-            flash("用户资料更新失败")
-        return redirect(url_for('users.profile'))
+
+    form = UserProfileForm(request.form)  # 同时处理表单和文件数据
+    if not form.validate():
+        flash("表单填写有误")
+        return render_template('user_profile.html', form=form, user_profile=user_profile)
+
+    # 检查表单中的文件
+    new_keys = {}
+    for kind in MEDIA_EXTENSIONS:
+        file = request.files.get(kind)
+        if not file or file.filename == '':
+            continue
+        key = save_file(file, kind)
+        if not key:
+            schedule_media_delete(*new_keys.values())
+            flash("图片文件格式不支持" if kind == 'image' else "视频文件格式不支持")
+            return redirect(request.url)
+        new_keys[kind] = key
+
+    # 更新资料，提交成功后再删除旧文件
+    old_keys = [getattr(user_profile, kind) for kind in new_keys]
+    for kind, key in new_keys.items():
+        setattr(user_profile, kind, key)
+    try:
+        db.session.commit()
+        schedule_media_delete(*old_keys)
+        current_app.logger.info(f"{user_profile.user.username}资料已更新")
+        flash("用户资料已更新")
+    except Exception:
+        db.session.rollback()
+        schedule_media_delete(*new_keys.values())
+        current_app.logger.error(f"{user_profile.user.username}用户资料更新失败")
+        flash("用户资料更新失败")
+    return redirect(url_for('users.profile'))
+
+
+@bp.route('/profile/uploads', methods=['POST'])
+@login_required
+def request_upload():
+    """
+    申请直传地址
+    请求: {"kind": "image" | "video", "filename": 文件名, "size": 字节数}
+    返回: {"status": "success", "key": 存储中的文件名, "url": 上传地址, "fields": 随文件一起提交的表单字段}
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind')
+    filename = str(data.get('filename') or '')
+    if kind not in MEDIA_EXTENSIONS:
+        return _error("未知的文件类型")
+    if not allowed_file(filename, kind):
+        return _error("图片文件格式不支持" if kind == 'image' else "视频文件格式不支持")
+    max_size = current_app.config['MEDIA_MAX_SIZE'][kind]
+    size = data.get('size')
+    if not isinstance(size, int) or size <= 0 or size > max_size:
+        return _error(f"文件大小不能超过{max_size // (1024 * 1024)}MB")
+
+    key = _new_key(kind, filename)
+    upload = get_storage().presigned_upload(key, _content_type(key), max_size)
+    return jsonify({'status': 'success', 'key': key, **upload})
+
+
+@bp.route('/profile/media', methods=['POST'])
+@login_required
+def confirm_upload():
+    """
+    直传完成后确认
+    请求: {"kind": "image" | "video", "key": request_upload 返回的 key}
+    返回: {"status": "success", "url": 文件的下载地址}
+    """
+    data = request.get_json(silent=True) or {}
+    kind, key = data.get('kind'), str(data.get('key') or '')
+    # 只能使用为当前用户签发的 key
+    if kind not in MEDIA_EXTENSIONS or not key.startswith(_media_prefix(kind)) or '..' in key:
+        return _error("文件无效")
+    if get_storage().size(key) is None:
+        return _error("文件尚未上传完成")
+
+    try:
+        user_profile = _get_or_create_profile()
+        old_key = getattr(user_profile, kind)
+        setattr(user_profile, kind, key)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.error(f"{g.user.username}用户资料更新失败")
+        return _error("用户资料更新失败", 500)
+    if old_key != key:
+        schedule_media_delete(old_key)
+    current_app.logger.info(f"{g.user.username}资料已更新")
+    flash("用户资料已更新")
+    return jsonify({'status': 'success', 'url': media_url(key)})
@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import redirect, url_for, g, session
+from flask import redirect, url_for, g, session, abort, current_app
 
 
 def login_required(func):
@@ -12,3 +12,16 @@ def login_required(func):
             return redirect(url_for('auth.login'))
 
     return wrapper
+
+
+def admin_required(func):
+    """仅允许 ADMIN_EMAILS 中配置的用户访问"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not (session.get('user_id') and g.user):
+            return redirect(url_for('auth.login'))
+        if g.user.email not in current_app.config.get('ADMIN_EMAILS', set()):
+            abort(403)
+        return func(*args, **kwargs)
+
+    return wrapper
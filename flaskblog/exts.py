@@ -3,9 +3,14 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail
 from flask_redis import FlaskRedis
 from flask_caching import Cache
+from flask_migrate import Migrate
+from flask_wtf.csrf import CSRFProtect
+from cores.db_routing import RoutingSession
 
 # 创建相关实例
 redis_client = FlaskRedis()
 mail = Mail()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # 支持读写分离
 cache = Cache()
+csrf = CSRFProtect()
+migrate = Migrate()
@@ -1,10 +1,14 @@
 from flask import session, g
+from exts import db
 from models import UserModel
+from cores.db_routing import apply_sticky_routing
 
 
 def register_hooks(app):
     @app.before_request
     def my_before_request():
+        # 刚写入过数据的用户在一段时间内读主库
+        apply_sticky_routing(db)
         user_id = session.get('user_id')
         if user_id:
             user = UserModel.query.get(user_id)
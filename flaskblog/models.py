@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import or_
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import joinedload
 from exts import db
 
 
@@ -47,7 +48,13 @@ class BlogModel(db.Model):
     title = db.Column(db.String(50), nullable=False, index=True)
     tag = db.Column(db.String(100), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
-    create_time = db.Column(db.DateTime, default=datetime.now)
+    # 预先渲染的 HTML，详情页直接使用，为空时再渲染 Markdown
+    content_html = db.Column(db.Text, nullable=True)
+    # 所有列表都按发布时间倒序，索引避免每次对整表排序
+    create_time = db.Column(db.DateTime, default=datetime.now, index=True)
+    # 阅读量与独立访客数，由 Redis 累计后定时写回（cores/popularity.py）
+    views = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    unique_visitors = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # 外键
     author_id = db.Column(db.Integer, db.ForeignKey('user.id'))
@@ -64,19 +71,40 @@ class BlogModel(db.Model):
             1. 使用索引字段排序，提高查询效率
             2. 统一处理分页逻辑
             3. 保持与原分页对象的兼容性
+            4. 一次性加载作者，避免模板逐行查询，且结果可直接缓存
         """
-        return cls.query.order_by(cls.create_time.desc()).paginate(
+        return cls.query.options(joinedload(cls.author)).order_by(cls.create_time.desc()).paginate(
             page=page,
             per_page=per_page,
             error_out=False
         )
 
     @classmethod
-    def search_blogs_paginated(cls, query, page=1, per_page=10):
+    def get_detail_or_404(cls, blog_id):
+        """
+        获取博客详情，同时加载作者信息（主键查询）
+        """
+        return cls.query.options(joinedload(cls.author)).get_or_404(blog_id)
+
+    @classmethod
+    def get_by_ids(cls, blog_ids):
         """
-        优化的博客搜索功能（分页版本）
+        按给定顺序批量获取博客（主键 IN 查询），不存在的ID会被跳过
         """
-        return cls.query.filter(
+        if not blog_ids:
+            return []
+        by_id = {blog.id: blog for blog in cls.query.options(joinedload(cls.author)).filter(cls.id.in_(blog_ids))}
+        return [by_id[blog_id] for blog_id in blog_ids if blog_id in by_id]
+
+    @classmethod
+    def search_blog_ids(cls, query, page=1, per_page=10):
+        """
+        优化的博客搜索功能（只查询主键）
+        作用:
+            1. 结果只用于缓存有序的ID列表，博客内容通过摘要缓存批量获取
+            2. 返回 (当前页的ID列表, 总数)
+        """
+        pagination = cls.query.with_entities(cls.id).filter(
             or_(
                 cls.title.contains(query),  # 使用索引字段
                 cls.tag.contains(query)  # 使用索引字段
@@ -86,19 +114,66 @@ class BlogModel(db.Model):
             per_page=per_page,
             error_out=False
         )
+        return [row.id for row in pagination.items], pagination.total
 
     @classmethod
     def get_blogs_by_tag_paginated(cls, tag, page=1, per_page=10):
         """
         根据标签获取博客文章（分页版本）
+        作用:
+            1. 通过 blog_tag 的 (tag_id, create_time) 索引按时间倒序取出一页，无需扫描博客表
+            2. 总数直接使用 tag.post_count，不执行 COUNT 查询
+        参数:
+            tag: TagModel 实例
         """
-        return cls.query.filter(cls.tag == tag).order_by(
-            cls.create_time.desc()
+        pagination = cls.query.options(joinedload(cls.author)).join(
+            BlogTagModel, BlogTagModel.blog_id == cls.id
+        ).filter(BlogTagModel.tag_id == tag.id).order_by(
+            BlogTagModel.create_time.desc()
         ).paginate(
             page=page,
             per_page=per_page,
-            error_out=False
+            error_out=False,
+            count=False
         )
+        pagination.total = tag.post_count
+        return pagination
+
+
+class TagModel(db.Model):
+    """
+    标签模型
+    post_count 为预先计算的文章数，发布博客时增量维护
+    """
+    __tablename__ = 'tag'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.String(30), nullable=False, unique=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+
+    @classmethod
+    def get_top_tags(cls, limit=100):
+        """
+        文章数最多的标签：[(name, post_count), ...]
+        """
+        return [tuple(row) for row in db.session.execute(
+            db.select(cls.name, cls.post_count).where(cls.post_count > 0)
+            .order_by(cls.post_count.desc()).limit(limit)
+        )]
+
+
+class BlogTagModel(db.Model):
+    """
+    博客与标签的多对多关联
+    冗余保存博客的 create_time，使按标签分页可以直接使用 (tag_id, create_time) 索引排序
+    """
+    __tablename__ = 'blog_tag'
+    tag_id = db.Column(db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+    blog_id = db.Column(db.Integer, db.ForeignKey('blog.id'), primary_key=True, index=True)
+    create_time = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        db.Index('ix_blog_tag_tag_id_create_time', 'tag_id', 'create_time'),
+    )
 
 
 class CommentModel(db.Model):
@@ -116,3 +191,33 @@ class CommentModel(db.Model):
     blog = db.relationship(BlogModel,
                            backref=db.backref('comments', order_by=create_time.desc(), cascade='all, delete-orphan'))
     author = db.relationship(UserModel, backref=db.backref('comments', cascade='all, delete-orphan'))
+
+    # 评论分页按博客过滤、按时间排序，复合索引同时满足过滤与排序
+    __table_args__ = (
+        db.Index('ix_comment_blog_id_create_time', 'blog_id', 'create_time'),
+    )
+
+    @classmethod
+    def get_blog_comments_before(cls, blog_id, before=None, limit=20):
+        """
+        获取博客的评论（游标分页）
+        作用:
+            1. 按 (create_time, id) 倒序，从游标位置继续读取，不使用 OFFSET，翻到多深都只读取 limit 行
+            2. 使用 (blog_id, create_time) 复合索引过滤并排序
+            3. 一次性加载评论作者
+        参数:
+            before: 上一页最后一条评论的 (create_time, id)，为 None 时从最新的评论开始
+        """
+        query = cls.query.options(joinedload(cls.author)).filter_by(blog_id=blog_id)
+        if before is not None:
+            create_time, comment_id = before
+            query = query.filter(or_(
+                cls.create_time < create_time,
+                and_(cls.create_time == create_time, cls.id < comment_id),
+            ))
+        return query.order_by(cls.create_time.desc(), cls.id.desc()).limit(limit).all()
+
+    @classmethod
+    def count_blog_comments(cls, blog_id):
+        """博客的评论总数（只扫描复合索引）"""
+        return db.session.scalar(db.select(db.func.count()).select_from(cls).where(cls.blog_id == blog_id))
@@ -1,9 +1,10 @@
 import sys
 import subprocess
 import os
-from app import app
+from app import create_app
 
 if __name__ == '__main__':
+    app = create_app()
     if len(sys.argv) > 1 and sys.argv[1] == 'start':
         # 启动完整服务的模式
         print("正在启动 Flask + Celery + Redis 服务...")
@@ -16,7 +17,8 @@ if __name__ == '__main__':
                 '-A', 'celery_app.celery',
                 'worker',
                 '--loglevel=info',
-                '--pool=solo'  # Windows 兼容的池类型
+                '--pool=solo',  # Windows 兼容的池类型
+                '-Q', ','.join(app.config['CELERY_QUEUES'])  # 开发时一个 worker 消费所有队列
             ], cwd=os.getcwd(),
                 creationflags=subprocess.CREATE_NEW_CONSOLE)  # 在新控制台窗口中运行
 
@@ -36,6 +38,24 @@ if __name__ == '__main__':
             print(f"启动过程中出现错误: {e}")
             if 'celery_process' in locals():
                 celery_process.terminate()
+    elif len(sys.argv) > 2 and sys.argv[1] == 'worker':
+        # 按队列启动 worker，每个队列的并发数见 config.py 中的 CELERY_QUEUES
+        # 例如：python run.py worker email    python run.py worker pdf
+        queue = sys.argv[2]
+        queues = app.config['CELERY_QUEUES']
+        if queue not in queues:
+            print(f"未知的队列 {queue}，可选：{', '.join(queues)}")
+            sys.exit(1)
+        print(f"启动 {queue} 队列的 Celery Worker（并发数 {queues[queue]['concurrency']}）...")
+        sys.exit(subprocess.call([
+            sys.executable, '-m', 'celery',
+            '-A', 'celery_app.celery',
+            'worker',
+            '--loglevel=info',
+            '-Q', queue,
+            '-c', str(queues[queue]['concurrency']),
+            '-n', f'{queue}@%h',  # 每个队列的 worker 使用不同的节点名
+        ], cwd=os.getcwd()))
     else:
         # 正常运行 Flask 应用（仅 Flask）
         print("启动 Flask 应用...")
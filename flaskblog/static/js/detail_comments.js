@@ -0,0 +1,82 @@
+// static/js/detail_comments.js
+// 评论无限滚动：首次加载第一页（含总数），滚动到列表底部时按游标加载下一页
+document.addEventListener('DOMContentLoaded', () => {
+    const list = document.getElementById('commentList');
+    const sentinel = document.getElementById('commentSentinel');
+    if (!list || !sentinel) {
+        return;
+    }
+    let cursor = null;
+    let loading = false;
+    let finished = false;
+
+    function renderComment(comment, pending) {
+        const li = document.createElement('li');
+        const info = document.createElement('div');
+        info.className = 'user-info';
+        const avatar = document.createElement('img');
+        avatar.className = 'avatar';
+        avatar.src = list.dataset.avatar;
+        avatar.alt = '';
+        const username = document.createElement('span');
+        username.className = 'username';
+        username.textContent = comment.author;
+        const time = document.createElement('span');
+        time.className = 'create-time';
+        time.textContent = pending ? `${comment.time}（发布中）` : comment.time;
+        info.append(avatar, username, time);
+        const content = document.createElement('p');
+        content.className = 'comment-content';
+        content.textContent = comment.text;
+        li.append(info, content);
+        list.appendChild(li);
+    }
+
+    function loadMore() {
+        if (loading || finished) {
+            return;
+        }
+        loading = true;
+        const url = cursor ? `${list.dataset.url}?cursor=${encodeURIComponent(cursor)}` : list.dataset.url;
+        fetch(url, {credentials: 'same-origin'})
+            .then(response => response.json())
+            .then(data => {
+                if (data.total !== undefined) {
+                    // 第一页：评论总数，以及当前用户尚未写入数据库的评论
+                    document.getElementById('commentTotal').textContent = data.total;
+                    (data.pending || []).forEach(comment => renderComment(comment, true));
+                    if (!data.comments.length && !(data.pending || []).length) {
+                        document.getElementById('noComment').style.display = '';
+                    }
+                }
+                data.comments.forEach(comment => renderComment(comment, false));
+                cursor = data.next;
+                if (!cursor) {
+                    finished = true;
+                    observer.disconnect();
+                    sentinel.style.display = 'none';
+                }
+            })
+            .catch(error => {
+                // 出错后不再自动重试，避免连续请求
+                console.error('评论加载失败:', error);
+                finished = true;
+                observer.disconnect();
+                sentinel.textContent = '评论加载失败，请刷新页面重试';
+            })
+            .finally(() => {
+                loading = false;
+                // 加载后哨兵仍在可视区域内时继续加载
+                if (!finished && sentinel.getBoundingClientRect().top < window.innerHeight) {
+                    loadMore();
+                }
+            });
+    }
+
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadMore();
+        }
+    }, {rootMargin: '200px'});
+    observer.observe(sentinel);
+});
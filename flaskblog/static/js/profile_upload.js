@@ -0,0 +1,66 @@
+// 用户资料：把选择的图片、视频直接上传到存储后端，文件不经过 Web 服务器
+// 1. 向服务器申请直传地址（预签名表单） 2. 浏览器把文件 POST 到该地址 3. 通知服务器上传完成
+document.addEventListener('DOMContentLoaded', () => {
+    const form = document.getElementById('profileForm');
+    if (!form || !window.fetch || !window.FormData) {
+        return;
+    }
+    const csrfToken = form.querySelector('input[name="csrf_token"]').value;
+    const submitBtn = document.getElementById('profileSubmit');
+    const errorBox = document.getElementById('uploadError');
+
+    function postJson(url, data) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken},
+            body: JSON.stringify(data)
+        }).then(response => response.json().then(result => {
+            if (!response.ok || result.status !== 'success') {
+                throw new Error(result.message || '上传失败，请重试');
+            }
+            return result;
+        }));
+    }
+
+    function uploadFile(kind, file) {
+        return postJson(form.dataset.uploadUrl, {
+            kind: kind,
+            filename: file.name,
+            size: file.size
+        }).then(upload => {
+            const body = new FormData();
+            Object.entries(upload.fields).forEach(([name, value]) => body.append(name, value));
+            // 对象存储要求文件是最后一个字段
+            body.append('file', file);
+            return fetch(upload.url, {method: 'POST', body: body}).then(response => {
+                if (!response.ok) {
+                    throw new Error('文件上传失败，请检查文件大小');
+                }
+                return postJson(form.dataset.confirmUrl, {kind: kind, key: upload.key});
+            });
+        });
+    }
+
+    form.addEventListener('submit', event => {
+        const files = ['image', 'video']
+            .map(kind => [kind, form.querySelector(`input[name="${kind}"]`).files[0]])
+            .filter(([, file]) => file);
+        if (!files.length) {
+            return;
+        }
+        event.preventDefault();
+        submitBtn.disabled = true;
+        submitBtn.textContent = '上传中...';
+        errorBox.classList.add('d-none');
+
+        // 依次上传，成功后刷新页面显示新的文件
+        files.reduce((chain, [kind, file]) => chain.then(() => uploadFile(kind, file)), Promise.resolve())
+            .then(() => window.location.reload())
+            .catch(error => {
+                errorBox.textContent = error.message;
+                errorBox.classList.remove('d-none');
+                submitBtn.disabled = false;
+                submitBtn.textContent = '保存资料';
+            });
+    });
+});
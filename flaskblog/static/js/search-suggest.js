@@ -0,0 +1,53 @@
+// static/js/search-suggest.js
+// 搜索联想：输入时请求 /search/suggest，点击联想结果直接打开博客或标签页
+$(document).ready(function () {
+    var $input = $('#searchInput');
+    var $menu = $('#searchSuggest');
+    var timer;
+    var lastQuery = '';
+
+    function hideMenu() {
+        $menu.hide().empty();
+    }
+
+    $input.on('input', function () {
+        var q = $.trim($input.val());
+        clearTimeout(timer);
+        if (!q) {
+            lastQuery = '';
+            hideMenu();
+            return;
+        }
+        // 停止输入 150 毫秒后再请求，避免每个按键都发请求
+        timer = setTimeout(function () {
+            lastQuery = q;
+            $.getJSON($input.data('suggest-url'), {q: q}, function (data) {
+                // 忽略已经过时的响应
+                if (q !== lastQuery) {
+                    return;
+                }
+                $menu.empty();
+                $.each(data.suggestions, function (_, item) {
+                    $('<a class="list-group-item list-group-item-action py-1"></a>')
+                        .attr('href', item.url)
+                        .text(item.text)
+                        .append(item.type === 'tag' ? ' <span class="badge badge-secondary">标签</span>' : '')
+                        .appendTo($menu);
+                });
+                $menu.toggle(data.suggestions.length > 0);
+            });
+        }, 150);
+    });
+
+    $input.on('keydown', function (e) {
+        if (e.key === 'Escape') {
+            hideMenu();
+        }
+    });
+
+    $(document).on('click', function (e) {
+        if (!$(e.target).closest('#searchInput, #searchSuggest').length) {
+            hideMenu();
+        }
+    });
+});